@@ -5,10 +5,17 @@ A Streamlit application for analyzing Databricks Genie query performance,
 identifying problematic queries, and providing optimization recommendations.
 """
 
+import logging
+import os
+
 import streamlit as st
 import pandas as pd
 from typing import Optional
 
+# Service diagnostics (logger.debug in services/) are shown with LOG_LEVEL=DEBUG
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("services").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
 # Configure page - no sidebar
 st.set_page_config(
     page_title="Genie Performance Audit",
@@ -25,7 +32,15 @@ from services.databricks_client import (
     MessageWithQueries, 
     QueryMetrics,
 )
-from services.analytics import classify_bottleneck, get_query_optimizations, get_diagnostic_queries, map_status
+from services.analytics import (
+    classify_bottleneck,
+    get_query_optimizations,
+    get_diagnostic_queries,
+    map_status_batch,
+    SEVERITY_HIGH,
+    SEVERITY_MEDIUM,
+    SEVERITY_LOW,
+)
 from services.report_generator import generate_pdf_report, generate_query_pdf_report
 from components.charts import (
     create_duration_distribution_chart,
@@ -40,6 +55,7 @@ from utils.formatters import (
     format_duration,
     format_number,
     format_percentage,
+    format_start_time,
     get_bottleneck_label,
     get_bottleneck_color,
 )
@@ -920,7 +936,7 @@ def render_query_list(queries_df: pd.DataFrame) -> Optional[str]:
     display_df["Query Preview"] = display_df["query_text"].str[:100] + "..."
     display_df["User"] = display_df["executed_by"].str.split("@").str[0]
     display_df["Time"] = pd.to_datetime(display_df["start_time"]).dt.strftime("%b %d %H:%M")
-    display_df["Status"] = display_df["execution_status"].apply(map_status)
+    display_df["Status"] = map_status_batch(display_df["execution_status"])
     display_df["Bottleneck"] = display_df["bottleneck"].apply(get_bottleneck_label)
     display_df["Speed"] = display_df["speed_category"]
     # User Prompt - truncated to 50 chars, show "—" if not available
@@ -1105,41 +1121,29 @@ def render_conversations_table(
             title = title[:50] + "..."
         
         # Parse and format start time (handle epoch timestamps)
-        start_time_display = ""
-        if conv.created_time:
-            try:
-                # Try to parse as numeric epoch (milliseconds or seconds)
-                ts_value = conv.created_time
-                if ts_value.isdigit() or (ts_value.replace(".", "", 1).isdigit()):
-                    ts_num = float(ts_value)
-                    # If > 1e12, it's in milliseconds; convert to seconds
-                    if ts_num > 1e12:
-                        ts_num = ts_num / 1000
-                    dt = pd.to_datetime(ts_num, unit="s")
-                else:
-                    # Try standard datetime parsing
-                    dt = pd.to_datetime(ts_value)
-                start_time_display = dt.strftime("%b %d, %Y %I:%M %p")
-            except Exception:
-                start_time_display = str(conv.created_time)[:16]
+        start_time_display = format_start_time(conv.created_time)
         
         # Count total issues
         issue_count = conv.slow_ai_count + conv.slow_query_count
         
-        data.append({
-            "Conversation ID": conv.conversation_id,
-            "Conversation": title,
-            "User": conv.user_email or "Unknown",
-            "Queries": conv.total_queries,
-            "Start Time": start_time_display,
-            "AI (s)": round(conv.total_ai_overhead_sec, 2),
-            "Avg (s)": round(conv.avg_response_sec, 2),
-            "Max (s)": round(conv.slowest_response_sec, 2),
-            "Issues": issue_count,
-            "Source": conv.conversation_source,
-        })
-    
-    df = pd.DataFrame(data)
+        data.append((
+            conv.conversation_id,
+            title,
+            conv.user_email or "Unknown",
+            conv.total_queries,
+            start_time_display,
+            round(conv.total_ai_overhead_sec, 2),
+            round(conv.avg_response_sec, 2),
+            round(conv.slowest_response_sec, 2),
+            issue_count,
+            conv.conversation_source,
+        ))
+    
+    # Positional rows skip building (and hashing) a dict per conversation
+    df = pd.DataFrame(data, columns=[
+        "Conversation ID", "Conversation", "User", "Queries", "Start Time",
+        "AI (s)", "Avg (s)", "Max (s)", "Issues", "Source",
+    ])
     
     # Display section header
     st.markdown("### Conversations Summary")
@@ -1320,18 +1324,24 @@ def render_conversation_tree(
         return None
     
     # Summary stats with source breakdown and performance issues
+    # (per-conversation aggregates are precomputed, so one pass covers them all)
     total_convs = len(display_conversations)
-    total_msgs = sum(len(c.messages) for c in display_conversations)
-    total_queries = sum(c.total_queries for c in display_conversations)
-    
-    # Performance issue counts
-    convs_with_issues = sum(1 for c in display_conversations if c.has_performance_issues)
-    total_slow_ai = sum(c.slow_ai_count for c in display_conversations)
-    total_slow_queries = sum(c.slow_query_count for c in display_conversations)
-    
-    # Count by source (API vs Space UI)
-    api_convs = sum(1 for c in display_conversations if c.conversation_source == "API")
-    space_convs = sum(1 for c in display_conversations if c.conversation_source == "Space")
+    total_msgs = total_queries = 0
+    convs_with_issues = total_slow_ai = total_slow_queries = 0
+    api_convs = space_convs = 0
+    for c in display_conversations:
+        total_msgs += len(c.messages)
+        total_queries += c.total_queries
+        # Performance issue counts
+        if c.has_performance_issues:
+            convs_with_issues += 1
+        total_slow_ai += c.slow_ai_count
+        total_slow_queries += c.slow_query_count
+        # Count by source (API vs Space UI)
+        if c.conversation_source == "API":
+            api_convs += 1
+        elif c.conversation_source == "Space":
+            space_convs += 1
     unknown_convs = total_convs - api_convs - space_convs
     
     source_breakdown = []
@@ -1725,16 +1735,16 @@ def render_query_detail(
     
     # Severity color mapping
     severity_colors = {
-        "high": "#ff6b6b",
-        "medium": "#ffa94d",
-        "low": "#51cf66",
+        SEVERITY_HIGH: "#ff6b6b",
+        SEVERITY_MEDIUM: "#ffa94d",
+        SEVERITY_LOW: "#51cf66",
     }
     
     for opt in optimizations:
         color = severity_colors.get(opt.severity, "#888")
         severity_badge = opt.severity.upper()
         
-        with st.expander(f"{opt.title}", expanded=(opt.severity == "high")):
+        with st.expander(f"{opt.title}", expanded=(opt.severity == SEVERITY_HIGH)):
             st.markdown(f"""
             <span style="background: {color}; color: white; padding: 2px 8px; border-radius: 4px; font-size: 11px; font-weight: 600;">{severity_badge}</span>
             <span style="color: #888; font-size: 12px; margin-left: 8px;">{opt.category.replace('_', ' ').title()}</span>
@@ -1749,12 +1759,8 @@ def render_query_detail(
     st.markdown("### 🔬 Diagnostic Queries")
     st.caption("Copy and paste these SQL queries into Databricks SQL Editor to investigate further")
     
-    diagnostic_queries = get_diagnostic_queries({
-        "statement_id": query.get("statement_id", ""),
-        "genie_space_id": query.get("genie_space_id", ""),
-        "bottleneck": bottleneck,
-        "query_text": query.get("query_text", ""),
-    })
+    # Pass the row itself so start_time reaches the diagnostics
+    diagnostic_queries = get_diagnostic_queries(query)
     
     # Category icons
     category_icons = {
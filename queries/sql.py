@@ -988,6 +988,65 @@ def build_statement_ids_filter(statement_ids: list[str]) -> str:
     return ", ".join(f"'{sid}'" for sid in escaped_ids)
 
 
+# ============================================================================
+# PROMPTS BY STATEMENT IDS - Server-side statement -> Genie prompt lookup
+# ============================================================================
+
+# Message content that is SQL rather than a question (mirrors _looks_like_sql
+# in services/databricks_client.py; backslashes are doubled for the SQL literal)
+_SQL_CONTENT_PATTERN = r"(?i)^\\s*(SELECT|WITH|INSERT|UPDATE|DELETE|CREATE)\\b"
+
+# Query history records which Genie conversation issued each statement; the
+# prompt is the first non-SQL message posted to that conversation before
+# the statement started (the Genie API fallback applies the same rule).
+PROMPTS_BY_STATEMENT_IDS = f"""
+WITH genie_queries AS (
+    SELECT
+        statement_id,
+        query_source.genie_conversation_id AS conversation_id,
+        start_time
+    FROM {QUERY_HISTORY_TABLE}
+    WHERE query_source.genie_space_id = '{{space_id}}'
+      AND statement_id IN ({{statement_ids}})
+      AND start_time >= current_timestamp() - INTERVAL {{hours}} HOUR
+),
+genie_messages AS (
+    SELECT
+        request_params.conversation_id AS conversation_id,
+        request_params.content AS content,
+        event_time
+    FROM {AUDIT_TABLE}
+    WHERE service_name = 'aibiGenie'
+      AND action_name IN (
+          'genieStartConversationMessage',
+          'genieCreateConversationMessage',
+          'createConversationMessage'
+      )
+      AND request_params.space_id = '{{space_id}}'
+      AND event_date >= current_timestamp() - INTERVAL {{hours}} HOUR
+      AND request_params.content IS NOT NULL
+      AND NOT request_params.content RLIKE '{_SQL_CONTENT_PATTERN}'
+)
+SELECT
+    q.statement_id,
+    min_by(m.content, m.event_time) AS prompt
+FROM genie_queries q
+JOIN genie_messages m
+  ON m.conversation_id = q.conversation_id
+ AND m.event_time <= q.start_time
+GROUP BY q.statement_id
+"""
+
+
+def get_prompts_by_statement_ids_query(space_id: str, statement_ids: list[str], hours: int = 720) -> str:
+    """Build query mapping statement IDs to the Genie prompts that produced them."""
+    return PROMPTS_BY_STATEMENT_IDS.format(
+        space_id=space_id.replace("'", "''"),
+        statement_ids=build_statement_ids_filter(statement_ids),
+        hours=hours,
+    )
+
+
 # ============================================================================
 # QUERIES BY SPACE WITH TIMING - For time-based message correlation
 # ============================================================================
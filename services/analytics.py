@@ -5,23 +5,28 @@ Provides bottleneck classification, query timeline generation,
 and optimization recommendations for Genie queries.
 """
 
+from bisect import bisect_right
 from typing import Optional
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+
+import pandas as pd
 
 from queries.sql import QUERY_HISTORY_TABLE, AUDIT_TABLE
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class QueryOptimization:
     """Represents a query optimization recommendation."""
-    category: str  # performance, cost, reliability
-    severity: str  # high, medium, low
+    category: str  # one of the CATEGORY_* constants
+    severity: str  # one of the SEVERITY_* constants
     title: str
     description: str
     recommendation: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class QueryTimeline:
     """Represents a phase in the query execution timeline."""
     phase: str
@@ -30,20 +35,190 @@ class QueryTimeline:
     percentage: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DiagnosticQuery:
-    """Represents a recommended diagnostic SQL query."""
+    """
+    Represents a recommended diagnostic SQL query.
+    
+    The SQL is kept as a template plus its parameters and only rendered when
+    the sql property is read, so callers that show titles alone skip the work.
+    """
     title: str
     description: str
-    sql: str
     category: str  # statistics, performance, data, monitoring
+    sql_template: str
+    statement_id: str = ""
+    genie_space_id: str = ""
+    start_time: str = ""  # SQL timestamp literal text, empty when unknown
+    
+    @property
+    def sql(self) -> str:
+        """Copy-pastable SQL with the statement and space IDs filled in."""
+        return _render_diagnostic_sql(
+            self.sql_template, self.statement_id, self.genie_space_id, self.start_time
+        )
+
+
+@lru_cache(maxsize=1024)
+def _render_diagnostic_sql(
+    template: str,
+    statement_id: str,
+    genie_space_id: str,
+    start_time: str = "",
+) -> str:
+    """Format a diagnostic SQL template (memoized)."""
+    return template.format(
+        statement_id=statement_id, genie_space_id=genie_space_id, start_time=start_time
+    )
+
+
+# ============================================================================
+# OPTIMIZATION VOCABULARY - Shared severity and category values
+# ============================================================================
+
+SEVERITY_HIGH = "high"
+SEVERITY_MEDIUM = "medium"
+SEVERITY_LOW = "low"
+
+CATEGORY_PERFORMANCE = "performance"
+CATEGORY_INFRASTRUCTURE = "infrastructure"
+CATEGORY_QUERY_DESIGN = "query_design"
+CATEGORY_DATA_DESIGN = "data_design"
+CATEGORY_AI_PROCESSING = "ai_processing"
+
+
+# ============================================================================
+# OPTIMIZATION TEXT - Static titles and recommendation bodies, built once at import
+# ============================================================================
+
+_TITLE_COMPUTE_STARTUP = "⏳ Compute Startup Delay"
+_TITLE_QUEUE_WAIT = "🚦 Query Queue Congestion"
+_TITLE_COMPILATION = "🔧 Complex Query Compilation"
+_TITLE_LARGE_SCAN = "📊 Large Data Scan ({:.1f} GB)"
+_TITLE_SLOW_EXECUTION = "🐢 Slow Query Execution ({:.1f}s)"
+_TITLE_AI_OVERHEAD = "🤖 High AI Processing Time ({:.1f}s)"
+_TITLE_LOW_SELECTIVITY = "🎯 Low Row Selection Efficiency"
+_TITLE_NORMAL = "✅ Query Performing Well"
+
+_REC_COMPUTE_STARTUP = (
+    "**Immediate actions:**\n"
+    "• Switch to Serverless SQL Warehouse for instant startup (< 5s)\n"
+    "• Increase auto-suspend timeout to 30+ minutes during business hours\n\n"
+    "**Configuration changes:**\n"
+    "• Enable 'Pre-warming' in warehouse settings\n"
+    "• Set min clusters > 0 during peak hours\n"
+    "• Schedule a lightweight query every 10 min to keep warehouse warm"
+)
+
+_REC_QUEUE_WAIT = (
+    "**Immediate actions:**\n"
+    "• Increase warehouse size (e.g., Medium → Large)\n"
+    "• Enable auto-scaling with max clusters = 3-5\n\n"
+    "**Architectural improvements:**\n"
+    "• Create separate warehouses for different workloads (BI vs Genie)\n"
+    "• Schedule batch analytics during off-peak hours\n"
+    "• Use query queues with priorities (premium users first)"
+)
+
+_REC_COMPILATION = (
+    "**Query simplification:**\n"
+    "• Break query into multiple smaller CTEs or temporary views\n"
+    "• Reduce the number of JOINs (aim for < 5 tables)\n"
+    "• Replace SELECT * with explicit column lists\n\n"
+    "**Genie configuration:**\n"
+    "• Review table instructions to guide simpler queries\n"
+    "• Add sample queries showing preferred join patterns\n"
+    "• Consider pre-aggregating complex metrics into summary tables"
+)
+
+_REC_LARGE_SCAN = (
+    "**Add partition filters:**\n"
+    "• Filter on partition columns (date, region, etc.) in WHERE clause\n"
+    "• Ensure Genie instructions mention partition columns for filtering\n\n"
+    "**Optimize table design:**\n"
+    "• Use Z-ORDER on frequently filtered columns\n"
+    "• Enable Predictive Optimization for automatic Z-ORDER\n"
+    "• Create aggregated/summary tables for common analytics\n\n"
+    "**Column pruning:**\n"
+    "• Select only required columns instead of SELECT *\n"
+    "• Consider columnar format (Delta) if not already using"
+)
+
+_REC_SLOW_EXECUTION = (
+    "**Query optimization:**\n"
+    "• Review Query Profile in SQL Editor for bottleneck stages\n"
+    "• Check for Cartesian products or missing join conditions\n"
+    "• Add filters early in CTEs to reduce intermediate data\n\n"
+    "**Join optimization:**\n"
+    "• Put smaller tables on the right side of JOINs\n"
+    "• Use broadcast hints for small dimension tables\n"
+    "• Consider denormalizing frequently joined tables\n\n"
+    "**Statistics & caching:**\n"
+    "• Run ANALYZE TABLE to update statistics\n"
+    "• Enable result caching for repeated queries\n"
+    "• Use materialized views for complex aggregations"
+)
+
+_REC_AI_OVERHEAD = (
+    "**Improve Genie instructions:**\n"
+    "• Add clear table descriptions with business context\n"
+    "• Include column descriptions for ambiguous field names\n"
+    "• Provide sample questions and their expected queries\n\n"
+    "**Simplify data model:**\n"
+    "• Reduce the number of tables in the Genie space\n"
+    "• Create views with business-friendly names\n"
+    "• Pre-join commonly related tables\n\n"
+    "**Question phrasing:**\n"
+    "• Use specific table/column names when possible\n"
+    "• Break complex questions into simpler parts\n"
+    "• Avoid ambiguous terms that require interpretation"
+)
+
+_REC_LOW_SELECTIVITY = (
+    "**Improve filtering:**\n"
+    "• Add more selective WHERE conditions\n"
+    "• Filter on indexed or Z-ORDERed columns\n"
+    "• Consider creating filtered views for common subsets\n\n"
+    "**Data organization:**\n"
+    "• Partition table by commonly filtered columns\n"
+    "• Run OPTIMIZE with Z-ORDER on filter columns\n"
+    "• Update table statistics with ANALYZE TABLE"
+)
+
+_REC_NORMAL = (
+    "**Maintain good performance:**\n"
+    "• Continue monitoring for performance degradation\n"
+    "• Run OPTIMIZE periodically to prevent data fragmentation\n"
+    "• Keep table statistics up to date with ANALYZE TABLE\n"
+    "• Review Query Profile occasionally for optimization opportunities"
+)
+
+
+_BOTTLENECK_RECS = {
+    "COMPUTE_STARTUP": "Switch to Serverless SQL Warehouse or increase auto-suspend timeout",
+    "QUEUE_WAIT": "Scale up warehouse size, enable auto-scaling, or distribute workloads",
+    "COMPILATION": "Simplify query structure, reduce JOINs, or break into smaller CTEs",
+    "LARGE_SCAN": "Add partition filters, use Z-ORDER, or select only needed columns",
+    "SLOW_EXECUTION": "Review Query Profile, optimize JOINs, or create materialized views",
+    "NORMAL": "Query performing well - continue monitoring",
+}
+_DEFAULT_BOTTLENECK_REC = "Review Query Profile for specific optimization opportunities"
+
+# Speed category boundaries (ms): < 5s FAST, < 10s MODERATE, < 30s SLOW, else CRITICAL
+_SPEED_THRESHOLDS_MS = (5000, 10000, 30000)
+_SPEED_CATEGORIES = ("FAST", "MODERATE", "SLOW", "CRITICAL")
 
 
 def _to_int(value, default: int = 0) -> int:
     """Safely convert a value to int, handling None and strings."""
     if value is None:
         return default
+    # Fast path: most callers already pass ints
+    if type(value) is int:
+        return value
     try:
+        if isinstance(value, float):
+            return int(value)
         return int(float(value))
     except (ValueError, TypeError):
         return default
@@ -53,12 +228,30 @@ def _to_float(value, default: float = 0.0) -> float:
     """Safely convert a value to float, handling None and strings."""
     if value is None:
         return default
+    # Fast path: skip the conversion when the value is already a float
+    if type(value) is float:
+        return value
     try:
         return float(value)
     except (ValueError, TypeError):
         return default
 
 
+def _to_sql_timestamp(value) -> str:
+    """Render a timestamp-like value as UTC 'YYYY-MM-DD HH:MM:SS.ffffff', or '' if unparseable."""
+    if value is None or value == "":
+        return ""
+    try:
+        ts = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return ""
+    if ts is pd.NaT:
+        return ""
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
 def classify_bottleneck(
     compilation_ms,
     execution_ms,
@@ -92,17 +285,13 @@ def classify_bottleneck(
     if total_ms <= 0:
         return "NORMAL"
     
-    # Calculate percentages
-    queue_pct = queue_wait_ms / total_ms
-    compute_pct = compute_wait_ms / total_ms
-    comp_pct = compilation_ms / total_ms
-    
-    # Classify based on thresholds
-    if compute_pct > 0.5:
+    # Classify based on share-of-total thresholds, cross-multiplied so each
+    # check is an integer compare and no ratio is computed unless needed
+    if compute_wait_ms * 2 > total_ms:  # > 50%
         return "COMPUTE_STARTUP"
-    if queue_pct > 0.3:
+    if queue_wait_ms * 10 > total_ms * 3:  # > 30%
         return "QUEUE_WAIT"
-    if comp_pct > 0.4:
+    if compilation_ms * 5 > total_ms * 2:  # > 40%
         return "COMPILATION"
     if bytes_scanned > 1073741824:  # 1 GB
         return "LARGE_SCAN"
@@ -112,7 +301,23 @@ def classify_bottleneck(
     return "NORMAL"
 
 
-def get_query_timeline(query: dict) -> list[QueryTimeline]:
+def _get_or_alias(query: dict, key: str, alias: str):
+    """Read key, falling back to alias only when key is missing or None (so 0 is kept)."""
+    value = query.get(key)
+    return query.get(alias) if value is None else value
+
+
+# Timeline phases in execution order: (display name, query dict key)
+_TIMELINE_PHASES = (
+    ("Queue Wait", "queue_wait_ms"),
+    ("Compute Startup", "compute_wait_ms"),
+    ("Compilation", "compilation_ms"),
+    ("Execution", "execution_ms"),
+    ("Result Fetch", "result_fetch_ms"),
+)
+
+
+def get_query_timeline(query: dict) -> tuple[QueryTimeline, ...]:
     """
     Generate a timeline of query execution phases.
     
@@ -120,39 +325,183 @@ def get_query_timeline(query: dict) -> list[QueryTimeline]:
         query: Query dict with timing fields
         
     Returns:
-        List of QueryTimeline objects
+        Tuple of QueryTimeline objects, one per phase
     """
     total_ms = _to_int(query.get("total_duration_ms") or query.get("duration_ms"), 0)
     if total_ms <= 0:
         total_ms = 1
     
-    phases = [
-        ("Queue Wait", _to_int(query.get("queue_wait_ms"))),
-        ("Compute Startup", _to_int(query.get("compute_wait_ms"))),
-        ("Compilation", _to_int(query.get("compilation_ms"))),
-        ("Execution", _to_int(query.get("execution_ms"))),
-        ("Result Fetch", _to_int(query.get("result_fetch_ms"))),
-    ]
-    
-    timeline = []
-    current_start = 0
+    durations = [_to_int(query.get(key)) for _, key in _TIMELINE_PHASES]
     
-    for phase_name, duration in phases:
-        percentage = round((duration / total_ms) * 100, 1)
-        
-        timeline.append(QueryTimeline(
+    # Percentage to one decimal place, rounded half-up in integer math
+    return tuple(
+        QueryTimeline(
             phase=phase_name,
-            start_ms=current_start,
+            start_ms=start,
             duration_ms=duration,
-            percentage=percentage,
-        ))
-        
-        current_start += duration
+            percentage=((duration * 2000 + total_ms) // (2 * total_ms)) / 10.0,
+        )
+        for (phase_name, _), start, duration in zip(
+            _TIMELINE_PHASES, accumulate(durations, initial=0), durations
+        )
+    )
+
+
+@dataclass(slots=True, frozen=True)
+class _Metrics:
+    """Normalized query metrics used to pick optimization recommendations."""
+    bottleneck: str
+    compilation_ms: int
+    execution_ms: int
+    queue_wait_ms: int
+    compute_wait_ms: int
+    bytes_scanned: int
+    rows_scanned: int
+    rows_returned: int
+    ai_overhead_sec: float
     
-    return timeline
+    @classmethod
+    def from_query(cls, query: dict) -> "_Metrics":
+        """
+        Extract metrics from a query dict in a single pass.
+        
+        Alias keys (duration_ms, read_rows, produced_rows) are only consulted when
+        the primary key is missing or None, so an explicit 0 is kept as 0.
+        """
+        get = query.get
+        duration_ms = _get_or_alias(query, "total_duration_ms", "duration_ms")
+        rows_scanned = _get_or_alias(query, "rows_scanned", "read_rows")
+        rows_returned = _get_or_alias(query, "rows_returned", "produced_rows")
+        
+        compilation_ms = _to_int(get("compilation_ms"))
+        execution_ms = _to_int(get("execution_ms"))
+        queue_wait_ms = _to_int(get("queue_wait_ms"))
+        compute_wait_ms = _to_int(get("compute_wait_ms"))
+        bytes_scanned = _to_int(get("bytes_scanned"))
+        
+        bottleneck = get("bottleneck", "") or classify_bottleneck(
+            compilation_ms, execution_ms, queue_wait_ms,
+            compute_wait_ms, _to_int(duration_ms), bytes_scanned
+        )
+        
+        return cls(
+            bottleneck=bottleneck,
+            compilation_ms=compilation_ms,
+            execution_ms=execution_ms,
+            queue_wait_ms=queue_wait_ms,
+            compute_wait_ms=compute_wait_ms,
+            bytes_scanned=bytes_scanned,
+            rows_scanned=_to_int(rows_scanned),
+            rows_returned=_to_int(rows_returned),
+            ai_overhead_sec=_to_float(get("ai_overhead_sec")),
+        )
+
+
+def _opt_compute_startup(m: _Metrics) -> QueryOptimization:
+    """Warehouse cold start issues."""
+    wait_sec = m.compute_wait_ms / 1000
+    return QueryOptimization(
+        category=CATEGORY_INFRASTRUCTURE,
+        severity=SEVERITY_HIGH if wait_sec > 60 else SEVERITY_MEDIUM,
+        title=_TITLE_COMPUTE_STARTUP,
+        description=f"Waited {wait_sec:.1f}s for compute resources. The SQL warehouse was likely suspended or scaling up.",
+        recommendation=_REC_COMPUTE_STARTUP,
+    )
+
+
+def _opt_queue_wait(m: _Metrics) -> QueryOptimization:
+    """Warehouse capacity issues."""
+    wait_sec = m.queue_wait_ms / 1000
+    return QueryOptimization(
+        category=CATEGORY_INFRASTRUCTURE,
+        severity=SEVERITY_HIGH if wait_sec > 30 else SEVERITY_MEDIUM,
+        title=_TITLE_QUEUE_WAIT,
+        description=f"Query waited {wait_sec:.1f}s in queue. The warehouse is at capacity with concurrent queries.",
+        recommendation=_REC_QUEUE_WAIT,
+    )
+
+
+def _opt_compilation(m: _Metrics) -> QueryOptimization:
+    """Complex query structure."""
+    compile_sec = m.compilation_ms / 1000
+    return QueryOptimization(
+        category=CATEGORY_QUERY_DESIGN,
+        severity=SEVERITY_HIGH if compile_sec > 15 else SEVERITY_MEDIUM,
+        title=_TITLE_COMPILATION,
+        description=f"Compilation took {compile_sec:.1f}s. Query structure is too complex for efficient planning.",
+        recommendation=_REC_COMPILATION,
+    )
+
+
+def _opt_large_scan(m: _Metrics) -> QueryOptimization:
+    """Data access inefficiency."""
+    gb_scanned = m.bytes_scanned / (1024 * 1024 * 1024)
+    return QueryOptimization(
+        category=CATEGORY_DATA_DESIGN,
+        severity=SEVERITY_HIGH if gb_scanned > 10 else SEVERITY_MEDIUM,
+        title=_TITLE_LARGE_SCAN.format(gb_scanned),
+        description=f"Query scanned {gb_scanned:.2f} GB of data, which impacts performance and cost.",
+        recommendation=_REC_LARGE_SCAN,
+    )
+
+
+def _opt_slow_execution(m: _Metrics) -> QueryOptimization:
+    """Query execution inefficiency."""
+    exec_sec = m.execution_ms / 1000
+    return QueryOptimization(
+        category=CATEGORY_QUERY_DESIGN,
+        severity=SEVERITY_HIGH if exec_sec > 120 else SEVERITY_MEDIUM,
+        title=_TITLE_SLOW_EXECUTION.format(exec_sec),
+        description=f"Execution took {exec_sec:.1f}s. Query operations (joins, aggregations) are expensive.",
+        recommendation=_REC_SLOW_EXECUTION,
+    )
+
+
+def _opt_ai_overhead(m: _Metrics) -> QueryOptimization:
+    """GenAI processing time."""
+    return QueryOptimization(
+        category=CATEGORY_AI_PROCESSING,
+        severity=SEVERITY_HIGH if m.ai_overhead_sec > 30 else SEVERITY_MEDIUM,
+        title=_TITLE_AI_OVERHEAD.format(m.ai_overhead_sec),
+        description=f"Genie spent {m.ai_overhead_sec:.1f}s understanding the question and generating SQL.",
+        recommendation=_REC_AI_OVERHEAD,
+    )
+
+
+def _opt_low_selectivity(m: _Metrics) -> QueryOptimization:
+    """Inefficient filtering."""
+    selectivity = m.rows_returned / m.rows_scanned
+    return QueryOptimization(
+        category=CATEGORY_DATA_DESIGN,
+        severity=SEVERITY_LOW,
+        title=_TITLE_LOW_SELECTIVITY,
+        description=f"Only {m.rows_returned:,} rows returned from {m.rows_scanned:,} scanned ({selectivity * 100:.4f}% selectivity).",
+        recommendation=_REC_LOW_SELECTIVITY,
+    )
+
 
+# (predicate, builder) pairs evaluated in order; every matching rule contributes
+_OPTIMIZATION_RULES = (
+    (lambda m: m.bottleneck == "COMPUTE_STARTUP" or m.compute_wait_ms > 30000, _opt_compute_startup),
+    (lambda m: m.bottleneck == "QUEUE_WAIT" or m.queue_wait_ms > 10000, _opt_queue_wait),
+    (lambda m: m.bottleneck == "COMPILATION" or m.compilation_ms > 5000, _opt_compilation),
+    (lambda m: m.bottleneck == "LARGE_SCAN" or m.bytes_scanned > 1073741824, _opt_large_scan),
+    (lambda m: m.bottleneck == "SLOW_EXECUTION" or m.execution_ms > 60000, _opt_slow_execution),
+    (lambda m: m.ai_overhead_sec > 10, _opt_ai_overhead),
+    (lambda m: m.rows_scanned > 1000000 and 0 < m.rows_returned < m.rows_scanned * 0.001, _opt_low_selectivity),
+)
 
-def get_query_optimizations(query: dict) -> list[QueryOptimization]:
+# Returned when no rule matches - the query is performing well
+_OPT_NORMAL = QueryOptimization(
+    category=CATEGORY_PERFORMANCE,
+    severity=SEVERITY_LOW,
+    title=_TITLE_NORMAL,
+    description="This query is executing within expected performance parameters.",
+    recommendation=_REC_NORMAL,
+)
+
+
+def get_query_optimizations(query: dict) -> tuple[QueryOptimization, ...]:
     """
     Generate optimization recommendations for a query based on bottleneck type.
     
@@ -160,207 +509,16 @@ def get_query_optimizations(query: dict) -> list[QueryOptimization]:
         query: Query dict with metrics and timing fields
         
     Returns:
-        List of QueryOptimization objects with specific, actionable recommendations
+        Tuple of QueryOptimization objects with specific, actionable recommendations
     """
-    optimizations = []
-    
-    # Extract metrics with safe conversion
-    duration_ms = _to_int(query.get("total_duration_ms") or query.get("duration_ms"))
-    compilation_ms = _to_int(query.get("compilation_ms"))
-    execution_ms = _to_int(query.get("execution_ms"))
-    queue_wait_ms = _to_int(query.get("queue_wait_ms"))
-    compute_wait_ms = _to_int(query.get("compute_wait_ms"))
-    bytes_scanned = _to_int(query.get("bytes_scanned"))
-    rows_scanned = _to_int(query.get("rows_scanned") or query.get("read_rows"))
-    rows_returned = _to_int(query.get("rows_returned") or query.get("produced_rows"))
-    ai_overhead_sec = _to_float(query.get("ai_overhead_sec"))
-    
-    bottleneck = query.get("bottleneck", "") or classify_bottleneck(
-        compilation_ms, execution_ms, queue_wait_ms, 
-        compute_wait_ms, duration_ms, bytes_scanned
-    )
-    
-    # ==========================================================================
-    # COMPUTE STARTUP - Warehouse cold start issues
-    # ==========================================================================
-    if bottleneck == "COMPUTE_STARTUP" or compute_wait_ms > 30000:
-        wait_sec = compute_wait_ms / 1000
-        optimizations.append(QueryOptimization(
-            category="infrastructure",
-            severity="high" if wait_sec > 60 else "medium",
-            title="⏳ Compute Startup Delay",
-            description=f"Waited {wait_sec:.1f}s for compute resources. The SQL warehouse was likely suspended or scaling up.",
-            recommendation=(
-                "**Immediate actions:**\n"
-                "• Switch to Serverless SQL Warehouse for instant startup (< 5s)\n"
-                "• Increase auto-suspend timeout to 30+ minutes during business hours\n\n"
-                "**Configuration changes:**\n"
-                "• Enable 'Pre-warming' in warehouse settings\n"
-                "• Set min clusters > 0 during peak hours\n"
-                "• Schedule a lightweight query every 10 min to keep warehouse warm"
-            ),
-        ))
-    
-    # ==========================================================================
-    # QUEUE WAIT - Warehouse capacity issues
-    # ==========================================================================
-    if bottleneck == "QUEUE_WAIT" or queue_wait_ms > 10000:
-        wait_sec = queue_wait_ms / 1000
-        optimizations.append(QueryOptimization(
-            category="infrastructure",
-            severity="high" if wait_sec > 30 else "medium",
-            title="🚦 Query Queue Congestion",
-            description=f"Query waited {wait_sec:.1f}s in queue. The warehouse is at capacity with concurrent queries.",
-            recommendation=(
-                "**Immediate actions:**\n"
-                "• Increase warehouse size (e.g., Medium → Large)\n"
-                "• Enable auto-scaling with max clusters = 3-5\n\n"
-                "**Architectural improvements:**\n"
-                "• Create separate warehouses for different workloads (BI vs Genie)\n"
-                "• Schedule batch analytics during off-peak hours\n"
-                "• Use query queues with priorities (premium users first)"
-            ),
-        ))
-    
-    # ==========================================================================
-    # COMPILATION - Complex query structure
-    # ==========================================================================
-    if bottleneck == "COMPILATION" or compilation_ms > 5000:
-        compile_sec = compilation_ms / 1000
-        optimizations.append(QueryOptimization(
-            category="query_design",
-            severity="high" if compile_sec > 15 else "medium",
-            title="🔧 Complex Query Compilation",
-            description=f"Compilation took {compile_sec:.1f}s. Query structure is too complex for efficient planning.",
-            recommendation=(
-                "**Query simplification:**\n"
-                "• Break query into multiple smaller CTEs or temporary views\n"
-                "• Reduce the number of JOINs (aim for < 5 tables)\n"
-                "• Replace SELECT * with explicit column lists\n\n"
-                "**Genie configuration:**\n"
-                "• Review table instructions to guide simpler queries\n"
-                "• Add sample queries showing preferred join patterns\n"
-                "• Consider pre-aggregating complex metrics into summary tables"
-            ),
-        ))
-    
-    # ==========================================================================
-    # LARGE SCAN - Data access inefficiency
-    # ==========================================================================
-    if bottleneck == "LARGE_SCAN" or bytes_scanned > 1073741824:
-        gb_scanned = bytes_scanned / (1024 * 1024 * 1024)
-        optimizations.append(QueryOptimization(
-            category="data_design",
-            severity="high" if gb_scanned > 10 else "medium",
-            title="📊 Large Data Scan ({:.1f} GB)".format(gb_scanned),
-            description=f"Query scanned {gb_scanned:.2f} GB of data, which impacts performance and cost.",
-            recommendation=(
-                "**Add partition filters:**\n"
-                "• Filter on partition columns (date, region, etc.) in WHERE clause\n"
-                "• Ensure Genie instructions mention partition columns for filtering\n\n"
-                "**Optimize table design:**\n"
-                "• Use Z-ORDER on frequently filtered columns\n"
-                "• Enable Predictive Optimization for automatic Z-ORDER\n"
-                "• Create aggregated/summary tables for common analytics\n\n"
-                "**Column pruning:**\n"
-                "• Select only required columns instead of SELECT *\n"
-                "• Consider columnar format (Delta) if not already using"
-            ),
-        ))
-    
-    # ==========================================================================
-    # SLOW EXECUTION - Query execution inefficiency
-    # ==========================================================================
-    if bottleneck == "SLOW_EXECUTION" or execution_ms > 60000:
-        exec_sec = execution_ms / 1000
-        optimizations.append(QueryOptimization(
-            category="query_design",
-            severity="high" if exec_sec > 120 else "medium",
-            title="🐢 Slow Query Execution ({:.1f}s)".format(exec_sec),
-            description=f"Execution took {exec_sec:.1f}s. Query operations (joins, aggregations) are expensive.",
-            recommendation=(
-                "**Query optimization:**\n"
-                "• Review Query Profile in SQL Editor for bottleneck stages\n"
-                "• Check for Cartesian products or missing join conditions\n"
-                "• Add filters early in CTEs to reduce intermediate data\n\n"
-                "**Join optimization:**\n"
-                "• Put smaller tables on the right side of JOINs\n"
-                "• Use broadcast hints for small dimension tables\n"
-                "• Consider denormalizing frequently joined tables\n\n"
-                "**Statistics & caching:**\n"
-                "• Run ANALYZE TABLE to update statistics\n"
-                "• Enable result caching for repeated queries\n"
-                "• Use materialized views for complex aggregations"
-            ),
-        ))
-    
-    # ==========================================================================
-    # AI OVERHEAD - GenAI processing time
-    # ==========================================================================
-    if ai_overhead_sec > 10:
-        optimizations.append(QueryOptimization(
-            category="ai_processing",
-            severity="high" if ai_overhead_sec > 30 else "medium",
-            title="🤖 High AI Processing Time ({:.1f}s)".format(ai_overhead_sec),
-            description=f"Genie spent {ai_overhead_sec:.1f}s understanding the question and generating SQL.",
-            recommendation=(
-                "**Improve Genie instructions:**\n"
-                "• Add clear table descriptions with business context\n"
-                "• Include column descriptions for ambiguous field names\n"
-                "• Provide sample questions and their expected queries\n\n"
-                "**Simplify data model:**\n"
-                "• Reduce the number of tables in the Genie space\n"
-                "• Create views with business-friendly names\n"
-                "• Pre-join commonly related tables\n\n"
-                "**Question phrasing:**\n"
-                "• Use specific table/column names when possible\n"
-                "• Break complex questions into simpler parts\n"
-                "• Avoid ambiguous terms that require interpretation"
-            ),
-        ))
-    
-    # ==========================================================================
-    # LOW SELECTIVITY - Inefficient filtering
-    # ==========================================================================
-    if rows_scanned > 1000000 and rows_returned > 0:
-        selectivity = rows_returned / rows_scanned
-        if selectivity < 0.001:
-            optimizations.append(QueryOptimization(
-                category="data_design",
-                severity="low",
-                title="🎯 Low Row Selection Efficiency",
-                description=f"Only {rows_returned:,} rows returned from {rows_scanned:,} scanned ({selectivity * 100:.4f}% selectivity).",
-                recommendation=(
-                    "**Improve filtering:**\n"
-                    "• Add more selective WHERE conditions\n"
-                    "• Filter on indexed or Z-ORDERed columns\n"
-                    "• Consider creating filtered views for common subsets\n\n"
-                    "**Data organization:**\n"
-                    "• Partition table by commonly filtered columns\n"
-                    "• Run OPTIMIZE with Z-ORDER on filter columns\n"
-                    "• Update table statistics with ANALYZE TABLE"
-                ),
-            ))
-    
-    # ==========================================================================
-    # NORMAL - Query performing well
-    # ==========================================================================
-    if not optimizations:
-        optimizations.append(QueryOptimization(
-            category="performance",
-            severity="low",
-            title="✅ Query Performing Well",
-            description="This query is executing within expected performance parameters.",
-            recommendation=(
-                "**Maintain good performance:**\n"
-                "• Continue monitoring for performance degradation\n"
-                "• Run OPTIMIZE periodically to prevent data fragmentation\n"
-                "• Keep table statistics up to date with ANALYZE TABLE\n"
-                "• Review Query Profile occasionally for optimization opportunities"
-            ),
-        ))
-    
-    return optimizations
+    return _build_optimizations(_Metrics.from_query(query))
+
+
+@lru_cache(maxsize=512)
+def _build_optimizations(metrics: _Metrics) -> tuple[QueryOptimization, ...]:
+    """Apply the optimization rules to a set of normalized metrics (memoized)."""
+    optimizations = tuple(build(metrics) for matches, build in _OPTIMIZATION_RULES if matches(metrics))
+    return optimizations or (_OPT_NORMAL,)
 
 
 def get_bottleneck_recommendation(bottleneck: str) -> str:
@@ -373,16 +531,7 @@ def get_bottleneck_recommendation(bottleneck: str) -> str:
     Returns:
         Recommendation string
     """
-    recommendations = {
-        "COMPUTE_STARTUP": "Switch to Serverless SQL Warehouse or increase auto-suspend timeout",
-        "QUEUE_WAIT": "Scale up warehouse size, enable auto-scaling, or distribute workloads",
-        "COMPILATION": "Simplify query structure, reduce JOINs, or break into smaller CTEs",
-        "LARGE_SCAN": "Add partition filters, use Z-ORDER, or select only needed columns",
-        "SLOW_EXECUTION": "Review Query Profile, optimize JOINs, or create materialized views",
-        "NORMAL": "Query performing well - continue monitoring",
-    }
-    
-    return recommendations.get(bottleneck, "Review Query Profile for specific optimization opportunities")
+    return _BOTTLENECK_RECS.get(bottleneck, _DEFAULT_BOTTLENECK_REC)
 
 
 def get_speed_category(duration_ms) -> str:
@@ -395,46 +544,14 @@ def get_speed_category(duration_ms) -> str:
     Returns:
         Speed category string (FAST, MODERATE, SLOW, CRITICAL)
     """
-    duration_ms = _to_int(duration_ms)
-    if duration_ms >= 30000:
-        return "CRITICAL"
-    if duration_ms >= 10000:
-        return "SLOW"
-    if duration_ms >= 5000:
-        return "MODERATE"
-    return "FAST"
+    return _SPEED_CATEGORIES[bisect_right(_SPEED_THRESHOLDS_MS, _to_int(duration_ms))]
 
 
-def get_diagnostic_queries(query: dict) -> list[DiagnosticQuery]:
-    """
-    Generate recommended diagnostic SQL queries based on the query's bottleneck type.
-    
-    These queries help users investigate and resolve performance issues.
-    
-    Args:
-        query: Query dict with metrics including bottleneck, table names, etc.
-        
-    Returns:
-        List of DiagnosticQuery objects with copy-pastable SQL
-    """
-    queries = []
-    
-    bottleneck = query.get("bottleneck", "NORMAL")
-    statement_id = query.get("statement_id", "")
-    genie_space_id = query.get("genie_space_id", "")
-    
-    # Extract table name from query text if available
-    query_text = query.get("query_text", "") or ""
-    
-    # ==========================================================================
-    # ALWAYS INCLUDE: Query History Details
-    # ==========================================================================
-    if statement_id:
-        queries.append(DiagnosticQuery(
-            title="Query Execution Details",
-            description="Get full execution details for this specific query from query history",
-            category="monitoring",
-            sql=f"""-- Full execution details for this query
+# ============================================================================
+# DIAGNOSTIC SQL TEMPLATES - Formatted with statement_id and genie_space_id
+# ============================================================================
+
+_SQL_QUERY_DETAILS = f"""-- Full execution details for this query
 SELECT 
     statement_id,
     executed_by,
@@ -451,18 +568,9 @@ SELECT
     waiting_at_capacity_duration_ms,
     statement_text
 FROM {QUERY_HISTORY_TABLE}
-WHERE statement_id = '{statement_id}'"""
-        ))
-    
-    # ==========================================================================
-    # COMPUTE STARTUP - Warehouse diagnostics
-    # ==========================================================================
-    if bottleneck == "COMPUTE_STARTUP":
-        queries.append(DiagnosticQuery(
-            title="Warehouse Cold Start Analysis",
-            description="Analyze how often this warehouse experiences cold starts",
-            category="performance",
-            sql=f"""-- Analyze cold start frequency for the warehouse
+WHERE statement_id = '{{statement_id}}'"""
+
+_SQL_COLD_START_ANALYSIS = f"""-- Analyze cold start frequency for the warehouse
 SELECT 
     warehouse_id,
     DATE(start_time) AS query_date,
@@ -471,17 +579,12 @@ SELECT
     ROUND(100.0 * SUM(CASE WHEN waiting_for_compute_duration_ms > 10000 THEN 1 ELSE 0 END) / COUNT(*), 1) AS cold_start_pct,
     ROUND(AVG(waiting_for_compute_duration_ms) / 1000.0, 1) AS avg_startup_sec
 FROM {QUERY_HISTORY_TABLE}
-WHERE query_source.genie_space_id = '{genie_space_id}'
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
     AND start_time >= current_timestamp() - INTERVAL 7 DAY
 GROUP BY warehouse_id, DATE(start_time)
 ORDER BY query_date DESC"""
-        ))
-        
-        queries.append(DiagnosticQuery(
-            title="Warehouse Usage Gaps",
-            description="Find gaps in warehouse usage that cause cold starts",
-            category="performance",
-            sql="""-- Find time gaps between queries (causing cold starts)
+
+_SQL_USAGE_GAPS = f"""-- Find time gaps between queries (causing cold starts)
 WITH query_times AS (
     SELECT 
         start_time,
@@ -499,17 +602,8 @@ FROM query_times
 WHERE prev_end_time IS NOT NULL
 GROUP BY DATE_TRUNC('hour', start_time)
 ORDER BY hour DESC"""
-        ))
-    
-    # ==========================================================================
-    # QUEUE WAIT - Concurrency diagnostics
-    # ==========================================================================
-    if bottleneck == "QUEUE_WAIT":
-        queries.append(DiagnosticQuery(
-            title="Peak Concurrency Analysis",
-            description="Find peak concurrent query periods causing queue wait",
-            category="performance",
-            sql=f"""-- Analyze concurrent query load by hour
+
+_SQL_PEAK_CONCURRENCY = f"""-- Analyze concurrent query load by hour
 SELECT 
     DATE_TRUNC('hour', start_time) AS hour,
     COUNT(*) AS total_queries,
@@ -517,19 +611,14 @@ SELECT
     MAX(waiting_at_capacity_duration_ms) / 1000.0 AS max_queue_sec,
     SUM(CASE WHEN waiting_at_capacity_duration_ms > 5000 THEN 1 ELSE 0 END) AS queued_queries
 FROM {QUERY_HISTORY_TABLE}
-WHERE query_source.genie_space_id = '{genie_space_id}'
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
     AND start_time >= current_timestamp() - INTERVAL 7 DAY
 GROUP BY DATE_TRUNC('hour', start_time)
 HAVING COUNT(*) > 5
 ORDER BY avg_queue_sec DESC
 LIMIT 20"""
-        ))
-        
-        queries.append(DiagnosticQuery(
-            title="Concurrent Running Queries",
-            description="See what other queries were running at the same time",
-            category="monitoring",
-            sql=f"""-- Find queries running concurrently with the slow query
+
+_SQL_CONCURRENT_QUERIES = f"""-- Find queries running concurrently with the slow query
 SELECT 
     statement_id,
     executed_by,
@@ -541,27 +630,18 @@ FROM {QUERY_HISTORY_TABLE}
 WHERE start_time >= (
     SELECT start_time - INTERVAL 5 MINUTE
     FROM {QUERY_HISTORY_TABLE} 
-    WHERE statement_id = '{statement_id}'
+    WHERE statement_id = '{{statement_id}}'
 )
 AND end_time <= (
     SELECT end_time + INTERVAL 5 MINUTE
     FROM {QUERY_HISTORY_TABLE} 
-    WHERE statement_id = '{statement_id}'
+    WHERE statement_id = '{{statement_id}}'
 )
-AND statement_id != '{statement_id}'
+AND statement_id != '{{statement_id}}'
 ORDER BY total_duration_ms DESC
 LIMIT 20"""
-        ))
-    
-    # ==========================================================================
-    # COMPILATION - Query complexity diagnostics
-    # ==========================================================================
-    if bottleneck == "COMPILATION":
-        queries.append(DiagnosticQuery(
-            title="High Compilation Time Queries",
-            description="Find other queries with high compilation times for pattern analysis",
-            category="performance",
-            sql=f"""-- Find queries with high compilation times
+
+_SQL_HIGH_COMPILATION = f"""-- Find queries with high compilation times
 SELECT 
     LEFT(statement_text, 300) AS query_preview,
     COUNT(*) AS occurrences,
@@ -569,23 +649,14 @@ SELECT
     ROUND(AVG(total_duration_ms) / 1000.0, 1) AS avg_total_sec,
     ROUND(100.0 * AVG(compilation_duration_ms) / NULLIF(AVG(total_duration_ms), 0), 0) AS compile_pct
 FROM {QUERY_HISTORY_TABLE}
-WHERE query_source.genie_space_id = '{genie_space_id}'
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
     AND start_time >= current_timestamp() - INTERVAL 7 DAY
     AND compilation_duration_ms > 2000
 GROUP BY LEFT(statement_text, 300)
 ORDER BY avg_compile_sec DESC
 LIMIT 10"""
-        ))
-    
-    # ==========================================================================
-    # LARGE SCAN - Data volume diagnostics
-    # ==========================================================================
-    if bottleneck == "LARGE_SCAN":
-        queries.append(DiagnosticQuery(
-            title="Table Scan Analysis",
-            description="Analyze data volumes being scanned by Genie queries",
-            category="data",
-            sql=f"""-- Analyze scan volumes for this Genie space
+
+_SQL_TABLE_SCAN = f"""-- Analyze scan volumes for this Genie space
 SELECT 
     DATE(start_time) AS query_date,
     COUNT(*) AS queries,
@@ -593,17 +664,12 @@ SELECT
     ROUND(AVG(read_bytes) / (1024*1024*1024), 2) AS avg_gb_per_query,
     ROUND(MAX(read_bytes) / (1024*1024*1024), 2) AS max_gb_scanned
 FROM {QUERY_HISTORY_TABLE}
-WHERE query_source.genie_space_id = '{genie_space_id}'
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
     AND start_time >= current_timestamp() - INTERVAL 7 DAY
 GROUP BY DATE(start_time)
 ORDER BY query_date DESC"""
-        ))
-        
-        queries.append(DiagnosticQuery(
-            title="Check Table Statistics",
-            description="Verify table statistics are up to date (run ANALYZE if stale)",
-            category="statistics",
-            sql="""-- Check table optimization status
+
+_SQL_TABLE_STATISTICS = """-- Check table optimization status
 -- Replace 'catalog.schema.table' with your actual table
 DESCRIBE DETAIL catalog.schema.your_table;
 
@@ -612,29 +678,29 @@ DESCRIBE HISTORY catalog.schema.your_table LIMIT 20;
 
 -- Update statistics (run if stale)
 -- ANALYZE TABLE catalog.schema.your_table COMPUTE STATISTICS;"""
-        ))
-        
-        queries.append(DiagnosticQuery(
-            title="Check Partition Columns",
-            description="View table partitioning to ensure filters use partition columns",
-            category="data",
-            sql="""-- View table schema and partitioning
+
+_SQL_PARTITION_COLUMNS = """-- View table schema and partitioning
 -- Replace 'catalog.schema.table' with your actual table
 DESCRIBE EXTENDED catalog.schema.your_table;
 
 -- Check if table has Z-ORDER clustering
 DESCRIBE DETAIL catalog.schema.your_table;"""
-        ))
-    
-    # ==========================================================================
-    # SLOW EXECUTION - Execution diagnostics
-    # ==========================================================================
-    if bottleneck == "SLOW_EXECUTION":
-        queries.append(DiagnosticQuery(
-            title="Similar Slow Queries",
-            description="Find similar queries to identify optimization patterns",
-            category="performance",
-            sql=f"""-- Find similar slow queries for pattern analysis
+
+_SQL_DATA_SKIPPING = f"""-- File pruning achieved by this Genie space's queries
+SELECT 
+    statement_id,
+    start_time,
+    COALESCE(read_files, 0) AS read_files,
+    COALESCE(pruned_files, 0) AS pruned_files,
+    ROUND(100.0 * COALESCE(pruned_files, 0)
+        / NULLIF(COALESCE(read_files, 0) + COALESCE(pruned_files, 0), 0), 1) AS pruned_pct
+FROM {QUERY_HISTORY_TABLE}
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
+    AND start_time >= current_timestamp() - INTERVAL 7 DAY
+ORDER BY read_files DESC
+LIMIT 20"""
+
+_SQL_SIMILAR_SLOW_QUERIES = f"""-- Find similar slow queries for pattern analysis
 SELECT 
     LEFT(statement_text, 300) AS query_pattern,
     COUNT(*) AS occurrences,
@@ -642,22 +708,17 @@ SELECT
     ROUND(MAX(execution_duration_ms) / 1000.0, 1) AS max_exec_sec,
     ROUND(AVG(read_bytes) / (1024*1024), 0) AS avg_mb_read
 FROM {QUERY_HISTORY_TABLE}
-WHERE query_source.genie_space_id = '{genie_space_id}'
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
     AND start_time >= current_timestamp() - INTERVAL 7 DAY
     AND execution_duration_ms > 10000
 GROUP BY LEFT(statement_text, 300)
 ORDER BY occurrences DESC
 LIMIT 10"""
-        ))
-        
-        queries.append(DiagnosticQuery(
-            title="Query Profile Link",
-            description="Open Query Profile in Databricks SQL to see execution plan",
-            category="monitoring",
-            sql=f"""-- To view the Query Profile:
+
+_SQL_QUERY_PROFILE_LINK = f"""-- To view the Query Profile:
 -- 1. Go to Databricks SQL Editor
 -- 2. Click on "Query History" tab
--- 3. Search for statement_id: {statement_id}
+-- 3. Search for statement_id: {{statement_id}}
 -- 4. Click "View Query Profile" to see the execution plan
 
 -- Or run this to get a link to the query in history:
@@ -665,17 +726,9 @@ SELECT
     statement_id,
     CONCAT('https://', current_catalog(), '.cloud.databricks.com/sql/history/', statement_id) AS query_profile_url
 FROM {QUERY_HISTORY_TABLE}
-WHERE statement_id = '{statement_id}'"""
-        ))
-    
-    # ==========================================================================
-    # ALWAYS INCLUDE: General monitoring queries
-    # ==========================================================================
-    queries.append(DiagnosticQuery(
-        title="Genie Space Performance Summary",
-        description="Overall performance metrics for this Genie space",
-        category="monitoring",
-        sql=f"""-- Performance summary for this Genie space
+WHERE statement_id = '{{statement_id}}'"""
+
+_SQL_SPACE_SUMMARY = f"""-- Performance summary for this Genie space
 SELECT 
     COUNT(*) AS total_queries,
     ROUND(AVG(total_duration_ms) / 1000.0, 1) AS avg_duration_sec,
@@ -686,18 +739,10 @@ SELECT
     ROUND(100.0 * SUM(CASE WHEN execution_status = 'FINISHED' THEN 1 ELSE 0 END) / COUNT(*), 1) AS success_pct,
     COUNT(DISTINCT executed_by) AS unique_users
 FROM {QUERY_HISTORY_TABLE}
-WHERE query_source.genie_space_id = '{genie_space_id}'
+WHERE query_source.genie_space_id = '{{genie_space_id}}'
     AND start_time >= current_timestamp() - INTERVAL 7 DAY"""
-    ))
-    
-    # ==========================================================================
-    # ALWAYS INCLUDE: Data Correlation Query
-    # ==========================================================================
-    queries.append(DiagnosticQuery(
-        title="Correlate SQL Queries with Genie API Events",
-        description="Join SQL warehouse statement IDs with API request IDs and Genie space IDs to understand the full request lifecycle",
-        category="monitoring",
-        sql=f"""-- Correlate SQL query history with Genie API audit events
+
+_SQL_CORRELATION = f"""-- Correlate SQL query history with Genie API audit events
 -- This query shows the relationship between:
 --   - {QUERY_HISTORY_TABLE}: SQL execution metrics (statement_id, duration, etc.)
 --   - {AUDIT_TABLE}: Genie API events (request_id, action_name, etc.)
@@ -709,12 +754,13 @@ WITH genie_messages AS (
         request_params.space_id AS genie_space_id,
         request_params.conversation_id,
         event_time AS message_time,
+        date_trunc('MINUTE', event_time) AS minute_bucket,
         action_name,
         user_identity.email AS user_email
     FROM {AUDIT_TABLE}
     WHERE service_name = 'genieV2'
       AND action_name IN ('genieStartConversationMessage', 'genieContinueConversationMessage')
-      AND request_params.space_id = '{genie_space_id}'
+      AND request_params.space_id = '{{genie_space_id}}'
       AND event_time >= current_timestamp() - INTERVAL 7 DAY
 ),
 sql_queries AS (
@@ -727,40 +773,54 @@ sql_queries AS (
         end_time,
         total_duration_ms,
         execution_status,
-        LEFT(statement_text, 200) AS query_preview
+        join_bucket
     FROM {QUERY_HISTORY_TABLE}
-    WHERE query_source.genie_space_id = '{genie_space_id}'
+    -- A query within 60s of a message lands in the message's minute or the
+    -- next one, so emit both candidate buckets to get an equality join key
+    LATERAL VIEW explode(array(
+        date_trunc('MINUTE', start_time),
+        date_trunc('MINUTE', start_time) - INTERVAL 1 MINUTE
+    )) buckets AS join_bucket
+    WHERE query_source.genie_space_id = '{{genie_space_id}}'
       AND start_time >= current_timestamp() - INTERVAL 7 DAY
+),
+correlated AS (
+    -- Join: Find SQL queries that started within 60 seconds of a Genie message.
+    -- A left outer join can only broadcast its right side, so hint q.
+    SELECT /*+ BROADCAST(q) */
+        m.api_request_id,
+        m.conversation_id,
+        m.genie_space_id,
+        m.user_email,
+        m.message_time,
+        m.action_name AS genie_action,
+        q.statement_id,
+        q.start_time AS sql_start_time,
+        q.end_time AS sql_end_time,
+        ROUND(timestampdiff(MILLISECOND, m.message_time, q.start_time) / 1000.0, 1) AS ai_processing_sec,
+        ROUND(q.total_duration_ms / 1000.0, 1) AS sql_duration_sec,
+        q.execution_status
+    FROM genie_messages m
+    LEFT JOIN sql_queries q
+        ON m.genie_space_id = q.genie_space_id
+        AND q.join_bucket = m.minute_bucket
+        AND q.start_time BETWEEN m.message_time AND m.message_time + INTERVAL 60 SECOND
+        AND q.executed_by = m.user_email
+    ORDER BY m.message_time DESC
+    LIMIT 100
 )
--- Join: Find SQL queries that started within 60 seconds of a Genie message
+-- Preview text is fetched for the surviving rows only, after the LIMIT
 SELECT 
-    m.api_request_id,
-    m.conversation_id,
-    m.genie_space_id,
-    m.user_email,
-    m.message_time,
-    m.action_name AS genie_action,
-    q.statement_id,
-    q.start_time AS sql_start_time,
-    q.end_time AS sql_end_time,
-    ROUND((UNIX_TIMESTAMP(q.start_time) - UNIX_TIMESTAMP(m.message_time)), 1) AS ai_processing_sec,
-    ROUND(q.total_duration_ms / 1000.0, 1) AS sql_duration_sec,
-    q.execution_status,
-    q.query_preview
-FROM genie_messages m
-LEFT JOIN sql_queries q
-    ON m.genie_space_id = q.genie_space_id
-    AND q.start_time BETWEEN m.message_time AND m.message_time + INTERVAL 60 SECOND
-    AND q.executed_by = m.user_email
-ORDER BY m.message_time DESC
-LIMIT 100"""
-    ))
-    
-    queries.append(DiagnosticQuery(
-        title="Data Source Reference",
-        description="Explains the key columns and relationships between system tables",
-        category="monitoring",
-        sql=f"""-- ============================================================================
+    c.*,
+    LEFT(qh.statement_text, 200) AS query_preview
+FROM correlated c
+LEFT JOIN {QUERY_HISTORY_TABLE} qh
+    ON qh.statement_id = c.statement_id
+    AND qh.query_source.genie_space_id = '{{genie_space_id}}'
+    AND qh.start_time >= current_timestamp() - INTERVAL 7 DAY
+ORDER BY c.message_time DESC"""
+
+_SQL_DATA_SOURCE_GUIDE = f"""-- ============================================================================
 -- DATA SOURCE REFERENCE: Correlating Genie API with SQL Execution
 -- ============================================================================
 
@@ -798,32 +858,183 @@ LIMIT 100"""
 -- 4. The difference between message event_time and SQL start_time = AI processing time
 
 -- Example: Find the AI overhead for this specific query
--- Statement ID: {statement_id}
--- Genie Space ID: {genie_space_id}
+-- Statement ID: {{statement_id}}
+-- Genie Space ID: {{genie_space_id}}
+"""
+
+_SQL_DATA_SOURCE_REFERENCE = _SQL_DATA_SOURCE_GUIDE + f"""-- The audit scan is bounded by the statement's own start time, so older
+-- statements resolve too.
+WITH q AS (
+    SELECT statement_id, start_time
+    FROM {QUERY_HISTORY_TABLE}
+    WHERE statement_id = '{{statement_id}}'
+),
+m AS (
+    SELECT MIN(a.event_time) AS message_time
+    FROM {AUDIT_TABLE} a, q
+    WHERE a.service_name = 'genieV2'
+      AND a.action_name IN ('genieStartConversationMessage', 'genieContinueConversationMessage')
+      AND a.request_params.space_id = '{{genie_space_id}}'
+      AND a.event_time BETWEEN q.start_time - INTERVAL 60 SECOND AND q.start_time
+)
 SELECT 
-    (SELECT MIN(event_time) 
-     FROM {AUDIT_TABLE} 
-     WHERE service_name = 'genieV2'
-       AND action_name LIKE 'genie%Message'
-       AND request_params.space_id = '{genie_space_id}'
-       AND event_time BETWEEN 
-           (SELECT start_time - INTERVAL 60 SECOND FROM {QUERY_HISTORY_TABLE} WHERE statement_id = '{statement_id}')
-           AND (SELECT start_time FROM {QUERY_HISTORY_TABLE} WHERE statement_id = '{statement_id}')
-    ) AS message_time,
-    start_time AS sql_start_time,
-    ROUND((UNIX_TIMESTAMP(start_time) - UNIX_TIMESTAMP(
-        (SELECT MIN(event_time) 
-         FROM {AUDIT_TABLE} 
-         WHERE service_name = 'genieV2'
-           AND action_name LIKE 'genie%Message'
-           AND request_params.space_id = '{genie_space_id}'
-           AND event_time BETWEEN start_time - INTERVAL 60 SECOND AND start_time)
-    )), 1) AS ai_overhead_sec
-FROM {QUERY_HISTORY_TABLE}
-WHERE statement_id = '{statement_id}'"""
-    ))
+    m.message_time,
+    q.start_time AS sql_start_time,
+    ROUND(timestampdiff(MILLISECOND, m.message_time, q.start_time) / 1000.0, 1) AS ai_overhead_sec
+FROM q, m"""
+
+# Same example when the statement's start time is already known: the audit
+# lookup gets a literal range instead of one correlated through q, so
+# min/max data skipping and bloom filters can apply
+_SQL_DATA_SOURCE_REFERENCE_AT_START = _SQL_DATA_SOURCE_GUIDE + f"""-- SQL Start Time: {{start_time}}
+WITH q AS (
+    SELECT statement_id, start_time
+    FROM {QUERY_HISTORY_TABLE}
+    WHERE statement_id = '{{statement_id}}'
+      AND start_time BETWEEN TIMESTAMP '{{start_time}}' - INTERVAL 1 DAY
+                         AND TIMESTAMP '{{start_time}}' + INTERVAL 1 DAY
+),
+m AS (
+    SELECT MIN(event_time) AS message_time
+    FROM {AUDIT_TABLE}
+    WHERE service_name = 'genieV2'
+      AND action_name IN ('genieStartConversationMessage', 'genieContinueConversationMessage')
+      AND request_params.space_id = '{{genie_space_id}}'
+      AND event_time BETWEEN TIMESTAMP '{{start_time}}' - INTERVAL 60 SECOND
+                         AND TIMESTAMP '{{start_time}}'
+)
+SELECT 
+    m.message_time,
+    q.start_time AS sql_start_time,
+    ROUND(timestampdiff(MILLISECOND, m.message_time, q.start_time) / 1000.0, 1) AS ai_overhead_sec
+FROM q, m"""
+
+# (title, description, category, sql_template) for each diagnostic query
+_DIAG_QUERY_DETAILS = (
+    "Query Execution Details",
+    "Get full execution details for this specific query from query history",
+    "monitoring",
+    _SQL_QUERY_DETAILS,
+)
+
+_DIAG_QUERIES_BY_BOTTLENECK = {
+    "COMPUTE_STARTUP": (
+        ("Warehouse Cold Start Analysis", "Analyze how often this warehouse experiences cold starts",
+         "performance", _SQL_COLD_START_ANALYSIS),
+        ("Warehouse Usage Gaps", "Find gaps in warehouse usage that cause cold starts",
+         "performance", _SQL_USAGE_GAPS),
+    ),
+    "QUEUE_WAIT": (
+        ("Peak Concurrency Analysis", "Find peak concurrent query periods causing queue wait",
+         "performance", _SQL_PEAK_CONCURRENCY),
+        ("Concurrent Running Queries", "See what other queries were running at the same time",
+         "monitoring", _SQL_CONCURRENT_QUERIES),
+    ),
+    "COMPILATION": (
+        ("High Compilation Time Queries", "Find other queries with high compilation times for pattern analysis",
+         "performance", _SQL_HIGH_COMPILATION),
+    ),
+    "LARGE_SCAN": (
+        ("Table Scan Analysis", "Analyze data volumes being scanned by Genie queries",
+         "data", _SQL_TABLE_SCAN),
+        ("Check Table Statistics", "Verify table statistics are up to date (run ANALYZE if stale)",
+         "statistics", _SQL_TABLE_STATISTICS),
+        ("Check Partition Columns", "View table partitioning to ensure filters use partition columns",
+         "data", _SQL_PARTITION_COLUMNS),
+        ("Data Skipping Effectiveness", "Measure file pruning achieved by this space's queries",
+         "data", _SQL_DATA_SKIPPING),
+    ),
+    "SLOW_EXECUTION": (
+        ("Similar Slow Queries", "Find similar queries to identify optimization patterns",
+         "performance", _SQL_SIMILAR_SLOW_QUERIES),
+        ("Query Profile Link", "Open Query Profile in Databricks SQL to see execution plan",
+         "monitoring", _SQL_QUERY_PROFILE_LINK),
+    ),
+}
+
+# Included for every query regardless of bottleneck, keyed by whether the
+# statement's start time is known (selects the Data Source Reference variant)
+_DIAG_ALWAYS = {
+    has_start_time: (
+        ("Genie Space Performance Summary", "Overall performance metrics for this Genie space",
+         "monitoring", _SQL_SPACE_SUMMARY),
+        ("Correlate SQL Queries with Genie API Events",
+         "Join SQL warehouse statement IDs with API request IDs and Genie space IDs to understand the full request lifecycle",
+         "monitoring", _SQL_CORRELATION),
+        ("Data Source Reference", "Explains the key columns and relationships between system tables",
+         "monitoring", reference_sql),
+    )
+    for has_start_time, reference_sql in (
+        (False, _SQL_DATA_SOURCE_REFERENCE),
+        (True, _SQL_DATA_SOURCE_REFERENCE_AT_START),
+    )
+}
+
+# Full spec list per (bottleneck, has_statement_id, has_start_time); None covers unknown bottlenecks
+_DIAG_SPECS = {
+    (bottleneck, has_statement_id, has_start_time): (
+        ((_DIAG_QUERY_DETAILS,) if has_statement_id else ()) + specific + always
+    )
+    for bottleneck, specific in (*_DIAG_QUERIES_BY_BOTTLENECK.items(), (None, ()))
+    for has_statement_id in (False, True)
+    for has_start_time, always in _DIAG_ALWAYS.items()
+}
+
+
+def get_diagnostic_queries(query: dict) -> tuple[DiagnosticQuery, ...]:
+    """
+    Generate recommended diagnostic SQL queries based on the query's bottleneck type.
+    
+    These queries help users investigate and resolve performance issues.
+    
+    Args:
+        query: Query dict with metrics including bottleneck, statement_id, start_time, etc.
+        
+    Returns:
+        Tuple of DiagnosticQuery objects with copy-pastable SQL
+    """
+    statement_id = query.get("statement_id", "")
+    return _build_diagnostic_queries(
+        query.get("bottleneck", "NORMAL"),
+        statement_id,
+        query.get("genie_space_id", ""),
+        _to_sql_timestamp(query.get("start_time")) if statement_id else "",
+    )
+
+
+@lru_cache(maxsize=512)
+def _build_diagnostic_queries(
+    bottleneck: str,
+    statement_id: str,
+    genie_space_id: str,
+    start_time: str = "",
+) -> tuple[DiagnosticQuery, ...]:
+    """Assemble the diagnostic queries for a bottleneck/statement/space (memoized)."""
+    key = (bool(statement_id), bool(start_time))
+    specs = _DIAG_SPECS.get((bottleneck, *key)) or _DIAG_SPECS[(None, *key)]
     
-    return queries
+    return tuple(
+        DiagnosticQuery(
+            title=title,
+            description=description,
+            category=category,
+            sql_template=template,
+            statement_id=statement_id,
+            genie_space_id=genie_space_id,
+            start_time=start_time,
+        )
+        for title, description, category, template in specs
+    )
+
+
+# Databricks execution status (uppercased) -> display status
+_STATUS_MAP = {
+    "FINISHED": "success",
+    "SUCCEEDED": "success",
+    "FAILED": "failed",
+    "CANCELED": "cancelled",
+    "CANCELLED": "cancelled",
+}
 
 
 def map_status(status: str) -> str:
@@ -836,13 +1047,22 @@ def map_status(status: str) -> str:
     Returns:
         Display status string
     """
-    status_upper = (status or "").upper()
-    
-    if status_upper in ("FINISHED", "SUCCEEDED"):
-        return "success"
-    if status_upper == "FAILED":
-        return "failed"
-    if status_upper in ("CANCELED", "CANCELLED"):
-        return "cancelled"
+    if not status:
+        return "unknown"
+    # API statuses are already uppercase, so try them as-is before allocating
+    return _STATUS_MAP.get(status) or _STATUS_MAP.get(status.upper(), "unknown")
+
+
+def map_status_batch(statuses) -> pd.Series:
+    """
+    Vectorized map_status for a column of execution statuses.
     
-    return "unknown"
+    Args:
+        statuses: Series or array-like of Databricks execution statuses
+        
+    Returns:
+        Series of display status strings (index preserved for Series input)
+    """
+    series = statuses if isinstance(statuses, pd.Series) else pd.Series(statuses, dtype=object)
+    upper = series.where(series.notna(), "").astype(str).str.upper()
+    return upper.map(_STATUS_MAP).fillna("unknown")
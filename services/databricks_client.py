@@ -7,21 +7,170 @@ Provides a wrapper around the Databricks SDK WorkspaceClient for:
 - Caching results for performance
 """
 
+import hashlib
+import logging
 import os
 import re
-from typing import Optional, Any
-from dataclasses import dataclass
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, Any
+from dataclasses import dataclass, field, fields
 from functools import lru_cache
 import time
 
 import pandas as pd
 from databricks.sdk import WorkspaceClient
-from databricks.sdk.service.sql import StatementState
+from databricks.sdk.service.sql import (
+    Disposition,
+    Format,
+    StatementState,
+)
 
 from queries.sql import QUERY_HISTORY_TABLE, AUDIT_TABLE
 
+# Diagnostic output; enable with LOG_LEVEL=DEBUG (see app.py)
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Concurrent Genie API calls when fetching messages for many conversations.
+# WorkspaceClient already sends every call (SDK methods and api_client.do)
+# through one keep-alive requests.Session whose HTTPS pool holds 20
+# connections; staying below that lets every worker reuse a connection
+# instead of opening a new TLS session.
+MESSAGE_FETCH_WORKERS = 16
+
+# Upper bound on entries in each client's response cache (DataFrames,
+# conversation lists, ...) so long-running sessions don't grow unbounded
+CACHE_MAX_ENTRIES = 512
+
+# Conversations scanned when indexing a space's prompts, and how long the
+# resulting index is reused by find_prompt_for_query/get_prompts_for_queries.
+# The index is shared, so it uses get_prompts_for_queries' 100-conversation
+# depth (find_prompt_for_query alone scanned 50) to keep batch coverage.
+SPACE_INDEX_MAX_CONVERSATIONS = 100
+SPACE_INDEX_TTL_SECONDS = 120
+
+# Cache files live in this subdirectory of SQL_DISK_CACHE_DIR, so clearing
+# the cache never touches other files in a shared directory
+DISK_CACHE_SUBDIR = "genie_audit_cache"
+
+# How long space and conversation listings persisted to SQL_DISK_CACHE_DIR
+# stay valid (they are scoped to the workspace host and current user)
+LIST_DISK_CACHE_TTL_SECONDS = 300
+
+# Empty listings are cached briefly so repeated visits to a space without
+# conversations skip the paginated API walks, while new ones still show up
+EMPTY_RESULT_TTL_SECONDS = 10
+
+# Statement IDs per query.history lookup in get_conversations_with_query_metrics
+# (the warehouse handles long IN lists; fewer batches means fewer round trips)
+STATEMENT_METRICS_BATCH_SIZE = 500
+
+# Workspace ID embedded in a host URL (used by get_query_profile_url):
+# Azure adb-{workspace_id}.{region}.azuredatabricks.net, or ?o={workspace_id}
+_AZURE_WORKSPACE_ID_RE = re.compile(r'adb-(\d+)\.')
+_WORKSPACE_ID_PARAM_RE = re.compile(r'[/\?]o=(\d+)')
+
+# Patterns used by DatabricksClient._normalize_sql
+_LINE_COMMENT_RE = re.compile(r'--.*$', re.MULTILINE)
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_WHITESPACE_RE = re.compile(r'\s+')
+# IN list of string/number literals (applied after whitespace is collapsed)
+_SQL_LITERAL = r"(?:'(?:[^']|'')*'|-?\d+(?:\.\d+)?)"
+_IN_LIST_RE = re.compile(rf"\bin ?\( ?{_SQL_LITERAL}(?: ?, ?{_SQL_LITERAL})* ?\)", re.IGNORECASE)
+
+# Correlation windows (nanoseconds) after a Genie message: queries it issued
+# start within 2 minutes; the AI overhead search over all space queries
+# looks up to 5 minutes ahead
+_MESSAGE_QUERY_WINDOW_NS = 120 * 1_000_000_000
+_AI_OVERHEAD_WINDOW_NS = 300 * 1_000_000_000
+
+# Prompt lookups key SQL on this many leading characters of its normalized
+# text; partial matches (query_text may be truncated) compare a shorter prefix
+_SQL_KEY_LEN = 300
+_SQL_PARTIAL_MATCH_LEN = 200
+
+@lru_cache(maxsize=4096)
+def _normalize_sql_text(sql: str) -> str:
+    """
+    Strip comments, collapse whitespace and lowercase SQL (memoized).
+    
+    Literal IN lists become "in (?)" so reruns of the same generated SQL
+    with different values share a key. Genie re-runs the same generated
+    SQL often, so identical texts are normalized once.
+    """
+    if not sql:
+        return ""
+    sql = _LINE_COMMENT_RE.sub('', sql)
+    sql = _BLOCK_COMMENT_RE.sub('', sql)
+    sql = _WHITESPACE_RE.sub(' ', sql)
+    sql = _IN_LIST_RE.sub('in (?)', sql)
+    return sql.strip().lower()
+
+
+def _sql_cache_key(sql: str) -> str:
+    """
+    Stable cache key for a statement.
+    
+    Uses a blake2b digest rather than hash(), which is salted per process
+    and can collide. The text is hashed as-is: normalizing it (e.g.
+    lowercasing) would merge queries that differ only in string literals.
+    """
+    digest = hashlib.blake2b(sql.encode("utf-8"), digest_size=16)
+    return f"sql:{digest.hexdigest()}"
+
+
+# Leading keyword that marks message content as SQL rather than a question
+# (a whole word, so questions like "Withdrawals by month?" don't match)
+_SQL_PREFIX_RE = re.compile(r'\s*(?:SELECT|WITH|INSERT|UPDATE|DELETE|CREATE)\b', re.IGNORECASE)
+
+
+def _looks_like_sql(content: str) -> bool:
+    """Check whether text starts with a SQL keyword (without copying the text)."""
+    return _SQL_PREFIX_RE.match(content) is not None
+
+
+def _prefetch_pages(
+    fetch_page: Callable[[Optional[str]], tuple[list, Optional[str]]],
+    max_pages: int,
+) -> Iterator[tuple[list, Optional[str]]]:
+    """
+    Walk a token-paginated API, requesting each page while the caller
+    processes the previous one.
+    
+    Page tokens are opaque, so pages can't be fetched in parallel; instead
+    the request for page N+1 is issued as soon as page N arrives, overlapping
+    the caller's parsing and progress reporting with the next round trip.
+    
+    Args:
+        fetch_page: Callable taking a page token (None for the first page)
+            and returning (items, next_page_token)
+        max_pages: Safety limit on the number of pages fetched
+        
+    Yields:
+        (items, next_page_token) for each page
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        token = None
+        future = executor.submit(fetch_page, token)
+        for page_count in range(1, max_pages + 1):
+            items, next_token = future.result()
+            # A token that doesn't advance would re-fetch the same page until max_pages
+            if next_token and next_token != token and page_count < max_pages:
+                token = next_token
+                future = executor.submit(fetch_page, token)
+            else:
+                future = None
+            yield items, next_token
+            if future is None:
+                return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass(slots=True)
 class GenieSpace:
     """Represents a Genie space/room."""
     id: str
@@ -32,7 +181,7 @@ class GenieSpace:
     owner: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class GenieConversation:
     """Represents a Genie conversation."""
     conversation_id: str
@@ -41,29 +190,79 @@ class GenieConversation:
     last_updated_time: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class GenieMessageAttachment:
     """Represents an attachment in a Genie message."""
     attachment_type: str = ""
     statement_id: str = ""
     sql_content: str = ""
+    _normalized_sql: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def normalized_sql(self) -> str:
+        """sql_content normalized for comparison, computed once per attachment."""
+        if self._normalized_sql is None:
+            self._normalized_sql = _normalize_sql_text(self.sql_content) if self.sql_content else ""
+        return self._normalized_sql
+
 
+@dataclass(slots=True, frozen=True)
+class PromptSource:
+    """A SQL attachment paired with the user prompt that produced it."""
+    conversation_id: str
+    message_id: str
+    attachment: GenieMessageAttachment
+    prompt: Optional[str] = None
 
-@dataclass
+
+@dataclass(slots=True)
+class SpacePromptIndex:
+    """SQL attachments of a space's recent conversations, indexed for prompt lookups."""
+    sources: list[PromptSource]  # every SQL attachment, in conversation order
+    statement_to_prompt: dict[str, str]  # statement_id -> prompt
+    statement_to_source: dict[str, PromptSource]  # statement_id -> first attachment
+    # normalized SQL prefix -> attachment, built on first use (see sql_to_source)
+    _sql_to_source: Optional[dict[str, PromptSource]] = field(default=None, init=False, repr=False)
+    _sql_to_prompt: Optional[dict[str, str]] = field(default=None, init=False, repr=False)
+    
+    @property
+    def sql_to_source(self) -> dict[str, PromptSource]:
+        """
+        Attachments keyed by the first _SQL_KEY_LEN characters of their normalized SQL.
+        
+        Later attachments with a prompt win. SQL is only normalized when a
+        lookup by statement_id fails, so the map is built on first access.
+        """
+        if self._sql_to_source is None:
+            sql_to_source: dict[str, PromptSource] = {}
+            for source in self.sources:
+                key = source.attachment.normalized_sql[:_SQL_KEY_LEN]
+                if key and (source.prompt or key not in sql_to_source):
+                    sql_to_source[key] = source
+            self._sql_to_source = sql_to_source
+        return self._sql_to_source
+    
+    @property
+    def sql_to_prompt(self) -> dict[str, str]:
+        """Prompts keyed like sql_to_source (attachments without a prompt are skipped)."""
+        if self._sql_to_prompt is None:
+            self._sql_to_prompt = {
+                key: source.prompt for key, source in self.sql_to_source.items() if source.prompt
+            }
+        return self._sql_to_prompt
+
+
+@dataclass(slots=True)
 class GenieMessage:
     """Represents a message in a Genie conversation."""
     message_id: str
     content: str = ""
     status: str = ""
     created_timestamp: int = 0  # Epoch milliseconds from Genie API
-    attachments: list[GenieMessageAttachment] = None
-    
-    def __post_init__(self):
-        if self.attachments is None:
-            self.attachments = []
+    attachments: list[GenieMessageAttachment] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryMetrics:
     """SQL query with full performance metrics."""
     statement_id: str
@@ -90,7 +289,72 @@ class QueryMetrics:
     warehouse_concurrent: int = 0  # Concurrent warehouse queries at start time
 
 
-@dataclass
+# query.history columns read by _query_metrics_from_df, in QueryMetrics order
+_QUERY_METRICS_TEXT_COLUMNS = [
+    "statement_id", "query_text", "start_time", "execution_status",
+    "bottleneck", "speed_category", "genie_conversation_id", "executed_by",
+]
+_QUERY_METRICS_COUNT_COLUMNS = [
+    "total_duration_ms", "compilation_ms", "execution_ms", "queue_wait_ms",
+    "compute_wait_ms", "result_fetch_ms", "bytes_scanned", "rows_scanned", "rows_returned",
+]
+
+
+def _query_metrics_from_df(df: pd.DataFrame) -> Iterator[QueryMetrics]:
+    """
+    Build QueryMetrics from query history rows, skipping rows without a statement_id.
+    
+    Columns are cleaned in bulk (NULLs -> "" or 0, numeric strings -> int) so
+    each row is read as a plain tuple; missing columns take the defaults.
+    
+    Args:
+        df: Query history rows (e.g. from QUERIES_BY_STATEMENT_IDS)
+        
+    Yields:
+        QueryMetrics with ai_overhead_sec left at 0.0
+    """
+    text = df.reindex(columns=_QUERY_METRICS_TEXT_COLUMNS, fill_value="").astype(object).fillna("").astype(str)
+    counts = (
+        df.reindex(columns=_QUERY_METRICS_COUNT_COLUMNS)
+        .apply(pd.to_numeric, errors="coerce")
+        .fillna(0)
+        .astype("int64")
+    )
+    keep = (text["statement_id"] != "").to_numpy()
+    text = text[keep]
+    counts = counts[keep]
+    for (stmt_id, query_text, start_time, status, bottleneck, speed_category, conversation_id, executed_by), (
+        total_ms, compilation_ms, execution_ms, queue_wait_ms, compute_wait_ms, result_fetch_ms,
+        bytes_scanned, rows_scanned, rows_returned,
+    ) in zip(text.itertuples(index=False, name=None), counts.itertuples(index=False, name=None)):
+        yield QueryMetrics(
+            stmt_id, query_text, start_time,
+            total_ms, compilation_ms, execution_ms, queue_wait_ms, compute_wait_ms, result_fetch_ms,
+            0.0, bytes_scanned, rows_scanned, rows_returned,
+            status, bottleneck or "NORMAL", speed_category or "FAST",
+            conversation_id, executed_by,
+        )
+
+
+def _timestamps_to_ns(values: list[str]) -> list[Optional[int]]:
+    """
+    Parse timestamp strings to UTC epoch nanoseconds in one vectorized call.
+    
+    Naive timestamps are taken as UTC; empty or unparseable values map to None.
+    
+    Args:
+        values: ISO 8601 timestamp strings (e.g. query history start_time)
+        
+    Returns:
+        Nanoseconds since the epoch for each value, in input order
+    """
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format="ISO8601", errors="coerce")
+    missing = parsed.isna().to_numpy()
+    return [None if na else int(ns) for na, ns in zip(missing, parsed.dt.as_unit("ns").array.asi8)]
+
+
+
+@dataclass(slots=True)
 class MessageWithQueries:
     """A message (prompt) with its linked SQL queries."""
     message_id: str
@@ -104,11 +368,11 @@ class MessageWithQueries:
     # AI overhead: time from message submission to first SQL query (Genie model inference)
     ai_overhead_sec: float = 0.0
     # Total response time: AI overhead + SQL execution time
-    total_response_sec: float = 0.0
-    # Performance issue flags
-    has_performance_issue: bool = False
-    has_slow_ai: bool = False  # AI overhead > 10s
-    has_slow_query: bool = False  # Any query > 10s
+    total_response_sec: float = field(default=0.0, init=False)
+    # Performance issue flags (derived in __post_init__, not constructor args)
+    has_performance_issue: bool = field(default=False, init=False)
+    has_slow_ai: bool = field(default=False, init=False)  # AI overhead > 10s
+    has_slow_query: bool = field(default=False, init=False)  # Any query > 10s
     # Message source: "API" (genieCreateConversationMessage, genieStartConversationMessage)
     #                 "Space" (createConversationMessage) 
     #                 "Unknown" if not determined
@@ -117,20 +381,27 @@ class MessageWithQueries:
     def __post_init__(self):
         if self.queries is None:
             self.queries = []
-        # Compute aggregates if queries are provided
+        # Compute aggregates if queries are provided (single pass)
+        has_slow_query = False
         if self.queries:
+            total_duration_ms = 0
+            for q in self.queries:
+                duration_ms = q.total_duration_ms
+                total_duration_ms += duration_ms
+                if duration_ms >= 10000:
+                    has_slow_query = True
             self.query_count = len(self.queries)
-            self.total_duration_ms = sum(q.total_duration_ms for q in self.queries)
+            self.total_duration_ms = total_duration_ms
         # Compute total response time (AI overhead + SQL duration)
         sql_duration_sec = self.total_duration_ms / 1000.0
         self.total_response_sec = self.ai_overhead_sec + sql_duration_sec
         # Detect performance issues
         self.has_slow_ai = self.ai_overhead_sec > 10.0
-        self.has_slow_query = any(q.total_duration_ms >= 10000 for q in self.queries)
+        self.has_slow_query = has_slow_query
         self.has_performance_issue = self.has_slow_ai or self.has_slow_query
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationWithMessages:
     """Conversation with its messages and linked SQL queries."""
     conversation_id: str
@@ -164,28 +435,67 @@ class ConversationWithMessages:
             self.messages = []
         # Compute aggregates if messages are provided
         if self.messages:
-            all_queries = [q for m in self.messages for q in m.queries]
-            self.total_queries = len(all_queries)
-            if all_queries:
-                self.total_duration_ms = sum(q.total_duration_ms for q in all_queries)
-                self.avg_duration_ms = self.total_duration_ms / len(all_queries)
-                self.slowest_query_ms = max(q.total_duration_ms for q in all_queries)
-                successful = sum(1 for q in all_queries if q.execution_status == "FINISHED")
-                self.success_rate = (successful / len(all_queries)) * 100.0
+            # Accumulate every message and query metric in one pass
+            total_queries = 0
+            total_duration_ms = 0
+            slowest_query_ms = 0
+            successful = 0
+            slow_query_count = 0
+            total_ai_overhead_sec = 0.0
+            slow_ai_count = 0
+            response_count = 0
+            response_sum = 0.0
+            slowest_response_sec = 0.0
+            fastest_response_sec = 0.0
+            # A statement linked to more than one message is only counted once
+            seen_statement_ids: set[str] = set()
+            for m in self.messages:
+                total_ai_overhead_sec += m.ai_overhead_sec
+                if m.has_slow_ai:
+                    slow_ai_count += 1
+                response_sec = m.total_response_sec
+                if response_sec > 0:
+                    if response_count == 0 or response_sec > slowest_response_sec:
+                        slowest_response_sec = response_sec
+                    if response_count == 0 or response_sec < fastest_response_sec:
+                        fastest_response_sec = response_sec
+                    response_count += 1
+                    response_sum += response_sec
+                for q in m.queries:
+                    statement_id = q.statement_id
+                    if statement_id:
+                        if statement_id in seen_statement_ids:
+                            continue
+                        seen_statement_ids.add(statement_id)
+                    duration_ms = q.total_duration_ms
+                    if total_queries == 0 or duration_ms > slowest_query_ms:
+                        slowest_query_ms = duration_ms
+                    total_queries += 1
+                    total_duration_ms += duration_ms
+                    if q.execution_status == "FINISHED":
+                        successful += 1
+                    if duration_ms >= 10000:
+                        slow_query_count += 1
+            
+            self.total_queries = total_queries
+            if total_queries:
+                self.total_duration_ms = total_duration_ms
+                self.avg_duration_ms = total_duration_ms / total_queries
+                self.slowest_query_ms = slowest_query_ms
+                self.success_rate = (successful / total_queries) * 100.0
             # Derive conversation source from first message
-            if self.messages and self.messages[0].message_source != "Unknown":
+            if self.messages[0].message_source != "Unknown":
                 self.conversation_source = self.messages[0].message_source
-            # Compute AI overhead and response time metrics
-            self.total_ai_overhead_sec = sum(m.ai_overhead_sec for m in self.messages)
-            response_times = [m.total_response_sec for m in self.messages if m.total_response_sec > 0]
-            if response_times:
-                self.avg_response_sec = sum(response_times) / len(response_times)
-                self.slowest_response_sec = max(response_times)
-                self.fastest_response_sec = min(response_times)
+            # AI overhead and response time metrics
+            self.total_ai_overhead_sec = total_ai_overhead_sec
+            if response_count:
+                self.avg_response_sec = response_sum / response_count
+                self.slowest_response_sec = slowest_response_sec
+                self.fastest_response_sec = fastest_response_sec
             # Count performance issues
-            self.slow_ai_count = sum(1 for m in self.messages if m.has_slow_ai)
-            self.slow_query_count = sum(1 for q in all_queries if q.total_duration_ms >= 10000)
-            self.has_performance_issues = self.slow_ai_count > 0 or self.slow_query_count > 0
+            self.slow_ai_count = slow_ai_count
+            self.slow_query_count = slow_query_count
+            self.has_performance_issues = slow_ai_count > 0 or slow_query_count > 0
 
 
 class DatabricksClient:
@@ -206,8 +516,21 @@ class DatabricksClient:
         """
         self._client = WorkspaceClient()
         self._warehouse_id = warehouse_id or os.getenv("DATABRICKS_WAREHOUSE_ID")
-        self._cache: dict[str, tuple[float, Any]] = {}
+        # key -> (expires_at, value), least recently used first
+        self._cache: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._cache_lock = threading.Lock()  # messages are fetched from worker threads
         self._cache_ttl = 60  # 1 minute cache TTL
+        self._cache_max_entries = CACHE_MAX_ENTRIES
+        # Optional on-disk second tier for SQL results (survives app restarts)
+        disk_cache_root = os.getenv("SQL_DISK_CACHE_DIR")
+        self._disk_cache_dir = os.path.join(disk_cache_root, DISK_CACHE_SUBDIR) if disk_cache_root else None
+        self._disk_cache_ttl = float(os.getenv("SQL_DISK_CACHE_TTL", "600"))
+        # Fetch results as Arrow via presigned links instead of inline JSON
+        self._arrow_results = os.getenv("SQL_ARROW_RESULTS", "").lower() in ("1", "true", "yes")
+        # (host, workspace_id) once resolved by _resolve_workspace
+        self._workspace: Optional[tuple[str, str]] = None
+        # User name once resolved by get_current_user
+        self._current_user: Optional[str] = None
     
     @property
     def workspace_client(self) -> WorkspaceClient:
@@ -215,21 +538,79 @@ class DatabricksClient:
         return self._client
     
     def get_current_user(self) -> Optional[str]:
-        """Get the current user's email/username."""
-        cache_key = "current_user"
-        cached = self._get_cached(cache_key)
-        if cached is not None:
-            return cached
+        """
+        Get the current user's email/username.
+        
+        The user is fixed for the lifetime of the client and scopes every
+        disk cache key, so a successful lookup is kept; failures are retried
+        on the next call.
+        """
+        if self._current_user is not None:
+            return self._current_user
         
         try:
             me = self._client.current_user.me()
-            user_email = me.user_name or me.display_name or ""
-            self._set_cached(cache_key, user_email)
-            return user_email
+            self._current_user = me.user_name or me.display_name or ""
+            return self._current_user
         except Exception as e:
             print(f"Could not get current user: {e}")
             return None
     
+    def _resolve_workspace(self) -> Optional[tuple[str, str]]:
+        """
+        Resolve the workspace host and ID used to build UI links.
+        
+        Both are fixed for the lifetime of the client, so a successful lookup
+        (which may cost an HTTP call for the workspace ID) is kept; failures
+        are retried on the next call.
+        
+        Returns:
+            (host, workspace_id), or None if either cannot be determined
+        """
+        if self._workspace is not None:
+            return self._workspace
+        
+        # Get workspace host - try multiple sources (Databricks App deployment)
+        # 1. WorkspaceClient config (auto-discovered in Databricks Apps)
+        # 2. Environment variables (DATABRICKS_HOST)
+        host = self._client.config.host
+        if not host:
+            host = os.getenv("DATABRICKS_HOST")
+        if not host:
+            print("Could not get workspace host from client config or environment")
+            return None
+        
+        # Normalize host (remove trailing slash, ensure https)
+        host = host.rstrip('/')
+        if not host.startswith('http'):
+            host = f"https://{host}"
+        
+        # Get workspace ID - try multiple sources
+        workspace_id: Optional[str] = None
+        
+        # 1. Try SDK's get_workspace_id() method first (most reliable)
+        try:
+            workspace_id = str(self._client.get_workspace_id())
+        except Exception:
+            pass
+        
+        # 2. Try environment variable DATABRICKS_WORKSPACE_ID
+        if not workspace_id:
+            workspace_id = os.getenv("DATABRICKS_WORKSPACE_ID")
+        
+        # 3. Extract from host URL as fallback
+        if not workspace_id:
+            match = _AZURE_WORKSPACE_ID_RE.search(host) or _WORKSPACE_ID_PARAM_RE.search(host)
+            if match:
+                workspace_id = match.group(1)
+        
+        if not workspace_id:
+            print(f"Could not determine workspace ID from SDK, env, or host: {host}")
+            return None
+        
+        self._workspace = (host, workspace_id)
+        return self._workspace
+    
     def get_query_profile_url(self, statement_id: str) -> Optional[str]:
         """
         Build URL to view query profile in Databricks Query History UI.
@@ -244,76 +625,145 @@ class DatabricksClient:
             URL string to the query profile page, or None if URL cannot be built
         """
         try:
-            # Get workspace host - try multiple sources (Databricks App deployment)
-            # 1. WorkspaceClient config (auto-discovered in Databricks Apps)
-            # 2. Environment variables (DATABRICKS_HOST)
-            host = self._client.config.host
-            if not host:
-                host = os.getenv("DATABRICKS_HOST")
-            if not host:
-                print("Could not get workspace host from client config or environment")
-                return None
-            
-            # Normalize host (remove trailing slash, ensure https)
-            host = host.rstrip('/')
-            if not host.startswith('http'):
-                host = f"https://{host}"
-            
-            # Get workspace ID - try multiple sources
-            workspace_id: Optional[str] = None
-            
-            # 1. Try SDK's get_workspace_id() method first (most reliable)
-            try:
-                workspace_id = str(self._client.get_workspace_id())
-            except Exception:
-                pass
-            
-            # 2. Try environment variable DATABRICKS_WORKSPACE_ID
-            if not workspace_id:
-                workspace_id = os.getenv("DATABRICKS_WORKSPACE_ID")
-            
-            # 3. Extract from host URL as fallback
-            if not workspace_id:
-                # Azure pattern: adb-{workspace_id}.{region}.azuredatabricks.net
-                azure_match = re.search(r'adb-(\d+)\.', host)
-                if azure_match:
-                    workspace_id = azure_match.group(1)
-                else:
-                    # AWS/GCP pattern or /?o={workspace_id} in URL
-                    aws_match = re.search(r'[/\?]o=(\d+)', host)
-                    if aws_match:
-                        workspace_id = aws_match.group(1)
-            
-            if not workspace_id:
-                print(f"Could not determine workspace ID from SDK, env, or host: {host}")
-                return None
-            
-            # Build the Query History URL
-            # Format: {host}/sql/history?o={workspace_id}&queryId={statement_id}
-            url = f"{host}/sql/history?o={workspace_id}&queryId={statement_id}"
-            
-            return url
-            
+            workspace = self._resolve_workspace()
         except Exception as e:
             print(f"Error building query profile URL: {e}")
             return None
+        if workspace is None:
+            return None
+        
+        host, workspace_id = workspace
+        # Format: {host}/sql/history?o={workspace_id}&queryId={statement_id}
+        return f"{host}/sql/history?o={workspace_id}&queryId={statement_id}"
     
     def _get_cached(self, key: str) -> Optional[Any]:
         """Get a cached value if not expired."""
-        if key in self._cache:
-            timestamp, value = self._cache[key]
-            if time.time() - timestamp < self._cache_ttl:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._cache.move_to_end(key)
                 return value
             del self._cache[key]
-        return None
+            return None
     
-    def _set_cached(self, key: str, value: Any) -> None:
-        """Cache a value with current timestamp."""
-        self._cache[key] = (time.time(), value)
+    def _set_cached(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Cache a value, evicting expired and then least recently used entries
+        past the size limit.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds to keep the value (defaults to the client-wide TTL)
+        """
+        now = time.monotonic()
+        expires_at = now + (self._cache_ttl if ttl is None else ttl)
+        with self._cache_lock:
+            self._cache[key] = (expires_at, value)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_max_entries:
+                # Drop expired entries before sacrificing live ones
+                expired = [k for k, (entry_expires_at, _) in self._cache.items() if entry_expires_at <= now]
+                for k in expired:
+                    del self._cache[k]
+            while len(self._cache) > self._cache_max_entries:
+                self._cache.popitem(last=False)
     
     def clear_cache(self) -> None:
         """Clear all cached data."""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
+        if self._disk_cache_dir and os.path.isdir(self._disk_cache_dir):
+            for name in os.listdir(self._disk_cache_dir):
+                if name.endswith(".parquet"):
+                    try:
+                        os.remove(os.path.join(self._disk_cache_dir, name))
+                    except OSError:
+                        pass
+    
+    def _disk_cache_path(self, key: str) -> str:
+        """File holding the on-disk copy of a cached SQL result."""
+        return os.path.join(self._disk_cache_dir, key.replace(":", "_") + ".parquet")
+    
+    def _read_disk_cache(self, key: str, ttl: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """Load a SQL result from the disk cache if present and not expired."""
+        if not self._disk_cache_dir:
+            return None
+        path = self._disk_cache_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) >= (self._disk_cache_ttl if ttl is None else ttl):
+                return None
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Could not read disk cache entry %s: %s", path, e)
+            return None
+    
+    def _write_disk_cache(self, key: str, df: pd.DataFrame) -> None:
+        """Persist a SQL result to the disk cache (atomic replace)."""
+        if not self._disk_cache_dir:
+            return
+        path = self._disk_cache_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self._disk_cache_dir, mode=0o700, exist_ok=True)
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Could not write disk cache entry %s: %s", path, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def _user_disk_cache_key(self, key: str) -> Optional[str]:
+        """
+        Scope a disk cache key to the workspace host and current user.
+        
+        Listings depend on who is asking, so entries are never shared across
+        users. Returns None (skip the disk tier) when disk caching is off or
+        the user cannot be resolved.
+        """
+        if not self._disk_cache_dir:
+            return None
+        user = self.get_current_user()
+        if not user:
+            return None
+        host = getattr(self._client.config, "host", None) or os.getenv("DATABRICKS_HOST", "")
+        digest = hashlib.sha256(f"{host}\n{user}".encode()).hexdigest()[:16]
+        return f"{key}:{digest}"
+    
+    def _read_disk_records(self, key: Optional[str], record_type: type) -> Optional[list]:
+        """Load a list of dataclass records persisted by _write_disk_records."""
+        if key is None:
+            return None
+        df = self._read_disk_cache(key, ttl=LIST_DISK_CACHE_TTL_SECONDS)
+        if df is None or df.empty:
+            return None
+        columns = [f.name for f in fields(record_type)]
+        # Parquet round-trips missing values as NaN; restore None
+        df = df.reindex(columns=columns).astype(object)
+        df = df.where(df.notna(), None)
+        try:
+            return [record_type(*row) for row in df.itertuples(index=False, name=None)]
+        except Exception as e:
+            logger.warning("Could not load disk cache entry %s: %s", key, e)
+            return None
+    
+    def _write_disk_records(self, key: Optional[str], records: list) -> None:
+        """Persist a non-empty list of dataclass records to the disk cache."""
+        if key is None or not records:
+            return
+        columns = [f.name for f in fields(records[0])]
+        df = pd.DataFrame(
+            [[getattr(record, name) for name in columns] for record in records],
+            columns=columns,
+        )
+        self._write_disk_cache(key, df)
     
     def execute_sql(self, sql: str, use_cache: bool = True) -> pd.DataFrame:
         """
@@ -332,18 +782,28 @@ class DatabricksClient:
                 "or pass warehouse_id to DatabricksClient constructor."
             )
         
-        # Check cache
-        cache_key = f"sql:{hash(sql)}"
+        # Check cache (Arrow results are typed, so they get their own entries)
+        cache_key = _sql_cache_key(sql)
+        if self._arrow_results:
+            cache_key += ":arrow"
         if use_cache:
             cached = self._get_cached(cache_key)
             if cached is not None:
                 return cached
+            cached = self._read_disk_cache(cache_key)
+            if cached is not None:
+                self._set_cached(cache_key, cached)
+                return cached
         
         # Execute query (wait_timeout max is 50s)
+        transport = {}
+        if self._arrow_results:
+            transport = {"disposition": Disposition.EXTERNAL_LINKS, "format": Format.ARROW_STREAM}
         response = self._client.statement_execution.execute_statement(
             warehouse_id=self._warehouse_id,
             statement=sql,
             wait_timeout="50s",
+            **transport,
         )
         
         # Check for errors
@@ -356,21 +816,64 @@ class DatabricksClient:
             return pd.DataFrame()
         
         columns = [col.name for col in response.manifest.schema.columns]
-        data = []
-        
-        if response.result.data_array:
-            for row in response.result.data_array:
-                data.append(dict(zip(columns, row)))
-        
-        df = pd.DataFrame(data)
+        if self._arrow_results:
+            df = self._fetch_arrow_result(response, columns)
+        else:
+            # Build directly from the row arrays; no per-row dicts
+            df = pd.DataFrame(response.result.data_array or [], columns=columns)
         
         # Cache the result
         if use_cache:
             self._set_cached(cache_key, df)
+            self._write_disk_cache(cache_key, df)
         
         return df
     
-    def list_genie_spaces(self, progress_callback: Optional[callable] = None) -> list[GenieSpace]:
+    def _fetch_arrow_result(self, response: Any, columns: list[str]) -> pd.DataFrame:
+        """
+        Download an EXTERNAL_LINKS / ARROW_STREAM result into a DataFrame.
+        
+        Chunks are downloaded concurrently and concatenated in chunk order.
+        
+        Args:
+            response: StatementResponse from execute_statement
+            columns: Column names from the result manifest
+            
+        Returns:
+            pandas DataFrame with typed columns
+        """
+        import pyarrow as pa
+        import requests
+        
+        links = {link.chunk_index: link for link in (response.result.external_links or [])}
+        chunk_indexes = sorted(
+            {chunk.chunk_index for chunk in (response.manifest.chunks or [])} | set(links)
+        )
+        if not chunk_indexes:
+            return pd.DataFrame(columns=columns)
+        
+        def download(chunk_index: int) -> "pa.Table":
+            link = links.get(chunk_index)
+            if link is None:
+                chunk = self._client.statement_execution.get_statement_result_chunk_n(
+                    response.statement_id, chunk_index
+                )
+                link = chunk.external_links[0]
+            # Presigned URL: must not carry the workspace auth header
+            reply = requests.get(link.external_link, headers=link.http_headers or {}, timeout=60)
+            reply.raise_for_status()
+            return pa.ipc.open_stream(reply.content).read_all()
+        
+        with ThreadPoolExecutor(max_workers=min(MESSAGE_FETCH_WORKERS, len(chunk_indexes))) as executor:
+            tables = list(executor.map(download, chunk_indexes))
+        
+        return pa.concat_tables(tables).to_pandas()
+    
+    def list_genie_spaces(
+        self,
+        progress_callback: Optional[callable] = None,
+        max_pages: int = 30,
+    ) -> list[GenieSpace]:
         """
         List all Genie spaces in the workspace using the Genie API.
         
@@ -380,6 +883,7 @@ class DatabricksClient:
         Args:
             progress_callback: Optional callback function that receives (count, has_more, total=None) 
                                to report loading progress.
+            max_pages: Upper bound on pages of 100 spaces fetched (default 30)
         
         Returns:
             List of GenieSpace objects
@@ -391,96 +895,108 @@ class DatabricksClient:
                 progress_callback(len(cached), False, None)
             return cached
         
-        spaces = []
-        max_pages = 30  # Support up to 3000 spaces
+        # A previous app process may have persisted the listing
+        disk_key = self._user_disk_cache_key(cache_key)
+        cached = self._read_disk_records(disk_key, GenieSpace)
+        if cached is not None:
+            self._set_cached(cache_key, cached)
+            self._warm_space_cache(cached)
+            if progress_callback:
+                progress_callback(len(cached), False, None)
+            return cached
+        
+        spaces: list[GenieSpace] = []
+        
+        def fetch_sdk_page(page_token: Optional[str]) -> tuple[list, Optional[str]]:
+            response = self._client.genie.list_spaces(page_size=100, page_token=page_token)
+            return response.spaces or [], getattr(response, 'next_page_token', None)
+        
+        def sdk_page_to_spaces(spaces_in_page: list) -> list[GenieSpace]:
+            # Optional attributes vary across SDK versions (current ones
+            # have no creator fields); probe them once per page
+            sample = spaces_in_page[0] if spaces_in_page else None
+            owner_attrs = [name for name in ('creator_name', 'creator') if hasattr(sample, name)]
+            has_create_time = hasattr(sample, 'create_time')
+            has_warehouse_id = hasattr(sample, 'warehouse_id')
+            
+            page = []
+            for space in spaces_in_page:
+                owner = None
+                for name in owner_attrs:
+                    owner = getattr(space, name)
+                    if owner:
+                        break
+                create_time = space.create_time if has_create_time else None
+                # Positional args (id, name, description, created_at,
+                # warehouse_id, owner) skip kwarg matching per row
+                page.append(GenieSpace(
+                    space.space_id or "",
+                    space.title or space.space_id or "Unnamed Space",
+                    space.description or "",
+                    str(create_time) if create_time else "",
+                    space.warehouse_id if has_warehouse_id else None,
+                    owner,
+                ))
+            return page
+        
+        # REST API directly (works in all SDK versions)
+        def fetch_rest_page(page_token: Optional[str]) -> tuple[list, Optional[str]]:
+            # Build query params
+            query_params = {'page_size': 100}
+            if page_token:
+                query_params['page_token'] = page_token
+            
+            # Direct REST API call
+            response = self._client.api_client.do('GET', '/api/2.0/genie/spaces', query=query_params)
+            return response.get('spaces', []), response.get('next_page_token')
+        
+        def rest_page_to_spaces(spaces_in_page: list) -> list[GenieSpace]:
+            # Positional args: (id, name, description, created_at, warehouse_id, owner)
+            return [
+                GenieSpace(
+                    space.get('space_id', ''),
+                    space.get('title') or space.get('space_id', 'Unnamed Space'),
+                    space.get('description', ''),
+                    space.get('create_time', ''),
+                    space.get('warehouse_id'),
+                    space.get('creator_name') or space.get('creator'),
+                )
+                for space in spaces_in_page
+            ]
         
-        # Try SDK list_spaces method first (newer SDK versions)
+        # (fetch_page, page_to_spaces, failure message): try the SDK's
+        # list_spaces first (newer SDK versions), then the REST API
+        pagers = [(fetch_rest_page, rest_page_to_spaces, "REST API list spaces failed")]
         if hasattr(self._client.genie, 'list_spaces'):
+            pagers.insert(0, (fetch_sdk_page, sdk_page_to_spaces, "SDK list_spaces failed, trying REST API"))
+        
+        for fetch_page, page_to_spaces, failure_message in pagers:
+            spaces = []  # Reset for fallback
             try:
-                page_token = None
-                page_count = 0
-                
-                while page_count < max_pages:
-                    page_count += 1
-                    response = self._client.genie.list_spaces(page_size=100, page_token=page_token)
-                    spaces_in_page = response.spaces or []
-                    
-                    for space in spaces_in_page:
-                        owner = getattr(space, 'creator_name', None) or getattr(space, 'creator', None)
-                        create_time = getattr(space, 'create_time', None)
-                        spaces.append(GenieSpace(
-                            id=space.space_id or "",
-                            name=space.title or space.space_id or "Unnamed Space",
-                            description=space.description or "",
-                            created_at=str(create_time) if create_time else "",
-                            warehouse_id=getattr(space, 'warehouse_id', None),
-                            owner=owner,
-                        ))
-                    
-                    page_token = getattr(response, 'next_page_token', None)
-                    
+                for spaces_in_page, page_token in _prefetch_pages(fetch_page, max_pages):
+                    spaces.extend(page_to_spaces(spaces_in_page))
                     if progress_callback:
                         progress_callback(len(spaces), page_token is not None, None)
-                    
-                    if not page_token:
-                        break
-                
-                if spaces:
-                    self._set_cached(cache_key, spaces)
-                    return spaces
-                    
             except Exception as e:
-                print(f"SDK list_spaces failed, trying REST API: {e}")
-                spaces = []  # Reset for fallback
-        
-        # Fallback: Use REST API directly (works in all SDK versions)
-        try:
-            page_token = None
-            page_count = 0
-            
-            while page_count < max_pages:
-                page_count += 1
-                
-                # Build query params
-                query_params = {'page_size': 100}
-                if page_token:
-                    query_params['page_token'] = page_token
-                
-                # Direct REST API call
-                response = self._client.api_client.do('GET', '/api/2.0/genie/spaces', query=query_params)
-                spaces_in_page = response.get('spaces', [])
-                
-                for space in spaces_in_page:
-                    spaces.append(GenieSpace(
-                        id=space.get('space_id', ''),
-                        name=space.get('title') or space.get('space_id', 'Unnamed Space'),
-                        description=space.get('description', ''),
-                        created_at=space.get('create_time', ''),
-                        warehouse_id=space.get('warehouse_id'),
-                        owner=space.get('creator_name') or space.get('creator'),
-                    ))
-                
-                page_token = response.get('next_page_token')
-                
-                if progress_callback:
-                    progress_callback(len(spaces), page_token is not None, None)
-                
-                if not page_token:
-                    break
+                print(f"{failure_message}: {e}")
+                continue
             
             if spaces:
                 self._set_cached(cache_key, spaces)
-            return spaces
-            
-        except Exception as e:
-            print(f"REST API list spaces failed: {e}")
+                self._write_disk_records(disk_key, spaces)
+                self._warm_space_cache(spaces)
+                return spaces
+            # An empty SDK listing still gets the REST retry; a successful
+            # REST walk is final
+            if fetch_page is fetch_rest_page:
+                return spaces
         
         # Fallback/supplement: Query system tables to find spaces with activity
         # This catches spaces that aren't returned by the API but have query history
         try:
             from queries.sql import get_spaces_from_system_tables_query
             
-            print("[DEBUG] Querying system tables for additional spaces...")
+            logger.debug("Querying system tables for additional spaces...")
             space_ids_from_api = {s.id for s in spaces}
             
             sql = get_spaces_from_system_tables_query(hours=720)  # 30 days
@@ -488,10 +1004,11 @@ class DatabricksClient:
             
             if not df.empty:
                 added_count = 0
-                for _, row in df.iterrows():
-                    space_id = str(row.get("space_id", "") or "")
+                rows = df.reindex(columns=["space_id", "query_count"], fill_value="").fillna("")
+                for space_id, query_count in rows.itertuples(index=False, name=None):
+                    space_id = str(space_id or "")
                     if space_id and space_id not in space_ids_from_api:
-                        query_count = int(row.get("query_count", 0) or 0)
+                        query_count = int(query_count or 0)
                         spaces.append(GenieSpace(
                             id=space_id,
                             name=f"📊 Space {space_id[:12]}... ({query_count} queries)",
@@ -503,16 +1020,23 @@ class DatabricksClient:
                         added_count += 1
                 
                 if added_count > 0:
-                    print(f"[DEBUG] Added {added_count} spaces from system tables")
+                    logger.debug("Added %s spaces from system tables", added_count)
                     if progress_callback:
                         progress_callback(len(spaces), False, None)
         except Exception as e:
-            print(f"[DEBUG] System tables query for spaces failed: {e}")
+            logger.debug("System tables query for spaces failed: %s", e)
         
         if spaces:
             self._set_cached(cache_key, spaces)
+            self._write_disk_records(disk_key, spaces)
         return spaces
     
+    def _warm_space_cache(self, spaces: list[GenieSpace]) -> None:
+        """Seed the per-space cache used by get_genie_space from a listing."""
+        for space in spaces:
+            if space.id:
+                self._set_cached(f"genie_space:{space.id}", space)
+    
     def get_genie_space(self, space_id: str) -> Optional[GenieSpace]:
         """
         Get a specific Genie space by ID.
@@ -568,58 +1092,142 @@ class DatabricksClient:
         """
         if not conversation_id or conversation_id == "N/A":
             return None
+        
+        try:
+            contents, prompt = self._fetch_conversation_message_contents(space_id, conversation_id)
+        except Exception as e:
+            print(f"Could not retrieve Genie message for conversation {conversation_id}: {e}")
+            return None
+        
+        # If message_id provided, return that specific message when it has content
+        if message_id and contents.get(message_id):
+            return contents[message_id]
+        return prompt
+    
+    def _fetch_conversation_message_contents(
+        self,
+        space_id: str,
+        conversation_id: str,
+    ) -> tuple[dict[str, str], Optional[str]]:
+        """
+        Fetch a conversation's messages once and index their content.
+        
+        Uses REST API: GET /api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages
+        
+        The result is cached per conversation, so looking up several messages
+        of the same conversation costs a single request.
+        
+        Args:
+            space_id: The Genie space ID
+            conversation_id: The conversation ID
             
-        cache_key = f"genie_message:{space_id}:{conversation_id}"
+        Returns:
+            (message_id -> content, user prompt) where the prompt is the first
+            user message's content, or None if there is none
+        """
+        cache_key = f"genie_messages:{space_id}:{conversation_id}"
         cached = self._get_cached(cache_key)
         if cached is not None:
             return cached
         
-        try:
-            # Try REST API to get conversation messages
-            response = self._client.api_client.do(
-                'GET',
-                f'/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages'
-            )
-            
-            messages = response.get('messages', [])
-            
-            # Debug: log the response structure
-            print(f"Genie API response for {conversation_id}: {len(messages)} messages found")
-            if messages and len(messages) > 0:
-                first_msg = messages[0]
-                print(f"First message keys: {list(first_msg.keys()) if isinstance(first_msg, dict) else type(first_msg)}")
-            
-            # If message_id provided, find that specific message
-            if message_id:
-                for msg in messages:
-                    if msg.get('id') == message_id or msg.get('message_id') == message_id:
-                        content = msg.get('content', '')
-                        if content:
-                            self._set_cached(cache_key, content)
-                            return content
-            
-            # Otherwise, find the first user message (the original prompt)
-            for msg in messages:
-                role = msg.get('role', '').lower()
-                if role in ('user', 'human'):
-                    content = msg.get('content', '')
-                    if content:
-                        self._set_cached(cache_key, content)
-                        return content
-            
-            # If no user message found, try getting from message text/query field
+        response = self._client.api_client.do(
+            'GET',
+            f'/api/2.0/genie/spaces/{space_id}/conversations/{conversation_id}/messages'
+        )
+        messages = response.get('messages', [])
+        logger.debug("Genie API response for %s: %s messages found", conversation_id, len(messages))
+        
+        contents: dict[str, str] = {}
+        for msg in messages:
+            content = msg.get('content', '')
+            for key in ('id', 'message_id'):
+                msg_id = msg.get(key)
+                if msg_id and not contents.get(msg_id):
+                    contents[msg_id] = content
+        
+        # Find the first user message (the original prompt)
+        prompt: Optional[str] = None
+        for msg in messages:
+            role = msg.get('role', '').lower()
+            if role in ('user', 'human') and msg.get('content', ''):
+                prompt = msg['content']
+                break
+        
+        # If no user message found, try getting from message text/query field
+        if prompt is None:
             for msg in messages:
                 # Some APIs use 'text' or 'query' instead of 'content'
                 content = msg.get('text') or msg.get('query') or msg.get('content', '')
                 if content and msg.get('role', '').lower() in ('user', 'human', ''):
-                    self._set_cached(cache_key, content)
-                    return content
-            
-            return None
+                    prompt = content
+                    break
+        
+        result = (contents, prompt)
+        self._set_cached(cache_key, result)
+        return result
+    
+    def iter_conversations(
+        self,
+        space_id: str,
+        max_conversations: int = 500,
+        include_all: bool = False,
+    ) -> Iterator[GenieConversation]:
+        """
+        Yield conversations for a Genie space one page at a time.
+        
+        The next page is only requested once the current one is exhausted, so
+        a caller that stops early skips the remaining page fetches. Results
+        are not cached; use list_conversations for that.
+        
+        Args:
+            space_id: The Genie space ID
+            max_conversations: Maximum number of conversations to yield
+            include_all: List every user's conversations (admin view)
             
-        except Exception as e:
-            print(f"Could not retrieve Genie message for conversation {conversation_id}: {e}")
-            return None
+        Yields:
+            GenieConversation objects
+        """
+        if max_conversations <= 0:
+            return
+        
+        page_size = min(100, max_conversations)  # API typically supports up to 100 per page
+        max_pages = 20  # Safety limit to prevent infinite loops
+        yielded = 0
+        page_token = None
+        
+        for page_count in range(1, max_pages + 1):
+            kwargs = {
+                "space_id": space_id,
+                "page_size": page_size,
+            }
+            if include_all:
+                kwargs["include_all"] = True
+            if page_token:
+                kwargs["page_token"] = page_token
+            
+            # Returns GenieListConversationsResponse with .conversations list and .next_page_token
+            response = self._client.genie.list_conversations(**kwargs)
+            
+            if response and response.conversations:
+                logger.debug("Page %s: %s conversations", page_count, len(response.conversations))
+                for conv in response.conversations:
+                    # GenieConversationSummary has: conversation_id, title, created_timestamp
+                    # (positional args; last_updated_time is not available in summary)
+                    yield GenieConversation(
+                        conv.conversation_id or "",
+                        conv.title or "",
+                        str(conv.created_timestamp) if conv.created_timestamp else "",
+                    )
+                    yielded += 1
+                    if yielded >= max_conversations:
+                        return
+            
+            # Check for next page (a token that doesn't advance would loop)
+            next_token = getattr(response, 'next_page_token', None)
+            if not next_token or next_token == page_token:
+                logger.debug("No more pages (fetched %s page(s))", page_count)
+                return
+            page_token = next_token
     
     def list_conversations(
         self, 
@@ -636,120 +1244,58 @@ class DatabricksClient:
         Returns:
             List of GenieConversation objects
         """
-        cache_key = f"conversations:{space_id}"
+        # Key on the limit too, or a short cached list would be served to
+        # callers asking for more conversations
+        cache_key = f"conversations:{space_id}:{max_conversations}"
         cached = self._get_cached(cache_key)
-        # Only use cache if it has conversations (don't cache empty results)
-        if cached is not None and len(cached) > 0:
-            print(f"[DEBUG] Returning {len(cached)} cached conversations for space {space_id}")
+        if cached is not None:
+            logger.debug("Returning %s cached conversations for space %s", len(cached), space_id)
+            return cached
+        
+        disk_key = self._user_disk_cache_key(cache_key)
+        cached = self._read_disk_records(disk_key, GenieConversation)
+        if cached is not None:
+            logger.debug("Returning %s disk-cached conversations for space %s", len(cached), space_id)
+            self._set_cached(cache_key, cached)
             return cached
         
         conversations: list[GenieConversation] = []
-        page_size = min(100, max_conversations)  # API typically supports up to 100 per page
-        max_pages = 20  # Safety limit to prevent infinite loops
         
         # Use SDK genie.list_conversations with pagination
-        # Returns GenieListConversationsResponse with .conversations list and .next_page_token
         try:
-            print(f"[DEBUG] Calling genie.list_conversations for space_id={space_id} (with pagination)")
+            logger.debug("Calling genie.list_conversations for space_id=%s (with pagination)", space_id)
             
             # Try without include_all first (most common case - user's own conversations)
-            page_token = None
-            page_count = 0
-            
-            while page_count < max_pages and len(conversations) < max_conversations:
-                page_count += 1
-                
-                # Build kwargs for API call
-                kwargs = {
-                    "space_id": space_id,
-                    "page_size": page_size,
-                }
-                if page_token:
-                    kwargs["page_token"] = page_token
-                
-                response = self._client.genie.list_conversations(**kwargs)
-                
-                if page_count == 1:
-                    print(f"[DEBUG] SDK response type: {type(response)}")
-                    print(f"[DEBUG] SDK response has conversations: {response.conversations is not None if response else 'None response'}")
-                
-                # Response is GenieListConversationsResponse with .conversations list
-                if response and response.conversations:
-                    print(f"[DEBUG] Page {page_count}: {len(response.conversations)} conversations")
-                    for conv in response.conversations:
-                        if len(conversations) >= max_conversations:
-                            break
-                        # GenieConversationSummary has: conversation_id, title, created_timestamp
-                        conversations.append(GenieConversation(
-                            conversation_id=conv.conversation_id or "",
-                            title=conv.title or "",
-                            created_time=str(conv.created_timestamp) if conv.created_timestamp else "",
-                            last_updated_time="",  # Not available in summary
-                        ))
-                
-                # Check for next page
-                page_token = getattr(response, 'next_page_token', None)
-                if not page_token:
-                    print(f"[DEBUG] No more pages (fetched {page_count} page(s))")
-                    break
-                else:
-                    print(f"[DEBUG] Has next_page_token, fetching page {page_count + 1}...")
+            conversations = list(self.iter_conversations(space_id, max_conversations))
             
             # If no conversations, also try with include_all=True (admin view)
             if not conversations:
-                print(f"[DEBUG] No conversations found, trying with include_all=True...")
+                logger.debug("No conversations found, trying with include_all=True...")
                 try:
-                    page_token = None
-                    page_count = 0
-                    
-                    while page_count < max_pages and len(conversations) < max_conversations:
-                        page_count += 1
-                        
-                        kwargs = {
-                            "space_id": space_id,
-                            "include_all": True,
-                            "page_size": page_size,
-                        }
-                        if page_token:
-                            kwargs["page_token"] = page_token
-                        
-                        response = self._client.genie.list_conversations(**kwargs)
-                        
-                        if response and response.conversations:
-                            for conv in response.conversations:
-                                if len(conversations) >= max_conversations:
-                                    break
-                                conversations.append(GenieConversation(
-                                    conversation_id=conv.conversation_id or "",
-                                    title=conv.title or "",
-                                    created_time=str(conv.created_timestamp) if conv.created_timestamp else "",
-                                    last_updated_time="",
-                                ))
-                        
-                        page_token = getattr(response, 'next_page_token', None)
-                        if not page_token:
-                            break
-                            
+                    conversations = list(self.iter_conversations(space_id, max_conversations, include_all=True))
                 except Exception as admin_err:
-                    print(f"[DEBUG] include_all=True failed (expected for non-admins): {admin_err}")
+                    logger.debug("include_all=True failed (expected for non-admins): %s", admin_err)
             
-            print(f"[DEBUG] SDK list_conversations: {len(conversations)} conversations for space {space_id}")
-            if conversations:
-                print(f"[DEBUG] First conversation: id={conversations[0].conversation_id}, title={conversations[0].title[:50] if conversations[0].title else 'No title'}")
+            logger.debug("SDK list_conversations: %s conversations for space %s", len(conversations), space_id)
+            if conversations and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("First conversation: id=%s, title=%s", conversations[0].conversation_id, conversations[0].title[:50] if conversations[0].title else 'No title')
             
-            # Only cache if we got results
             if conversations:
                 self._set_cached(cache_key, conversations)
+                self._write_disk_records(disk_key, conversations)
+            else:
+                # Remember "no conversations" only briefly
+                self._set_cached(cache_key, conversations, ttl=EMPTY_RESULT_TTL_SECONDS)
             return conversations
             
         except Exception as e:
-            print(f"[DEBUG] SDK list_conversations failed: {e}")
+            logger.debug("SDK list_conversations failed: %s", e)
             import traceback
             traceback.print_exc()
             
             # Fallback: Query conversations from audit logs
             # This works even if the Genie space was deleted or is inaccessible
-            print(f"[DEBUG] Trying fallback: query conversations from audit logs...")
+            logger.debug("Trying fallback: query conversations from audit logs...")
             try:
                 from queries.sql import get_conversations_from_audit_query
                 
@@ -761,29 +1307,31 @@ class DatabricksClient:
                 fallback_df = self.execute_sql(fallback_sql, use_cache=True)
                 
                 if not fallback_df.empty:
-                    for _, row in fallback_df.iterrows():
-                        conv_id = str(row.get("conversation_id", "") or "")
+                    rows = fallback_df.reindex(columns=["conversation_id", "title", "created_time"], fill_value="").fillna("")
+                    for conv_id, title, created_time in rows.itertuples(index=False, name=None):
+                        conv_id = str(conv_id or "")
                         if conv_id:
                             # Truncate title to first 100 chars if it's a user message
-                            title = str(row.get("title", "") or "")
+                            title = str(title or "")
                             if len(title) > 100:
                                 title = title[:100] + "..."
                             
                             conversations.append(GenieConversation(
                                 conversation_id=conv_id,
                                 title=title or f"Conversation {conv_id[:8]}",
-                                created_time=str(row.get("created_time", "") or ""),
+                                created_time=str(created_time or ""),
                                 last_updated_time="",
                             ))
                     
-                    print(f"[DEBUG] Fallback found {len(conversations)} conversations from audit logs")
+                    logger.debug("Fallback found %s conversations from audit logs", len(conversations))
                     if conversations:
                         self._set_cached(cache_key, conversations)
+                        self._write_disk_records(disk_key, conversations)
                     return conversations
                 else:
-                    print(f"[DEBUG] Fallback: No conversations found in audit logs for space {space_id}")
+                    logger.debug("Fallback: No conversations found in audit logs for space %s", space_id)
             except Exception as fallback_err:
-                print(f"[DEBUG] Fallback query also failed: {fallback_err}")
+                logger.debug("Fallback query also failed: %s", fallback_err)
                 traceback.print_exc()
             
             return []
@@ -809,6 +1357,8 @@ class DatabricksClient:
             return cached
         
         messages: list[GenieMessage] = []
+        # Checked once; per-message diagnostics are skipped entirely otherwise
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         # Use SDK genie.list_conversation_messages
         try:
@@ -821,20 +1371,25 @@ class DatabricksClient:
             # Based on API: GenieMessage has message_id (not id), content, attachments, status
             # Attachments: GenieAttachment has attachment_id, query (QueryAttachment), text (TextAttachment)
             if response and response.messages:
-                print(f"[DEBUG] Processing {len(response.messages)} messages")
+                logger.debug("Processing %s messages", len(response.messages))
                 for msg in response.messages:
                     # Extract attachments
                     attachments: list[GenieMessageAttachment] = []
                     if msg.attachments:
                         for att in msg.attachments:
-                            att_obj = GenieMessageAttachment(
-                                attachment_type="query" if att.query else ("text" if att.text else "other"),
-                            )
-                            # Check for query attachment which contains SQL
-                            if att.query:
-                                att_obj.statement_id = att.query.statement_id or ""
-                                att_obj.sql_content = att.query.description or ""
-                                print(f"[DEBUG] Found query attachment with statement_id: {att_obj.statement_id[:20] if att_obj.statement_id else 'NONE'}...")
+                            query = att.query
+                            # Query attachments carry the generated SQL in
+                            # .query (.description is Genie's prose summary)
+                            if query:
+                                att_obj = GenieMessageAttachment(
+                                    "query", query.statement_id or "", query.query or ""
+                                )
+                                if debug:
+                                    logger.debug("Found query attachment with statement_id: %s...", att_obj.statement_id[:20] if att_obj.statement_id else 'NONE')
+                            elif att.text:
+                                att_obj = GenieMessageAttachment("text")
+                            else:
+                                att_obj = GenieMessageAttachment("other")
                             attachments.append(att_obj)
                     
                     # Use message_id (not id!) - id is None in the API response
@@ -847,26 +1402,27 @@ class DatabricksClient:
                         attachments=attachments,
                     )
                     messages.append(msg_obj)
-                    print(f"[DEBUG] Message: id={msg_obj.message_id[:12] if msg_obj.message_id else 'NONE'}..., created_ts={msg_obj.created_timestamp}, content='{msg_obj.content[:30] if msg_obj.content else 'EMPTY'}...', attachments={len(attachments)}")
+                    if debug:
+                        logger.debug("Message: id=%s..., created_ts=%s, content='%s...', attachments=%s", msg_obj.message_id[:12] if msg_obj.message_id else 'NONE', msg_obj.created_timestamp, msg_obj.content[:30] if msg_obj.content else 'EMPTY', len(attachments))
             
-            if messages:
-                print(f"[DEBUG] SDK get_messages: {len(messages)} messages for conv {conversation_id[:8]}...")
+            if messages and debug:
+                logger.debug("SDK get_messages: %s messages for conv %s...", len(messages), conversation_id[:8])
                 first_content = messages[0].content[:50] if messages[0].content else "EMPTY"
-                print(f"[DEBUG] First message content: '{first_content}'")
+                logger.debug("First message content: '%s'", first_content)
                 if messages[0].attachments:
-                    print(f"[DEBUG] First message has {len(messages[0].attachments)} attachments")
+                    logger.debug("First message has %s attachments", len(messages[0].attachments))
             
             self._set_cached(cache_key, messages)
             return messages
             
         except Exception as e:
-            print(f"[DEBUG] SDK get_messages failed for {conversation_id}: {e}")
+            logger.debug("SDK get_messages failed for %s: %s", conversation_id, e)
             import traceback
             traceback.print_exc()
             
             # Fallback: Query messages from audit logs
             # This works even if the Genie space was deleted or is inaccessible
-            print(f"[DEBUG] Trying fallback: query messages from audit logs...")
+            logger.debug("Trying fallback: query messages from audit logs...")
             try:
                 from queries.sql import get_messages_from_audit_query
                 
@@ -878,39 +1434,121 @@ class DatabricksClient:
                 fallback_df = self.execute_sql(fallback_sql, use_cache=True)
                 
                 if not fallback_df.empty:
-                    for _, row in fallback_df.iterrows():
-                        msg_id = str(row.get("message_id", "") or "")
+                    rows = fallback_df.reindex(columns=["message_id", "content"], fill_value="").fillna("")
+                    for msg_id, content in rows.itertuples(index=False, name=None):
+                        msg_id = str(msg_id or "")
                         if msg_id:
                             msg_obj = GenieMessage(
                                 message_id=msg_id,
-                                content=str(row.get("content", "") or ""),
+                                content=str(content or ""),
                                 status="COMPLETED",  # Assume completed since it's historical
                                 created_timestamp=0,  # Not available from audit
                                 attachments=[],  # Will be populated from query history
                             )
                             messages.append(msg_obj)
                     
-                    print(f"[DEBUG] Fallback found {len(messages)} messages from audit logs")
+                    logger.debug("Fallback found %s messages from audit logs", len(messages))
                     if messages:
                         self._set_cached(cache_key, messages)
                     return messages
                 else:
-                    print(f"[DEBUG] Fallback: No messages found in audit logs for conversation {conversation_id}")
+                    logger.debug("Fallback: No messages found in audit logs for conversation %s", conversation_id)
             except Exception as fallback_err:
-                print(f"[DEBUG] Fallback query also failed: {fallback_err}")
+                logger.debug("Fallback query also failed: %s", fallback_err)
                 traceback.print_exc()
             
             return []
     
+    def _iter_conversation_messages(
+        self,
+        space_id: str,
+        conversations: list[GenieConversation],
+    ) -> Iterator[tuple[str, list[GenieMessage]]]:
+        """
+        Yield (conversation_id, messages) in conversation order.
+        
+        Messages are fetched concurrently (up to MESSAGE_FETCH_WORKERS at a
+        time); stopping iteration early cancels fetches not yet started.
+        
+        Args:
+            space_id: The Genie space ID
+            conversations: Conversations to fetch messages for
+        """
+        conv_ids = [conv.conversation_id for conv in conversations if conv.conversation_id]
+        if not conv_ids:
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=min(MESSAGE_FETCH_WORKERS, len(conv_ids)))
+        try:
+            futures = [
+                executor.submit(self.get_conversation_messages, space_id, conv_id)
+                for conv_id in conv_ids
+            ]
+            for conv_id, future in zip(conv_ids, futures):
+                yield conv_id, future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def _normalize_sql(self, sql: str) -> str:
         """Normalize SQL for comparison by removing whitespace and lowercasing."""
-        if not sql:
-            return ""
-        # Remove comments, normalize whitespace, lowercase
-        sql = re.sub(r'--.*$', '', sql, flags=re.MULTILINE)
-        sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
-        sql = re.sub(r'\s+', ' ', sql)
-        return sql.strip().lower()
+        return _normalize_sql_text(sql)
+    
+    def _build_space_index(self, space_id: str) -> SpacePromptIndex:
+        """
+        Index every SQL attachment in a space's recent conversations.
+        
+        Messages are fetched once (in parallel) and the index is cached for
+        SPACE_INDEX_TTL_SECONDS, so repeated prompt lookups for the same space
+        don't re-list conversations or re-fetch messages.
+        
+        Args:
+            space_id: The Genie space ID
+            
+        Returns:
+            SpacePromptIndex over every SQL attachment in conversation order
+        """
+        cache_key = f"space_index:{space_id}"
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        conversations = self.list_conversations(space_id, max_conversations=SPACE_INDEX_MAX_CONVERSATIONS)
+        logger.debug("Found %s conversations for space %s", len(conversations), space_id)
+        
+        statement_to_prompt: dict[str, str] = {}
+        statement_to_source: dict[str, PromptSource] = {}
+        sources: list[PromptSource] = []
+        
+        for conv_id, messages in self._iter_conversation_messages(space_id, conversations):
+            # Find user prompt (first message content that's not SQL)
+            user_prompt: Optional[str] = None
+            for msg in messages:
+                content = msg.content
+                if content and not user_prompt:
+                    # Check if it looks like a question (not SQL)
+                    if not _looks_like_sql(content):
+                        user_prompt = content
+                
+                for att in msg.attachments:
+                    if not (att.statement_id or att.sql_content):
+                        continue
+                    source = PromptSource(
+                        conversation_id=conv_id,
+                        message_id=msg.message_id,
+                        attachment=att,
+                        prompt=user_prompt,
+                    )
+                    sources.append(source)
+                    if att.statement_id:
+                        statement_to_source.setdefault(att.statement_id, source)
+                        if user_prompt:
+                            statement_to_prompt[att.statement_id] = user_prompt
+        
+        logger.debug("Built index: %s statement_ids, %s SQL attachments", len(statement_to_prompt), len(sources))
+        
+        index = SpacePromptIndex(sources, statement_to_prompt, statement_to_source)
+        self._set_cached(cache_key, index, ttl=SPACE_INDEX_TTL_SECONDS)
+        return index
     
     def find_prompt_for_query(
         self,
@@ -921,7 +1559,9 @@ class DatabricksClient:
         """
         Find the Genie prompt that generated a given SQL query using reverse lookup.
         
-        Lists conversations for the space, checks message attachments for matching SQL.
+        Probes the space's cached SQL attachment index by statement_id first,
+        then by normalized SQL text, and only scans attachments for a partial
+        SQL match when both miss.
         
         Args:
             space_id: The Genie space ID
@@ -937,53 +1577,38 @@ class DatabricksClient:
             return cached
         
         try:
-            conversations = self.list_conversations(space_id, max_conversations=50)
-            normalized_target = self._normalize_sql(statement_text)
+            index = self._build_space_index(space_id)
+            
+            # An exact statement_id match wins
+            matched_by = 'statement_id'
+            match = index.statement_to_source.get(statement_id) if statement_id else None
+            
+            # Only normalize SQL if no statement_id matched
+            normalized_target = self._normalize_sql(statement_text) if match is None else ""
+            if normalized_target:
+                matched_by = 'sql_text'
+                match = index.sql_to_source.get(normalized_target[:_SQL_KEY_LEN])
+                if match is None:
+                    # Use substring match for partial SQL (query_text may be truncated)
+                    target_prefix = normalized_target[:_SQL_PARTIAL_MATCH_LEN]
+                    for source in index.sources:
+                        normalized_att = source.attachment.normalized_sql
+                        if normalized_att and (
+                            target_prefix in normalized_att
+                            or normalized_att[:_SQL_PARTIAL_MATCH_LEN] in normalized_target
+                        ):
+                            match = source
+                            break
             
-            for conv in conversations:
-                conv_id = conv.conversation_id
-                if not conv_id:
-                    continue
-                
-                messages = self.get_conversation_messages(space_id, conv_id)
-                
-                # Find user prompt (first message content that's not SQL)
-                user_prompt: Optional[str] = None
-                for msg in messages:
-                    content = msg.content
-                    if content and not user_prompt:
-                        # Check if it looks like a question (not SQL)
-                        if not content.strip().upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'CREATE')):
-                            user_prompt = content
-                    
-                    # Check attachments for SQL match
-                    for att in msg.attachments:
-                        # Check for direct statement_id match
-                        if att.statement_id and att.statement_id == statement_id:
-                            result = {
-                                'conversation_id': conv_id,
-                                'message_id': msg.message_id,
-                                'prompt': user_prompt,
-                                'matched_by': 'statement_id'
-                            }
-                            self._set_cached(cache_key, result)
-                            return result
-                        
-                        # Check for SQL text match
-                        att_sql = att.sql_content
-                        if att_sql:
-                            normalized_att = self._normalize_sql(att_sql)
-                            # Use substring match for partial SQL (query_text may be truncated)
-                            if normalized_target and normalized_att:
-                                if normalized_target[:200] in normalized_att or normalized_att[:200] in normalized_target:
-                                    result = {
-                                        'conversation_id': conv_id,
-                                        'message_id': msg.message_id,
-                                        'prompt': user_prompt,
-                                        'matched_by': 'sql_text'
-                                    }
-                                    self._set_cached(cache_key, result)
-                                    return result
+            if match is not None:
+                result = {
+                    'conversation_id': match.conversation_id,
+                    'message_id': match.message_id,
+                    'prompt': match.prompt,
+                    'matched_by': matched_by
+                }
+                self._set_cached(cache_key, result)
+                return result
             
             return None
             
@@ -991,6 +1616,36 @@ class DatabricksClient:
             print(f"Error in find_prompt_for_query: {e}")
             return None
     
+    def _get_prompts_from_system_tables(self, space_id: str, statement_ids: list[str]) -> dict[str, str]:
+        """
+        Map statement IDs to prompts with a single server-side join.
+        
+        Args:
+            space_id: The Genie space ID
+            statement_ids: Statement IDs to resolve
+            
+        Returns:
+            dict mapping statement_id to prompt text (empty if the system
+            tables can't be read)
+        """
+        if not statement_ids:
+            return {}
+        
+        from queries.sql import get_prompts_by_statement_ids_query
+        
+        try:
+            df = self.execute_sql(get_prompts_by_statement_ids_query(space_id, statement_ids))
+        except Exception as e:
+            logger.debug("System table prompt lookup failed: %s", e)
+            return {}
+        
+        if df.empty:
+            return {}
+        df = df.dropna(subset=["prompt"])
+        prompts = dict(zip(df["statement_id"].astype(str), df["prompt"].astype(str)))
+        logger.debug("System tables resolved %s/%s statement prompts", len(prompts), len(statement_ids))
+        return prompts
+    
     def get_prompts_for_queries(
         self,
         space_id: str,
@@ -1000,8 +1655,9 @@ class DatabricksClient:
         """
         Get prompts for multiple queries at once using reverse lookup.
         
-        Uses strongly typed SDK objects to list conversations and messages,
-        then builds an index mapping statement_id -> prompt text.
+        Statements are first resolved in the warehouse by joining query
+        history with the audit log; any left over fall back to the space's
+        cached SQL attachment index (see _build_space_index).
         
         Args:
             space_id: The Genie space ID
@@ -1017,72 +1673,36 @@ class DatabricksClient:
             return prompts
         
         try:
-            # Get all conversations for the space using strongly typed SDK
-            conversations = self.list_conversations(space_id, max_conversations=100)
-            print(f"[DEBUG] Found {len(conversations)} conversations for space {space_id}")
-            
-            # Build index: statement_id -> prompt AND normalized_sql -> prompt
-            statement_to_prompt: dict[str, str] = {}
-            sql_to_prompt: dict[str, str] = {}
-            
-            for i, conv in enumerate(conversations):
-                conv_id = conv.conversation_id
-                if not conv_id:
-                    continue
-                
-                # Get messages using strongly typed SDK
-                messages = self.get_conversation_messages(space_id, conv_id)
-                
-                # Debug first conversation
-                if i == 0 and messages:
-                    first_msg = messages[0]
-                    print(f"[DEBUG] First message: id={first_msg.message_id}, content='{first_msg.content[:50] if first_msg.content else 'EMPTY'}', attachments={len(first_msg.attachments)}")
-                
-                # Find user prompt (first message that's not SQL)
-                user_prompt: Optional[str] = None
-                for msg in messages:
-                    content = msg.content
-                    if content and not user_prompt:
-                        # Check if it looks like a question (not SQL)
-                        if not content.strip().upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'CREATE')):
-                            user_prompt = content
-                    
-                    # Index all SQL attachments
-                    for att in msg.attachments:
-                        # Index by statement_id
-                        if att.statement_id and user_prompt:
-                            statement_to_prompt[att.statement_id] = user_prompt
-                        
-                        # Index by normalized SQL
-                        if att.sql_content and user_prompt:
-                            normalized = self._normalize_sql(att.sql_content)
-                            if normalized:
-                                sql_to_prompt[normalized[:300]] = user_prompt
+            total = len(queries_df)
+            statement_ids = queries_df["statement_id"].astype(str).reset_index(drop=True)
             
-            print(f"[DEBUG] Built index: {len(statement_to_prompt)} statement_ids, {len(sql_to_prompt)} SQL texts")
+            # One warehouse query resolves statements the system tables
+            # already know about; only the rest need the Genie API
+            matched_prompts = statement_ids.map(
+                self._get_prompts_from_system_tables(space_id, statement_ids.unique().tolist())
+            )
             
-            # Now match each query
-            total = len(queries_df)
-            matched = 0
-            for idx, row in queries_df.iterrows():
-                statement_id = str(row.get('statement_id', ''))
-                query_text = str(row.get('query_text', '') or '')
-                
-                # Try statement_id match first
-                if statement_id in statement_to_prompt:
-                    prompts[statement_id] = statement_to_prompt[statement_id]
-                    matched += 1
-                else:
-                    # Try SQL text match
-                    normalized = self._normalize_sql(query_text)
-                    if normalized[:300] in sql_to_prompt:
-                        prompts[statement_id] = sql_to_prompt[normalized[:300]]
-                        matched += 1
-                
-                if progress_callback:
-                    progress_callback(idx + 1, total)
+            unmatched = matched_prompts.isna()
+            if unmatched.any():
+                index = self._build_space_index(space_id)
+                matched_prompts = matched_prompts.fillna(statement_ids.map(index.statement_to_prompt))
+                unmatched = matched_prompts.isna()
             
-            print(f"[DEBUG] Matched {matched}/{total} queries to prompts")
+            # SQL text is only normalized if some queries can't be matched
+            # by statement_id
+            if unmatched.any() and "query_text" in queries_df.columns and index.sql_to_prompt:
+                sql_to_prompt = index.sql_to_prompt
+                query_texts = queries_df["query_text"].reset_index(drop=True)[unmatched]
+                sql_keys = query_texts.fillna("").astype(str).map(self._normalize_sql).str[:_SQL_KEY_LEN]
+                matched_prompts = matched_prompts.fillna(sql_keys.map(sql_to_prompt))
+            
+            found = matched_prompts.notna()
+            prompts = dict(zip(statement_ids[found], matched_prompts[found]))
+            
+            if progress_callback:
+                progress_callback(total, total)
+            
+            logger.debug("Matched %s/%s queries to prompts", int(found.sum()), total)
             
             return prompts
             
@@ -1127,32 +1747,36 @@ class DatabricksClient:
         except Exception:
             metrics_df = pd.DataFrame()
         
-        # Merge spaces with metrics
-        spaces_data = []
-        for space in spaces:
-            row = {
-                "id": space.id,
-                "name": space.name,
-                "description": space.description,
-                "created_at": space.created_at,
-                "warehouse_id": space.warehouse_id,
-                "query_count": 0,
-                "avg_duration_ms": 0.0,
-                "slow_query_count": 0,
-                "success_rate": 100.0,
-            }
-            
-            if not metrics_df.empty:
-                space_metrics = metrics_df[metrics_df["space_id"] == space.id]
-                if not space_metrics.empty:
-                    row["query_count"] = int(space_metrics["query_count"].iloc[0] or 0)
-                    row["avg_duration_ms"] = float(space_metrics["avg_duration_ms"].iloc[0] or 0)
-                    row["slow_query_count"] = int(space_metrics["slow_query_count"].iloc[0] or 0)
-                    row["success_rate"] = float(space_metrics["success_rate"].iloc[0] or 100)
-            
-            spaces_data.append(row)
+        # Merge spaces with metrics in a single left join on space ID
+        space_columns = ["id", "name", "description", "created_at", "warehouse_id"]
+        spaces_df = pd.DataFrame(
+            [
+                (space.id, space.name, space.description, space.created_at, space.warehouse_id)
+                for space in spaces
+            ],
+            columns=space_columns,
+        )
         
-        return pd.DataFrame(spaces_data)
+        metric_defaults = {
+            "query_count": 0,
+            "avg_duration_ms": 0.0,
+            "slow_query_count": 0,
+            "success_rate": 100.0,
+        }
+        if not metrics_df.empty and "space_id" in metrics_df.columns:
+            metrics = (
+                metrics_df.drop_duplicates("space_id")
+                .set_index("space_id")
+                .reindex(columns=list(metric_defaults))
+                .apply(pd.to_numeric, errors="coerce")
+            )
+            spaces_df = spaces_df.join(metrics, on="id")
+        
+        # Spaces without metrics (or no metrics at all) get the defaults
+        spaces_df = spaces_df.reindex(columns=[*space_columns, *metric_defaults])
+        return spaces_df.fillna(metric_defaults).astype(
+            {column: type(default) for column, default in metric_defaults.items()}
+        )
     
     def get_conversations_with_query_metrics(
         self,
@@ -1194,6 +1818,9 @@ class DatabricksClient:
             return cached
         
         result: list[ConversationWithMessages] = []
+        # Checked once; per-message diagnostics are skipped entirely otherwise
+        debug = logger.isEnabledFor(logging.DEBUG)
+        prefetch: Optional[ThreadPoolExecutor] = None
         
         # Track if we're using the fallback path (Genie API unavailable)
         using_audit_fallback = False
@@ -1205,18 +1832,32 @@ class DatabricksClient:
                 progress_callback(0, max_conversations, "Fetching conversations...")
             
             conversations = self.list_conversations(space_id, max_conversations)
-            print(f"[DEBUG] get_conversations_with_query_metrics: {len(conversations)} conversations")
+            logger.debug("get_conversations_with_query_metrics: %s conversations", len(conversations))
             
             if not conversations:
                 return result
             
+            # Steps 1b-1e are independent round trips: issue them together now
+            # and read the results back after the messages are loaded
+            prefetch = ThreadPoolExecutor(max_workers=4)
+            source_future = prefetch.submit(
+                self.execute_sql, get_conversation_sources_query(space_id, hours=720), use_cache=True
+            )
+            overhead_future = prefetch.submit(
+                self.execute_sql, get_message_ai_overhead_query(space_id, hours=720), use_cache=True
+            )
+            space_queries_future = prefetch.submit(
+                self.execute_sql, get_queries_by_space_and_time(space_id, hours=720), use_cache=True
+            )
+            space_info_future = prefetch.submit(self.get_genie_space, space_id)
+            
             # Step 1a: Try to detect if Genie API is working by testing get_genie_space
             # If it fails, we're in fallback mode and should batch-load messages from audit
             try:
                 test_space = self._client.genie.get_space(space_id=space_id)
-                print(f"[DEBUG] Genie API is available for space {space_id}")
+                logger.debug("Genie API is available for space %s", space_id)
             except Exception as api_err:
-                print(f"[DEBUG] Genie API unavailable, using audit fallback mode: {api_err}")
+                logger.debug("Genie API unavailable, using audit fallback mode: %s", api_err)
                 using_audit_fallback = True
                 
                 # Batch load ALL messages for this space from audit logs in one query
@@ -1228,68 +1869,102 @@ class DatabricksClient:
                     batch_msg_df = self.execute_sql(batch_msg_sql, use_cache=True)
                     
                     if not batch_msg_df.empty:
-                        for _, row in batch_msg_df.iterrows():
-                            conv_id = str(row.get("conversation_id", "") or "")
-                            msg_id = str(row.get("message_id", "") or "")
-                            if conv_id and msg_id:
-                                if conv_id not in batch_messages_by_conv:
-                                    batch_messages_by_conv[conv_id] = []
-                                
-                                msg_obj = GenieMessage(
-                                    message_id=msg_id,
-                                    content=str(row.get("content", "") or ""),
-                                    status="COMPLETED",
-                                    created_timestamp=0,
-                                    attachments=[],  # Will be populated from query history
-                                )
-                                batch_messages_by_conv[conv_id].append(msg_obj)
+                        rows = batch_msg_df.reindex(
+                            columns=["conversation_id", "message_id", "content"], fill_value=""
+                        ).fillna("").astype(str)
+                        rows = rows[(rows["conversation_id"] != "") & (rows["message_id"] != "")]
+                        for conv_id, msg_id, content in rows.itertuples(index=False, name=None):
+                            # Attachments are populated from query history
+                            batch_messages_by_conv.setdefault(conv_id, []).append(
+                                GenieMessage(msg_id, content, "COMPLETED", 0)
+                            )
                         
-                        print(f"[DEBUG] Batch loaded messages for {len(batch_messages_by_conv)} conversations from audit")
+                        logger.debug("Batch loaded messages for %s conversations from audit", len(batch_messages_by_conv))
                 except Exception as batch_err:
-                    print(f"[DEBUG] Batch message loading failed: {batch_err}")
+                    logger.debug("Batch message loading failed: %s", batch_err)
+            
+            # Step 2: Collect all statement_ids across all conversations
+            # (the step 1b-1e queries submitted above run meanwhile)
+            all_statement_ids: set[str] = set()
+            conversation_messages: dict[str, list[GenieMessage]] = {}
+            
+            if using_audit_fallback:
+                # Use batch-loaded messages from audit logs
+                logger.debug("Using batch-loaded messages from audit fallback")
+                for conv in conversations:
+                    conversation_messages[conv.conversation_id] = batch_messages_by_conv.get(conv.conversation_id, [])
+                # In fallback mode, attachments are empty - we'll use time-based correlation with query history
+            else:
+                # Normal path: load messages via Genie API (fetched concurrently)
+                fetched = self._iter_conversation_messages(space_id, conversations)
+                total_conversations = len(conversations)
+                # Report ~100 steps at most; each callback redraws a Streamlit widget
+                progress_step = max(1, total_conversations // 100)
+                for i, (conv_id, messages) in enumerate(fetched):
+                    done = i + 1
+                    if progress_callback and (done % progress_step == 0 or done == total_conversations):
+                        progress_callback(done, total_conversations, f"Loading messages for conversation {done}...")
+                    
+                    conversation_messages[conv_id] = messages
+                    
+                    # Extract statement_ids from attachments
+                    for msg in messages:
+                        for att in msg.attachments:
+                            if att.statement_id:
+                                all_statement_ids.add(att.statement_id)
+            
+            logger.debug("Found %s unique statement_ids across all conversations", len(all_statement_ids))
             
             # Step 1b: Fetch conversation sources from audit logs
             # This tells us if each conversation was initiated via API or Genie Space UI
             conversation_source_map: dict[str, str] = {}
             try:
-                source_sql = get_conversation_sources_query(space_id, hours=720)
-                source_df = self.execute_sql(source_sql, use_cache=True)
+                source_df = source_future.result()
                 
                 if not source_df.empty:
                     # Group by conversation_id and take the first (earliest) action
-                    for _, row in source_df.iterrows():
-                        conv_id = str(row.get("conversation_id", "") or "")
-                        if conv_id and conv_id not in conversation_source_map:
-                            conversation_source_map[conv_id] = str(row.get("message_source", "Unknown") or "Unknown")
+                    rows = source_df.reindex(
+                        columns=["conversation_id", "message_source"], fill_value=""
+                    ).fillna("").astype(str)
+                    rows = rows[rows["conversation_id"] != ""].drop_duplicates("conversation_id")
+                    conversation_source_map = dict(zip(
+                        rows["conversation_id"], rows["message_source"].replace("", "Unknown")
+                    ))
                     
-                    print(f"[DEBUG] Found sources for {len(conversation_source_map)} conversations from audit logs")
+                    logger.debug("Found sources for %s conversations from audit logs", len(conversation_source_map))
             except Exception as e:
-                print(f"[DEBUG] Could not fetch conversation sources from audit: {e}")
+                logger.debug("Could not fetch conversation sources from audit: %s", e)
             
             # Step 1c: Fetch AI overhead per message from audit logs
             message_ai_overhead_map: dict[str, float] = {}  # message_id -> ai_overhead_sec
             message_timestamp_map: dict[str, str] = {}  # message_id -> timestamp
             message_user_map: dict[str, str] = {}  # message_id -> user_email (for correlation)
             try:
-                overhead_sql = get_message_ai_overhead_query(space_id, hours=720)
-                overhead_df = self.execute_sql(overhead_sql, use_cache=True)
+                overhead_df = overhead_future.result()
                 
                 if not overhead_df.empty:
-                    for _, row in overhead_df.iterrows():
-                        msg_id = str(row.get("message_id", "") or "")
-                        if msg_id:
-                            message_ai_overhead_map[msg_id] = float(row.get("ai_overhead_sec", 0) or 0)
-                            message_timestamp_map[msg_id] = str(row.get("message_time", "") or "")
-                            # Store user email for correlation matching
-                            message_user_map[msg_id] = str(row.get("user_email", "") or "")
-                            # Also update conversation source if not already set
-                            conv_id = str(row.get("conversation_id", "") or "")
-                            if conv_id and conv_id not in conversation_source_map:
-                                conversation_source_map[conv_id] = str(row.get("message_source", "Unknown") or "Unknown")
+                    rows = overhead_df.reindex(
+                        columns=["message_id", "message_time", "user_email", "conversation_id", "message_source"],
+                        fill_value="",
+                    ).astype(object).fillna("").astype(str)
+                    has_message = rows["message_id"] != ""
+                    rows = rows[has_message]
+                    msg_ids = rows["message_id"]
+                    overhead_sec = pd.to_numeric(
+                        overhead_df.reindex(columns=["ai_overhead_sec"])["ai_overhead_sec"], errors="coerce"
+                    ).fillna(0.0)[has_message]
+                    message_ai_overhead_map = dict(zip(msg_ids, overhead_sec.astype(float)))
+                    message_timestamp_map = dict(zip(msg_ids, rows["message_time"]))
+                    # Store user email for correlation matching
+                    message_user_map = dict(zip(msg_ids, rows["user_email"]))
+                    # Also update conversation source if not already set
+                    conv_rows = rows[rows["conversation_id"] != ""].drop_duplicates("conversation_id")
+                    for conv_id, source in zip(conv_rows["conversation_id"], conv_rows["message_source"]):
+                        conversation_source_map.setdefault(conv_id, source or "Unknown")
                     
-                    print(f"[DEBUG] Found AI overhead for {len(message_ai_overhead_map)} messages, user emails for {len(message_user_map)}")
+                    logger.debug("Found AI overhead for %s messages, user emails for %s", len(message_ai_overhead_map), len(message_user_map))
             except Exception as e:
-                print(f"[DEBUG] Could not fetch AI overhead from audit: {e}")
+                logger.debug("Could not fetch AI overhead from audit: %s", e)
             
             # Step 1d: Fetch ALL queries for this space from query history (for time-based correlation)
             # This is needed because Genie Space UI interactions don't populate query.statement_id in attachments
@@ -1299,134 +1974,95 @@ class DatabricksClient:
                 if progress_callback:
                     progress_callback(0, max_conversations, "Fetching SQL queries for space...")
                 
-                space_queries_sql = get_queries_by_space_and_time(space_id, hours=720)
-                space_queries_df = self.execute_sql(space_queries_sql, use_cache=True)
+                space_queries_df = space_queries_future.result()
                 
                 if not space_queries_df.empty:
-                    for _, row in space_queries_df.iterrows():
-                        stmt_id = str(row.get("statement_id", "") or "")
-                        if stmt_id:
-                            qm = QueryMetrics(
-                                statement_id=stmt_id,
-                                query_text=str(row.get("query_text", "") or ""),
-                                start_time=str(row.get("start_time", "") or ""),
-                                total_duration_ms=int(row.get("total_duration_ms", 0) or 0),
-                                compilation_ms=int(row.get("compilation_ms", 0) or 0),
-                                execution_ms=int(row.get("execution_ms", 0) or 0),
-                                queue_wait_ms=int(row.get("queue_wait_ms", 0) or 0),
-                                compute_wait_ms=int(row.get("compute_wait_ms", 0) or 0),
-                                result_fetch_ms=int(row.get("result_fetch_ms", 0) or 0),
-                                ai_overhead_sec=0.0,
-                                bytes_scanned=int(row.get("bytes_scanned", 0) or 0),
-                                rows_scanned=int(row.get("rows_scanned", 0) or 0),
-                                rows_returned=int(row.get("rows_returned", 0) or 0),
-                                execution_status=str(row.get("execution_status", "") or ""),
-                                bottleneck=str(row.get("bottleneck", "NORMAL") or "NORMAL"),
-                                speed_category=str(row.get("speed_category", "FAST") or "FAST"),
-                                # Correlation fields
-                                genie_conversation_id=str(row.get("genie_conversation_id", "") or ""),
-                                executed_by=str(row.get("executed_by", "") or ""),
-                            )
-                            all_space_queries.append(qm)
-                            space_query_by_id[stmt_id] = qm
+                    for qm in _query_metrics_from_df(space_queries_df):
+                        all_space_queries.append(qm)
+                        space_query_by_id[qm.statement_id] = qm
                     
-                    print(f"[DEBUG] Found {len(all_space_queries)} total queries for space from query history")
+                    logger.debug("Found %s total queries for space from query history", len(all_space_queries))
             except Exception as e:
-                print(f"[DEBUG] Could not fetch space queries: {e}")
+                logger.debug("Could not fetch space queries: %s", e)
                 import traceback
                 traceback.print_exc()
             
             # Step 1e: Get warehouse_id from the Genie space for concurrency calculation
             space_warehouse_id = ""
             try:
-                space_info = self.get_genie_space(space_id)
+                space_info = space_info_future.result()
                 if space_info and space_info.warehouse_id:
                     space_warehouse_id = space_info.warehouse_id
-                    print(f"[DEBUG] Got warehouse_id from Genie space: {space_warehouse_id}")
+                    logger.debug("Got warehouse_id from Genie space: %s", space_warehouse_id)
                 else:
-                    print(f"[DEBUG] Could not get warehouse_id from Genie space")
+                    logger.debug("Could not get warehouse_id from Genie space")
             except Exception as e:
-                print(f"[DEBUG] Error getting Genie space info: {e}")
-            
-            # Step 2: Collect all statement_ids across all conversations
-            all_statement_ids: list[str] = []
-            conversation_messages: dict[str, list[GenieMessage]] = {}
-            
-            if using_audit_fallback:
-                # Use batch-loaded messages from audit logs
-                print(f"[DEBUG] Using batch-loaded messages from audit fallback")
-                for conv in conversations:
-                    conversation_messages[conv.conversation_id] = batch_messages_by_conv.get(conv.conversation_id, [])
-                # In fallback mode, attachments are empty - we'll use time-based correlation with query history
-            else:
-                # Normal path: load messages via Genie API
-                for i, conv in enumerate(conversations):
-                    if progress_callback:
-                        progress_callback(i + 1, len(conversations), f"Loading messages for conversation {i + 1}...")
-                    
-                    messages = self.get_conversation_messages(space_id, conv.conversation_id)
-                    conversation_messages[conv.conversation_id] = messages
-                    
-                    # Extract statement_ids from attachments
-                    for msg in messages:
-                        for att in msg.attachments:
-                            if att.statement_id:
-                                all_statement_ids.append(att.statement_id)
-            
-            print(f"[DEBUG] Found {len(all_statement_ids)} statement_ids across all conversations")
+                logger.debug("Error getting Genie space info: %s", e)
             
             # Step 3: Batch query for all statement metrics
             query_metrics_map: dict[str, QueryMetrics] = {}
             
-            if all_statement_ids:
+            # Statements already returned by the space-wide query (step 1d)
+            # carry the same metrics, so only the rest are looked up
+            unique_statement_ids = [sid for sid in all_statement_ids if sid not in space_query_by_id]
+            if unique_statement_ids:
                 if progress_callback:
                     progress_callback(len(conversations), len(conversations), "Fetching SQL query metrics...")
                 
-                # Deduplicate statement_ids
-                unique_statement_ids = list(set(all_statement_ids))
-                
-                # Query in batches of 100 to avoid query size limits
-                batch_size = 100
-                for batch_start in range(0, len(unique_statement_ids), batch_size):
-                    batch_ids = unique_statement_ids[batch_start:batch_start + batch_size]
-                    statement_ids_str = build_statement_ids_filter(batch_ids)
-                    sql = QUERIES_BY_STATEMENT_IDS.format(statement_ids=statement_ids_str)
-                    
+                # Batches run concurrently on the prefetch executor; results
+                # are merged here in submission order
+                batch_futures = [
+                    prefetch.submit(
+                        self.execute_sql,
+                        QUERIES_BY_STATEMENT_IDS.format(statement_ids=build_statement_ids_filter(
+                            unique_statement_ids[batch_start:batch_start + STATEMENT_METRICS_BATCH_SIZE]
+                        )),
+                        use_cache=False,
+                    )
+                    for batch_start in range(0, len(unique_statement_ids), STATEMENT_METRICS_BATCH_SIZE)
+                ]
+                for future in batch_futures:
                     try:
-                        metrics_df = self.execute_sql(sql, use_cache=False)
-                        
-                        for _, row in metrics_df.iterrows():
-                            stmt_id = str(row.get("statement_id", ""))
-                            if stmt_id:
-                                query_metrics_map[stmt_id] = QueryMetrics(
-                                    statement_id=stmt_id,
-                                    query_text=str(row.get("query_text", "") or ""),
-                                    start_time=str(row.get("start_time", "") or ""),
-                                    total_duration_ms=int(row.get("total_duration_ms", 0) or 0),
-                                    compilation_ms=int(row.get("compilation_ms", 0) or 0),
-                                    execution_ms=int(row.get("execution_ms", 0) or 0),
-                                    queue_wait_ms=int(row.get("queue_wait_ms", 0) or 0),
-                                    compute_wait_ms=int(row.get("compute_wait_ms", 0) or 0),
-                                    result_fetch_ms=int(row.get("result_fetch_ms", 0) or 0),
-                                    ai_overhead_sec=0.0,  # Will be computed per message
-                                    bytes_scanned=int(row.get("bytes_scanned", 0) or 0),
-                                    rows_scanned=int(row.get("rows_scanned", 0) or 0),
-                                    rows_returned=int(row.get("rows_returned", 0) or 0),
-                                    execution_status=str(row.get("execution_status", "") or ""),
-                                    bottleneck=str(row.get("bottleneck", "NORMAL") or "NORMAL"),
-                                    speed_category=str(row.get("speed_category", "FAST") or "FAST"),
-                                )
+                        for qm in _query_metrics_from_df(future.result()):
+                            query_metrics_map[qm.statement_id] = qm
                     except Exception as e:
-                        print(f"[DEBUG] Error fetching metrics for batch: {e}")
+                        logger.debug("Error fetching metrics for batch: %s", e)
             
             # NOTE: Concurrency metrics (genie_concurrent, warehouse_concurrent) are calculated
             # on-demand when a user selects a specific query for detailed view via load_query_concurrency().
             # This avoids N+M SQL calls during initial load which was causing significant delays.
             
-            print(f"[DEBUG] Fetched metrics for {len(query_metrics_map)} queries")
+            logger.debug("Fetched metrics for %s queries outside the space-wide query", len(query_metrics_map))
+            
+            # Timestamps parsed once up front (UTC epoch ns) so the matching
+            # below compares integers instead of parsing per candidate
+            timed_queries = [*all_space_queries, *query_metrics_map.values()]
+            query_start_ns = dict(zip(
+                [qm.statement_id for qm in timed_queries],
+                _timestamps_to_ns([qm.start_time for qm in timed_queries]),
+            ))
+            message_ns_map = dict(zip(
+                message_timestamp_map, _timestamps_to_ns(list(message_timestamp_map.values()))
+            ))
+            # Space queries with a start time, sorted by it (stable, so query
+            # history order is kept on ties); time windows over them are
+            # found by bisection instead of a scan per message
+            timed_space_queries = sorted(
+                (qm for qm in all_space_queries if query_start_ns.get(qm.statement_id) is not None),
+                key=lambda qm: query_start_ns[qm.statement_id],
+            )
+            space_starts_ns = [query_start_ns[qm.statement_id] for qm in timed_space_queries]
+            
+            # Space queries issued by each Genie conversation (query history
+            # order), so conversation matching only visits that conversation's queries
+            queries_by_conv: dict[str, list[QueryMetrics]] = {}
+            for qm in all_space_queries:
+                if qm.genie_conversation_id:
+                    queries_by_conv.setdefault(qm.genie_conversation_id, []).append(qm)
             
             # Step 4: Assemble hierarchical structure
             for conv in conversations:
+                conv_queries = queries_by_conv.get(conv.conversation_id, ())
                 messages_raw = conversation_messages.get(conv.conversation_id, [])
                 
                 # Determine conversation source from audit logs
@@ -1436,34 +2072,27 @@ class DatabricksClient:
                 
                 # Find user prompts and build MessageWithQueries
                 messages_with_queries: list[MessageWithQueries] = []
+                # User who started the conversation: the first message with
+                # a user in the audit logs (message_user_map)
                 user_email = ""
                 
-                # Get user email from the first message in the conversation (who started it)
-                # This comes from audit logs via message_user_map
-                if messages_raw:
-                    for msg_check in messages_raw:
-                        first_msg_user = message_user_map.get(msg_check.message_id, "")
-                        if first_msg_user:
-                            user_email = first_msg_user
-                            break
-                
                 # Track which queries have been assigned to avoid duplicates
                 assigned_query_ids: set[str] = set()
                 
                 for msg in messages_raw:
+                    if not user_email:
+                        user_email = message_user_map.get(msg.message_id, "")
+                    
                     # Extract queries for this message
                     msg_queries: list[QueryMetrics] = []
                     
                     # Method 1: Direct statement_id from attachments (API-initiated queries)
                     for att in msg.attachments:
                         if att.statement_id:
-                            # Try query_metrics_map first (from attachment batch query)
-                            if att.statement_id in query_metrics_map:
-                                msg_queries.append(query_metrics_map[att.statement_id])
-                                assigned_query_ids.add(att.statement_id)
-                            # Fall back to space_query_by_id (from space-wide query)
-                            elif att.statement_id in space_query_by_id:
-                                msg_queries.append(space_query_by_id[att.statement_id])
+                            # Try space_query_by_id first (space-wide query, includes correlation fields)
+                            qm = space_query_by_id.get(att.statement_id) or query_metrics_map.get(att.statement_id)
+                            if qm is not None:
+                                msg_queries.append(qm)
                                 assigned_query_ids.add(att.statement_id)
                     
                     # Method 2: Correlation for Space UI interactions (no attachment statement_id)
@@ -1471,62 +2100,54 @@ class DatabricksClient:
                     if not msg_queries and all_space_queries:
                         msg_timestamp_str = message_timestamp_map.get(msg.message_id, "")
                         msg_user_email = message_user_map.get(msg.message_id, "")
+                        msg_ns = message_ns_map.get(msg.message_id)
+                        if msg_timestamp_str and msg_ns is None:
+                            logger.debug("Could not parse message timestamp: %s", msg_timestamp_str)
                         
                         # Method 2a: Try matching by genie_conversation_id (most accurate)
-                        for qm in all_space_queries:
-                            if qm.statement_id in assigned_query_ids:
+                        for qm in conv_queries:
+                            if assigned_query_ids and qm.statement_id in assigned_query_ids:
                                 continue
                             
-                            # If query has genie_conversation_id and it matches this conversation
-                            if qm.genie_conversation_id and qm.genie_conversation_id == conv.conversation_id:
-                                # Also verify time proximity (query should be after message)
-                                if msg_timestamp_str:
-                                    try:
-                                        msg_time = pd.to_datetime(msg_timestamp_str)
-                                        query_time = pd.to_datetime(qm.start_time)
-                                        time_diff = (query_time - msg_time).total_seconds()
-                                        if 0 <= time_diff <= 120:
-                                            msg_queries.append(qm)
-                                            assigned_query_ids.add(qm.statement_id)
-                                            print(f"[DEBUG] Conv-matched query {qm.statement_id[:12]}... to message (conv_id match + time)")
-                                    except Exception:
-                                        pass
-                                else:
-                                    # No timestamp, but conversation_id matches - still use it
+                            # Also verify time proximity (query should be after message)
+                            if msg_timestamp_str:
+                                if msg_ns is None:
+                                    break
+                                query_ns = query_start_ns.get(qm.statement_id)
+                                if query_ns is not None and 0 <= query_ns - msg_ns <= _MESSAGE_QUERY_WINDOW_NS:
                                     msg_queries.append(qm)
                                     assigned_query_ids.add(qm.statement_id)
-                                    print(f"[DEBUG] Conv-matched query {qm.statement_id[:12]}... to message (conv_id match only)")
+                                    if debug:
+                                        logger.debug("Conv-matched query %s... to message (conv_id match + time)", qm.statement_id[:12])
+                            else:
+                                # No timestamp, but conversation_id matches - still use it
+                                msg_queries.append(qm)
+                                assigned_query_ids.add(qm.statement_id)
+                                if debug:
+                                    logger.debug("Conv-matched query %s... to message (conv_id match only)", qm.statement_id[:12])
                         
                         # Method 2b: Fall back to user + time window matching
-                        if not msg_queries and msg_timestamp_str:
-                            try:
-                                msg_time = pd.to_datetime(msg_timestamp_str)
+                        if not msg_queries and msg_ns is not None:
+                            # Must be within 2 minute window
+                            lo = bisect_left(space_starts_ns, msg_ns)
+                            hi = bisect_right(space_starts_ns, msg_ns + _MESSAGE_QUERY_WINDOW_NS, lo)
+                            for qm, query_ns in zip(timed_space_queries[lo:hi], space_starts_ns[lo:hi]):
+                                if assigned_query_ids and qm.statement_id in assigned_query_ids:
+                                    continue
                                 
-                                for qm in all_space_queries:
-                                    if qm.statement_id in assigned_query_ids:
-                                        continue
-                                    
-                                    try:
-                                        query_time = pd.to_datetime(qm.start_time)
-                                        time_diff = (query_time - msg_time).total_seconds()
-                                        
-                                        # Must be within 2 minute window
-                                        if 0 <= time_diff <= 120:
-                                            # Prefer queries from the same user
-                                            if msg_user_email and qm.executed_by:
-                                                if qm.executed_by == msg_user_email:
-                                                    msg_queries.append(qm)
-                                                    assigned_query_ids.add(qm.statement_id)
-                                                    print(f"[DEBUG] User+time matched query {qm.statement_id[:12]}... to message (user: {msg_user_email[:20]}..., diff: {time_diff:.1f}s)")
-                                            else:
-                                                # No user info available, fall back to time-only matching
-                                                msg_queries.append(qm)
-                                                assigned_query_ids.add(qm.statement_id)
-                                                print(f"[DEBUG] Time-only matched query {qm.statement_id[:12]}... to message (diff: {time_diff:.1f}s)")
-                                    except Exception:
-                                        pass
-                            except Exception as e:
-                                print(f"[DEBUG] Could not parse message timestamp: {e}")
+                                # Prefer queries from the same user
+                                if msg_user_email and qm.executed_by:
+                                    if qm.executed_by == msg_user_email:
+                                        msg_queries.append(qm)
+                                        assigned_query_ids.add(qm.statement_id)
+                                        if debug:
+                                            logger.debug("User+time matched query %s... to message (user: %s..., diff: %.1fs)", qm.statement_id[:12], msg_user_email[:20], (query_ns - msg_ns) / 1e9)
+                                else:
+                                    # No user info available, fall back to time-only matching
+                                    msg_queries.append(qm)
+                                    assigned_query_ids.add(qm.statement_id)
+                                    if debug:
+                                        logger.debug("Time-only matched query %s... to message (diff: %.1fs)", qm.statement_id[:12], (query_ns - msg_ns) / 1e9)
                     
                     # Only include messages that have content or queries
                     if msg.content or msg_queries:
@@ -1535,68 +2156,41 @@ class DatabricksClient:
                         
                         # Method 1: If we have linked queries, compute AI overhead from message timestamp to earliest query
                         if msg_queries and msg.created_timestamp:
-                            try:
-                                msg_time = pd.to_datetime(msg.created_timestamp, unit='ms', utc=True)
-                                candidate_queries: list[tuple[QueryMetrics, float]] = []
-                                
-                                for q in msg_queries:
-                                    if q.start_time:
-                                        try:
-                                            q_time = pd.to_datetime(q.start_time)
-                                            if msg_time.tzinfo is not None and q_time.tzinfo is None:
-                                                q_time = q_time.tz_localize('UTC')
-                                            diff = (q_time - msg_time).total_seconds()
-                                            # Accept any positive diff (query started after message)
-                                            if diff > 0:
-                                                candidate_queries.append((q, diff))
-                                        except Exception:
-                                            pass
-                                
-                                if candidate_queries:
-                                    earliest = min(candidate_queries, key=lambda x: x[1])
-                                    ai_overhead = earliest[1]
-                                    print(f"[DEBUG] AI overhead: {ai_overhead:.1f}s from {len(msg_queries)} linked queries (msg_ts={msg.created_timestamp})")
-                            except Exception as e:
-                                print(f"[DEBUG] Could not compute AI overhead from linked queries: {e}")
+                            created_ns = msg.created_timestamp * 1_000_000
+                            # Accept any positive diff (query started after message)
+                            diffs = [
+                                query_ns - created_ns
+                                for query_ns in (query_start_ns.get(q.statement_id) for q in msg_queries)
+                                if query_ns is not None and query_ns > created_ns
+                            ]
+                            if diffs:
+                                ai_overhead = min(diffs) / 1e9
+                                if debug:
+                                    logger.debug("AI overhead: %.1fs from %s linked queries (msg_ts=%s)", ai_overhead, len(msg_queries), msg.created_timestamp)
                         
                         # Method 2: No linked queries but have message timestamp - search all space queries
-                        elif msg.created_timestamp and all_space_queries:
-                            try:
-                                msg_time = pd.to_datetime(msg.created_timestamp, unit='ms', utc=True)
-                                candidate_queries = []
-                                
-                                for q in all_space_queries:
-                                    # Don't filter by assigned_query_ids - we just want to find AI overhead
-                                    if q.start_time:
-                                        try:
-                                            q_time = pd.to_datetime(q.start_time)
-                                            if msg_time.tzinfo is not None and q_time.tzinfo is None:
-                                                q_time = q_time.tz_localize('UTC')
-                                            diff = (q_time - msg_time).total_seconds()
-                                            # Query must start after message and within 5 minutes
-                                            if 0 < diff < 300:
-                                                candidate_queries.append((q, diff))
-                                        except Exception:
-                                            pass
-                                
-                                if candidate_queries:
-                                    earliest = min(candidate_queries, key=lambda x: x[1])
-                                    ai_overhead = earliest[1]
-                                    print(f"[DEBUG] AI overhead: {ai_overhead:.1f}s from space queries (msg_ts={msg.created_timestamp})")
-                            except Exception as e:
-                                print(f"[DEBUG] Could not compute AI overhead from space queries: {e}")
+                        elif msg.created_timestamp and space_starts_ns:
+                            created_ns = msg.created_timestamp * 1_000_000
+                            # Don't filter by assigned_query_ids - we just want to find AI overhead.
+                            # The first query starting after the message, if within 5 minutes
+                            first = bisect_right(space_starts_ns, created_ns)
+                            if first < len(space_starts_ns) and space_starts_ns[first] - created_ns < _AI_OVERHEAD_WINDOW_NS:
+                                ai_overhead = (space_starts_ns[first] - created_ns) / 1e9
+                                if debug:
+                                    logger.debug("AI overhead: %.1fs from space queries (msg_ts=%s)", ai_overhead, msg.created_timestamp)
                         
                         # Method 3: Fallback to audit log value if still 0
                         if ai_overhead == 0.0:
                             ai_overhead = message_ai_overhead_map.get(msg.message_id, 0.0)
                             if ai_overhead > 0:
-                                print(f"[DEBUG] AI overhead from audit logs: {ai_overhead:.1f}s (msg_id={msg.message_id[:12]}...)")
-                            else:
+                                if debug:
+                                    logger.debug("AI overhead from audit logs: %.1fs (msg_id=%s...)", ai_overhead, msg.message_id[:12])
+                            elif debug:
                                 # Debug: explain why AI overhead is 0
                                 has_queries = len(msg_queries) > 0
                                 has_msg_ts = msg.created_timestamp > 0
                                 has_audit = msg.message_id in message_ai_overhead_map
-                                print(f"[DEBUG] AI overhead=0: msg_id={msg.message_id[:12]}..., has_queries={has_queries}, has_msg_ts={has_msg_ts}, in_audit_map={has_audit}")
+                                logger.debug("AI overhead=0: msg_id=%s..., has_queries=%s, has_msg_ts=%s, in_audit_map=%s", msg.message_id[:12], has_queries, has_msg_ts, has_audit)
                         
                         timestamp = message_timestamp_map.get(msg.message_id, "")
                         
@@ -1628,7 +2222,7 @@ class DatabricksClient:
                 if messages_with_queries:
                     result.append(conv_with_msgs)
             
-            print(f"[DEBUG] Built {len(result)} conversations with query metrics")
+            logger.debug("Built %s conversations with query metrics", len(result))
             
             # Sort by most recent first
             result.sort(key=lambda c: c.created_time, reverse=True)
@@ -1641,6 +2235,9 @@ class DatabricksClient:
             import traceback
             traceback.print_exc()
             return result
+        finally:
+            if prefetch is not None:
+                prefetch.shutdown(wait=False, cancel_futures=True)
 
 
 # Singleton instance
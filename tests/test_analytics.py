@@ -5,6 +5,7 @@ Tests all analytics functions in services/analytics.py
 """
 
 import pytest
+import pandas as pd
 import sys
 import os
 
@@ -17,6 +18,8 @@ from services.analytics import (
     get_bottleneck_recommendation,
     get_speed_category,
     map_status,
+    map_status_batch,
+    get_diagnostic_queries,
     QueryOptimization,
     QueryTimeline,
 )
@@ -66,6 +69,18 @@ class TestClassifyBottleneck:
         result = classify_bottleneck(100, 100, 350, 600, 1000)
         assert result == "COMPUTE_STARTUP"
 
+    def test_thresholds_are_strict(self):
+        # Exactly at the boundary does not trigger the bottleneck
+        assert classify_bottleneck(0, 0, 0, 500, 1000) == "NORMAL"
+        assert classify_bottleneck(0, 0, 300, 0, 1000) == "NORMAL"
+        assert classify_bottleneck(400, 0, 0, 0, 1000) == "NORMAL"
+        assert classify_bottleneck(401, 0, 0, 0, 1000) == "COMPILATION"
+
+    def test_accepts_string_and_float_inputs(self):
+        # SQL results may arrive as strings or floats
+        assert classify_bottleneck("100", "300", "0", "600.0", 1000.0) == "COMPUTE_STARTUP"
+        assert classify_bottleneck("abc", None, None, None, "1000") == "NORMAL"
+
 
 class TestGetQueryTimeline:
     """Tests for get_query_timeline function."""
@@ -108,6 +123,15 @@ class TestGetQueryTimeline:
         assert durations["Execution"] == 6000
         assert durations["Result Fetch"] == 500
     
+    def test_duration_alias_used_when_total_missing_or_zero(self):
+        phases = {"execution_ms": 500}
+        
+        from_alias = get_query_timeline({**phases, "total_duration_ms": None, "duration_ms": 1000})
+        zero_total = get_query_timeline({**phases, "total_duration_ms": 0, "duration_ms": 1000})
+        
+        assert from_alias[3].percentage == 50.0
+        assert zero_total[3].percentage == 50.0
+    
     def test_timeline_percentages_sum_to_100(self):
         query = {
             "queue_wait_ms": 1000,
@@ -122,6 +146,20 @@ class TestGetQueryTimeline:
         total_pct = sum(t.percentage for t in timeline)
         assert abs(total_pct - 100.0) < 0.1
     
+    def test_timeline_start_offsets_and_rounding(self):
+        query = {
+            "queue_wait_ms": 1,
+            "compute_wait_ms": 0,
+            "compilation_ms": 1,
+            "execution_ms": 1,
+            "result_fetch_ms": 0,
+            "total_duration_ms": 3,
+        }
+        timeline = get_query_timeline(query)
+        
+        assert [t.start_ms for t in timeline] == [0, 1, 1, 2, 3]
+        assert [t.percentage for t in timeline] == [33.3, 0.0, 33.3, 33.3, 0.0]
+    
     def test_timeline_handles_none_values(self):
         query = {
             "queue_wait_ms": None,
@@ -234,6 +272,35 @@ class TestGetQueryOptimizations:
             assert len(opt.description) > 0
             assert len(opt.recommendation) > 0
 
+    def test_optimizations_are_immutable(self):
+        opts = get_query_optimizations({"total_duration_ms": 1000})
+
+        with pytest.raises(AttributeError):
+            opts[0].title = "changed"
+        assert not hasattr(opts[0], "__dict__")
+
+    def test_alias_keys_used_when_primary_missing(self):
+        query = {"read_rows": 5_000_000, "produced_rows": 10}
+        opts = get_query_optimizations(query)
+        assert any("Row Selection" in o.title for o in opts)
+    
+    def test_explicit_zero_not_replaced_by_alias(self):
+        query = {"rows_scanned": 0, "read_rows": 5_000_000, "rows_returned": 10}
+        opts = get_query_optimizations(query)
+        assert not any("Row Selection" in o.title for o in opts)
+    
+    def test_repeated_calls_reuse_cached_instances(self):
+        query = {"total_duration_ms": 120000, "execution_ms": 100000, "bottleneck": "SLOW_EXECUTION"}
+        first = get_query_optimizations(query)
+        second = get_query_optimizations(dict(query))
+        
+        assert isinstance(first, tuple)
+        assert first is second
+
+    def test_large_scan_title_includes_size(self):
+        opts = get_query_optimizations({"bytes_scanned": 5 * 1024 ** 3, "bottleneck": "LARGE_SCAN"})
+        assert any(o.title.endswith("(5.0 GB)") for o in opts)
+
 
 class TestGetBottleneckRecommendation:
     """Tests for get_bottleneck_recommendation function."""
@@ -286,6 +353,133 @@ class TestGetSpeedCategory:
     def test_critical_over_30s(self):
         assert get_speed_category(30000) == "CRITICAL"
         assert get_speed_category(120000) == "CRITICAL"
+    
+    def test_handles_none_and_strings(self):
+        assert get_speed_category(None) == "FAST"
+        assert get_speed_category("15000") == "SLOW"
+
+
+class TestGetDiagnosticQueries:
+    """Tests for get_diagnostic_queries function."""
+    
+    def test_normal_query_includes_general_queries(self):
+        diags = get_diagnostic_queries({"bottleneck": "NORMAL", "genie_space_id": "space-1"})
+        titles = [d.title for d in diags]
+        
+        assert "Genie Space Performance Summary" in titles
+        assert "Data Source Reference" in titles
+        assert "Query Execution Details" not in titles
+    
+    def test_statement_id_adds_execution_details(self):
+        diags = get_diagnostic_queries({"statement_id": "stmt-42", "genie_space_id": "space-1"})
+        
+        assert diags[0].title == "Query Execution Details"
+        assert "statement_id = 'stmt-42'" in diags[0].sql
+    
+    def test_sql_rendered_from_template(self):
+        diag = get_diagnostic_queries({"statement_id": "stmt-42", "genie_space_id": "space-1"})[0]
+        
+        assert "{statement_id}" in diag.sql_template
+        assert diag.sql == diag.sql_template.format(statement_id="stmt-42", genie_space_id="space-1")
+    
+    def test_bottleneck_specific_queries(self):
+        diags = get_diagnostic_queries({"bottleneck": "COMPUTE_STARTUP", "genie_space_id": "space-1"})
+        titles = [d.title for d in diags]
+        
+        assert "Warehouse Cold Start Analysis" in titles
+        assert "Warehouse Usage Gaps" in titles
+    
+    def test_large_scan_includes_data_skipping_check(self):
+        diags = get_diagnostic_queries({"bottleneck": "LARGE_SCAN", "genie_space_id": "space-1"})
+        sql = next(d.sql for d in diags if d.title == "Data Skipping Effectiveness")
+        
+        assert "pruned_files" in sql
+        # Databricks-managed system tables can't be re-laid out by users
+        assert "DESCRIBE DETAIL" not in sql
+    
+    def test_returns_shared_immutable_tuple(self):
+        query = {"bottleneck": "QUEUE_WAIT", "statement_id": "stmt-1", "genie_space_id": "space-1"}
+        first = get_diagnostic_queries(query)
+        
+        assert isinstance(first, tuple)
+        assert get_diagnostic_queries(dict(query)) is first
+    
+    def test_rendered_sql_is_cached_per_space_and_statement(self):
+        query = {"bottleneck": "QUEUE_WAIT", "statement_id": "stmt-7", "genie_space_id": "space-7"}
+        first = [d.sql for d in get_diagnostic_queries(query)]
+        second = [d.sql for d in get_diagnostic_queries(dict(query))]
+        
+        assert all(a is b for a, b in zip(first, second))
+    
+    def test_templates_are_shared_module_constants(self):
+        first = get_diagnostic_queries({"bottleneck": "SLOW_EXECUTION", "genie_space_id": "space-1"})
+        second = get_diagnostic_queries({"bottleneck": "SLOW_EXECUTION", "genie_space_id": "space-2"})
+        
+        assert all(a.sql_template is b.sql_template for a, b in zip(first, second))
+    
+    def test_data_source_reference_is_bounded_by_statement_start(self):
+        diags = get_diagnostic_queries({"statement_id": "stmt-42", "genie_space_id": "space-1"})
+        sql = next(d.sql for d in diags if d.title == "Data Source Reference")
+        
+        # A fixed window relative to now would miss statements older than it
+        assert "current_timestamp()" not in sql
+        assert "a.event_time BETWEEN q.start_time - INTERVAL 60 SECOND AND q.start_time" in sql
+    
+    def test_data_source_reference_looks_up_statement_once(self):
+        diags = get_diagnostic_queries({"statement_id": "stmt-42", "genie_space_id": "space-1"})
+        sql = next(d.sql for d in diags if d.title == "Data Source Reference")
+        
+        assert sql.count("statement_id = 'stmt-42'") == 1
+    
+    def test_known_start_time_is_inlined_as_literal(self):
+        diags = get_diagnostic_queries({
+            "statement_id": "stmt-42",
+            "genie_space_id": "space-1",
+            "start_time": pd.Timestamp("2024-05-01 12:30:00.25", tz="UTC"),
+        })
+        sql = next(d.sql for d in diags if d.title == "Data Source Reference")
+        
+        assert "TIMESTAMP '2024-05-01 12:30:00.250000' - INTERVAL 60 SECOND" in sql
+        assert "q.start_time - INTERVAL 60 SECOND" not in sql
+    
+    def test_unparseable_start_time_falls_back_to_correlated_range(self):
+        diags = get_diagnostic_queries({
+            "statement_id": "stmt-42",
+            "genie_space_id": "space-1",
+            "start_time": "not a time",
+        })
+        sql = next(d.sql for d in diags if d.title == "Data Source Reference")
+        
+        assert "q.start_time - INTERVAL 60 SECOND" in sql
+    
+    def test_correlation_joins_on_minute_bucket(self):
+        diags = get_diagnostic_queries({"genie_space_id": "space-1"})
+        sql = next(d.sql for d in diags if d.title.startswith("Correlate SQL Queries"))
+        
+        assert "AND q.join_bucket = m.minute_bucket" in sql
+        assert "AND q.start_time BETWEEN m.message_time AND m.message_time + INTERVAL 60 SECOND" in sql
+    
+    def test_correlation_preview_projected_after_limit(self):
+        diags = get_diagnostic_queries({"genie_space_id": "space-1"})
+        sql = next(d.sql for d in diags if d.title.startswith("Correlate SQL Queries"))
+        
+        assert sql.index("LIMIT 100") < sql.index("LEFT(qh.statement_text, 200) AS query_preview")
+    
+    def test_setup_ddl_is_not_a_per_query_diagnostic(self):
+        for bottleneck in ("NORMAL", "QUEUE_WAIT", "LARGE_SCAN"):
+            diags = get_diagnostic_queries({"bottleneck": bottleneck, "statement_id": "stmt-1", "genie_space_id": "space-1"})
+            assert not any("CREATE MATERIALIZED VIEW" in d.sql for d in diags)
+    
+    def test_sql_is_fully_rendered(self):
+        for bottleneck in ("COMPUTE_STARTUP", "QUEUE_WAIT", "COMPILATION", "LARGE_SCAN", "SLOW_EXECUTION"):
+            diags = get_diagnostic_queries({
+                "bottleneck": bottleneck,
+                "statement_id": "stmt-42",
+                "genie_space_id": "space-1",
+            })
+            for diag in diags:
+                assert "{" not in diag.sql, diag.title
+                assert diag.category in ("monitoring", "performance", "statistics", "data")
 
 
 class TestMapStatus:
@@ -305,6 +499,10 @@ class TestMapStatus:
         assert map_status("CANCELLED") == "cancelled"
         assert map_status("canceled") == "cancelled"
     
+    def test_mixed_case_maps(self):
+        assert map_status("Finished") == "success"
+        assert map_status("Cancelled") == "cancelled"
+    
     def test_none_maps_to_unknown(self):
         assert map_status(None) == "unknown"
     
@@ -314,3 +512,18 @@ class TestMapStatus:
     def test_unknown_status_maps_to_unknown(self):
         assert map_status("RUNNING") == "unknown"
         assert map_status("PENDING") == "unknown"
+
+
+class TestMapStatusBatch:
+    """Tests for map_status_batch function."""
+    
+    def test_matches_scalar_mapping(self):
+        statuses = ["FINISHED", "failed", "Canceled", "RUNNING", None, ""]
+        result = map_status_batch(statuses)
+        assert list(result) == [map_status(s) for s in statuses]
+    
+    def test_preserves_series_index(self):
+        statuses = pd.Series(["SUCCEEDED", None], index=[10, 20])
+        result = map_status_batch(statuses)
+        assert list(result.index) == [10, 20]
+        assert list(result) == ["success", "unknown"]
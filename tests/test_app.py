@@ -0,0 +1,40 @@
+"""
+Unit Tests for the Streamlit App
+
+Drives app render functions in Streamlit's bare mode (no runtime) with the
+Databricks client mocked out.
+"""
+
+import pytest
+from unittest.mock import patch
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestRenderQueryDetail:
+    """Tests for render_query_detail."""
+    
+    def test_diagnostics_receive_the_query_row(self):
+        import app
+        
+        queries_df = pd.DataFrame({
+            "statement_id": ["stmt-42"],
+            "genie_space_id": ["space-1"],
+            "bottleneck": ["QUEUE_WAIT"],
+            "start_time": ["2024-01-15T10:30:00.000Z"],
+            "query_text": ["SELECT 1"],
+            "total_sec": [1.0],
+        })
+        
+        with patch.object(app, "get_client") as get_client, \
+                patch.object(app, "get_diagnostic_queries", wraps=app.get_diagnostic_queries) as get_diagnostics:
+            get_client.return_value.get_query_profile_url.return_value = ""
+            app.render_query_detail("stmt-42", queries_df)
+        
+        query = get_diagnostics.call_args.args[0]
+        assert query["start_time"] == "2024-01-15T10:30:00.000Z"
+        reference = next(d for d in get_diagnostics(query) if d.title == "Data Source Reference")
+        assert "TIMESTAMP '2024-01-15 10:30:00.000000'" in reference.sql
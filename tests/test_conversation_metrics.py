@@ -175,6 +175,23 @@ class TestConversationWithMessages:
         assert conv.total_ai_overhead_sec == 5.0  # 2.0 + 3.0
         assert conv.success_rate == 100.0
     
+    def test_conversation_counts_shared_statement_once(self):
+        """Test a statement linked to two messages is aggregated once."""
+        shared = QueryMetrics(statement_id="q1", total_duration_ms=12000, execution_status="FINISHED")
+        other = QueryMetrics(statement_id="q2", total_duration_ms=2000, execution_status="FAILED")
+        
+        messages = [
+            MessageWithQueries(message_id="m1", queries=[shared]),
+            MessageWithQueries(message_id="m2", queries=[shared, other]),
+        ]
+        
+        conv = ConversationWithMessages(conversation_id="conv-dup", messages=messages)
+        
+        assert conv.total_queries == 2
+        assert conv.total_duration_ms == 14000
+        assert conv.slow_query_count == 1
+        assert conv.success_rate == 50.0
+    
     def test_conversation_performance_issues(self):
         """Test conversation detects performance issues from messages."""
         slow_query = QueryMetrics(statement_id="q1", total_duration_ms=15000)
@@ -72,6 +72,45 @@ class TestDatabricksClientCache:
         
         assert client._get_cached("key1") is None
         assert client._get_cached("key2") is None
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_expired_entry_is_dropped(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        client = DatabricksClient(warehouse_id="test")
+        client._set_cached("short", "value", ttl=0)
+        
+        assert client._get_cached("short") is None
+        assert "short" not in client._cache
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_evicts_least_recently_used(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        client = DatabricksClient(warehouse_id="test")
+        client._cache_max_entries = 2
+        client._set_cached("a", 1)
+        client._set_cached("b", 2)
+        client._get_cached("a")
+        client._set_cached("c", 3)
+        
+        assert client._get_cached("b") is None
+        assert client._get_cached("a") == 1
+        assert client._get_cached("c") == 3
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_evicts_expired_before_live_entries(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        client = DatabricksClient(warehouse_id="test")
+        client._cache_max_entries = 2
+        client._set_cached("a", 1)
+        client._set_cached("stale", 2, ttl=0)
+        client._set_cached("c", 3)
+        
+        assert "stale" not in client._cache
+        assert client._get_cached("a") == 1
+        assert client._get_cached("c") == 3
 
 
 class TestDatabricksClientExecuteSQL:
@@ -110,6 +149,26 @@ class TestDatabricksClientExecuteSQL:
         assert isinstance(result, pd.DataFrame)
         assert len(result) == 1
     
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_builds_columns_from_manifest(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        from databricks.sdk.service.sql import StatementState
+        
+        col_a, col_b = Mock(), Mock()
+        col_a.name, col_b.name = "a", "b"
+        mock_response = Mock()
+        mock_response.status.state = StatementState.SUCCEEDED
+        mock_response.result.data_array = [["1", "x"], ["2", None]]
+        mock_response.manifest.schema.columns = [col_a, col_b]
+        mock_ws.return_value.statement_execution.execute_statement.return_value = mock_response
+        
+        client = DatabricksClient(warehouse_id="test")
+        result = client.execute_sql("SELECT a, b FROM t", use_cache=False)
+        
+        assert list(result.columns) == ["a", "b"]
+        assert result["a"].tolist() == ["1", "2"]
+        assert result["b"].tolist()[0] == "x"
+    
     @patch("services.databricks_client.WorkspaceClient")
     def test_returns_cached_result(self, mock_ws):
         from services.databricks_client import DatabricksClient
@@ -137,6 +196,96 @@ class TestDatabricksClientExecuteSQL:
         # Should only call API once
         assert mock_ws.return_value.statement_execution.execute_statement.call_count == 1
     
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_disk_cache_survives_new_client(self, mock_ws, tmp_path):
+        from services.databricks_client import DatabricksClient
+        from databricks.sdk.service.sql import StatementState
+        
+        column = Mock()
+        column.name = "value"
+        mock_response = Mock()
+        mock_response.status.state = StatementState.SUCCEEDED
+        mock_response.result.data_array = [["42"]]
+        mock_response.manifest.schema.columns = [column]
+        execute = mock_ws.return_value.statement_execution.execute_statement
+        execute.return_value = mock_response
+        
+        with patch.dict(os.environ, {"SQL_DISK_CACHE_DIR": str(tmp_path)}):
+            DatabricksClient(warehouse_id="test").execute_sql("SELECT 42 AS value")
+            result = DatabricksClient(warehouse_id="test").execute_sql("SELECT 42 AS value")
+        
+        assert execute.call_count == 1
+        assert result["value"].tolist() == ["42"]
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_clear_cache_only_removes_own_disk_entries(self, mock_ws, tmp_path):
+        from services.databricks_client import DISK_CACHE_SUBDIR, DatabricksClient
+        from databricks.sdk.service.sql import StatementState
+        
+        column = Mock()
+        column.name = "value"
+        mock_response = Mock()
+        mock_response.status.state = StatementState.SUCCEEDED
+        mock_response.result.data_array = [["42"]]
+        mock_response.manifest.schema.columns = [column]
+        mock_ws.return_value.statement_execution.execute_statement.return_value = mock_response
+        unrelated = tmp_path / "someone_elses.parquet"
+        pd.DataFrame({"x": [1]}).to_parquet(unrelated)
+        
+        with patch.dict(os.environ, {"SQL_DISK_CACHE_DIR": str(tmp_path)}):
+            client = DatabricksClient(warehouse_id="test")
+            client.execute_sql("SELECT 42 AS value")
+            assert len(list((tmp_path / DISK_CACHE_SUBDIR).glob("*.parquet"))) == 1
+            client.clear_cache()
+        
+        assert list((tmp_path / DISK_CACHE_SUBDIR).glob("*.parquet")) == []
+        assert unrelated.exists()
+    
+    @patch.dict(os.environ, {"SQL_ARROW_RESULTS": "true"})
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_arrow_results_download_all_chunks(self, mock_ws):
+        import pyarrow as pa
+        from services.databricks_client import DatabricksClient
+        from databricks.sdk.service.sql import Disposition, StatementState
+        
+        def ipc_bytes(values):
+            table = pa.table({"n": values})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes()
+        
+        payloads = {"https://chunk/0": ipc_bytes([1, 2]), "https://chunk/1": ipc_bytes([3])}
+        
+        def link(index):
+            return Mock(chunk_index=index, external_link=f"https://chunk/{index}", http_headers=None)
+        
+        column = Mock()
+        column.name = "n"
+        mock_response = Mock()
+        mock_response.status.state = StatementState.SUCCEEDED
+        mock_response.statement_id = "stmt-1"
+        mock_response.result.external_links = [link(0)]
+        mock_response.manifest.schema.columns = [column]
+        mock_response.manifest.chunks = [Mock(chunk_index=0), Mock(chunk_index=1)]
+        statement_execution = mock_ws.return_value.statement_execution
+        statement_execution.execute_statement.return_value = mock_response
+        statement_execution.get_statement_result_chunk_n.return_value = Mock(external_links=[link(1)])
+        
+        def fake_get(url, headers, timeout):
+            reply = Mock(content=payloads[url])
+            reply.raise_for_status = Mock()
+            return reply
+        
+        with patch("requests.get", side_effect=fake_get):
+            client = DatabricksClient(warehouse_id="test")
+            result = client.execute_sql("SELECT n FROM t", use_cache=False)
+        
+        assert result["n"].tolist() == [1, 2, 3]
+        kwargs = statement_execution.execute_statement.call_args.kwargs
+        assert kwargs["disposition"] == Disposition.EXTERNAL_LINKS
+        statement_execution.get_statement_result_chunk_n.assert_called_once_with("stmt-1", 1)
+    
     @patch("services.databricks_client.WorkspaceClient")
     def test_handles_failed_statement(self, mock_ws):
         from services.databricks_client import DatabricksClient
@@ -327,6 +476,128 @@ class TestDatabricksClientListGenieSpaces:
         assert len(callback_calls) == 2
         assert callback_calls[0] == (1, True, None)   # First page: 1 space, has more
         assert callback_calls[1] == (2, False, None)  # Second page: 2 spaces total, no more
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_reads_sdk_space_objects(self, mock_ws):
+        from databricks.sdk.service.dashboards import GenieListSpacesResponse, GenieSpace as SdkGenieSpace
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.genie.list_spaces.return_value = GenieListSpacesResponse(spaces=[
+            SdkGenieSpace(space_id="s1", title="Sales", description="", create_time=1700000000000, warehouse_id="wh-1"),
+            SdkGenieSpace(space_id="s2", title="", description="Ops"),
+        ])
+        
+        client = DatabricksClient(warehouse_id="test")
+        result = client.list_genie_spaces()
+        
+        assert [(s.id, s.name, s.created_at, s.warehouse_id, s.owner) for s in result] == [
+            ("s1", "Sales", "1700000000000", "wh-1", None),
+            ("s2", "s2", "", None, None),
+        ]
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_falls_back_to_rest_api(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.genie.list_spaces.side_effect = Exception("SDK Error")
+        mock_ws.return_value.api_client.do.side_effect = [
+            {"spaces": [{"space_id": "s1", "title": "Sales", "creator": "alice"}], "next_page_token": "p2"},
+            {"spaces": [{"space_id": "s2", "warehouse_id": "wh-1"}]},
+        ]
+        
+        client = DatabricksClient(warehouse_id="test")
+        result = client.list_genie_spaces()
+        
+        assert [(s.id, s.name, s.warehouse_id, s.owner) for s in result] == [
+            ("s1", "Sales", None, "alice"),
+            ("s2", "s2", "wh-1", None),
+        ]
+        second_call = mock_ws.return_value.api_client.do.call_args_list[1]
+        assert second_call.kwargs["query"] == {"page_size": 100, "page_token": "p2"}
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_disk_cache_survives_new_client(self, mock_ws, tmp_path):
+        from databricks.sdk.service.dashboards import GenieListSpacesResponse, GenieSpace as SdkGenieSpace
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.config.host = "https://example.cloud.databricks.com"
+        mock_ws.return_value.current_user.me.return_value = Mock(user_name="alice@example.com")
+        list_spaces = mock_ws.return_value.genie.list_spaces
+        list_spaces.return_value = GenieListSpacesResponse(spaces=[
+            SdkGenieSpace(space_id="s1", title="Sales", description="", create_time=1700000000000, warehouse_id="wh-1"),
+            SdkGenieSpace(space_id="s2", title="Ops", description=""),
+        ])
+        
+        with patch.dict(os.environ, {"SQL_DISK_CACHE_DIR": str(tmp_path)}):
+            first = DatabricksClient(warehouse_id="test").list_genie_spaces()
+            second_client = DatabricksClient(warehouse_id="test")
+            second = second_client.list_genie_spaces()
+        
+        assert list_spaces.call_count == 1
+        assert second == first
+        assert second[1].warehouse_id is None
+        # The restored listing also seeds per-space lookups
+        assert second_client.get_genie_space("s1") == first[0]
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_disk_cache_is_scoped_to_user(self, mock_ws, tmp_path):
+        from databricks.sdk.service.dashboards import GenieListSpacesResponse, GenieSpace as SdkGenieSpace
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.config.host = "https://example.cloud.databricks.com"
+        me = mock_ws.return_value.current_user.me
+        list_spaces = mock_ws.return_value.genie.list_spaces
+        list_spaces.return_value = GenieListSpacesResponse(spaces=[SdkGenieSpace(space_id="s1", title="Sales")])
+        
+        with patch.dict(os.environ, {"SQL_DISK_CACHE_DIR": str(tmp_path)}):
+            me.return_value = Mock(user_name="alice@example.com")
+            DatabricksClient(warehouse_id="test").list_genie_spaces()
+            me.return_value = Mock(user_name="bob@example.com")
+            DatabricksClient(warehouse_id="test").list_genie_spaces()
+        
+        assert list_spaces.call_count == 2
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_disk_cache_key_resolves_user_once(self, mock_ws, tmp_path):
+        from services.databricks_client import DatabricksClient
+        
+        me = mock_ws.return_value.current_user.me
+        me.return_value = Mock(user_name="alice@example.com")
+        
+        with patch.dict(os.environ, {"SQL_DISK_CACHE_DIR": str(tmp_path)}):
+            client = DatabricksClient(warehouse_id="test")
+            client.list_genie_spaces()
+            client.clear_cache()
+            client.list_genie_spaces()
+        
+        assert me.call_count == 1
+    
+    def test_prefetch_pages_stops_when_token_repeats(self):
+        from services.databricks_client import _prefetch_pages
+        
+        requested = []
+        def fetch_page(token):
+            requested.append(token)
+            return [token], "stuck"
+        
+        walked = list(_prefetch_pages(fetch_page, max_pages=30))
+        
+        assert walked == [([None], "stuck"), (["stuck"], "stuck")]
+        assert requested == [None, "stuck"]
+    
+    def test_prefetch_pages_stops_at_max_pages(self):
+        from services.databricks_client import _prefetch_pages
+        
+        pages = {None: ([1], "p2"), "p2": ([2], "p3"), "p3": ([3], "p4")}
+        requested = []
+        def fetch_page(token):
+            requested.append(token)
+            return pages[token]
+        
+        walked = list(_prefetch_pages(fetch_page, max_pages=2))
+        
+        assert walked == [([1], "p2"), ([2], "p3")]
+        assert requested == [None, "p2"]
 
 
 class TestDatabricksClientGetGenieSpace:
@@ -384,6 +655,30 @@ class TestDatabricksClientGetGenieSpace:
         assert mock_ws.return_value.genie.get_space.call_count == 1
 
 
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_listing_warms_space_cache(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_space = Mock()
+        mock_space.space_id = "space-123"
+        mock_space.title = "Listed Space"
+        mock_space.description = ""
+        mock_space.create_time = None
+        mock_space.warehouse_id = None
+        
+        mock_response = Mock()
+        mock_response.spaces = [mock_space]
+        mock_response.next_page_token = None
+        mock_ws.return_value.genie.list_spaces.return_value = mock_response
+        
+        client = DatabricksClient(warehouse_id="test")
+        client.list_genie_spaces()
+        space = client.get_genie_space("space-123")
+        
+        assert space.name == "Listed Space"
+        mock_ws.return_value.genie.get_space.assert_not_called()
+
+
 class TestDatabricksClientGetSpacesWithMetrics:
     """Tests for DatabricksClient.get_spaces_with_metrics method."""
     
@@ -441,6 +736,853 @@ class TestDatabricksClientGetSpacesWithMetrics:
         assert len(result) == 1
         assert result.iloc[0]["id"] == "space-123"
         assert result.iloc[0]["query_count"] == 0  # Default value
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_joins_metrics_by_space_id(self, mock_ws):
+        from services.databricks_client import DatabricksClient, GenieSpace
+        
+        client = DatabricksClient(warehouse_id="test")
+        client.list_genie_spaces = Mock(return_value=[
+            GenieSpace(id="a", name="A", description="", created_at="", warehouse_id=None),
+            GenieSpace(id="b", name="B", description="", created_at="", warehouse_id=None),
+        ])
+        client.execute_sql = Mock(return_value=pd.DataFrame({
+            "space_id": ["b", "z"],
+            "query_count": ["12", "1"],
+            "avg_duration_ms": ["1500.5", "1"],
+            "slow_query_count": ["2", "0"],
+            "success_rate": ["87.5", None],
+        }))
+        
+        result = client.get_spaces_with_metrics(days=7)
+        
+        assert result["id"].tolist() == ["a", "b"]
+        assert result["query_count"].tolist() == [0, 12]
+        assert result["avg_duration_ms"].tolist() == [0.0, 1500.5]
+        assert result["slow_query_count"].tolist() == [0, 2]
+        assert result["success_rate"].tolist() == [100.0, 87.5]
+
+
+class TestGenieMessageAttachment:
+    """Tests for GenieMessageAttachment."""
+    
+    @patch("services.databricks_client._normalize_sql_text", return_value="select 1")
+    def test_normalized_sql_is_computed_once(self, mock_normalize):
+        from services.databricks_client import GenieMessageAttachment
+        
+        att = GenieMessageAttachment(statement_id="stmt-1", sql_content="SELECT  1")
+        
+        assert att.normalized_sql == "select 1"
+        assert att.normalized_sql == "select 1"
+        mock_normalize.assert_called_once_with("SELECT  1")
+        assert att == GenieMessageAttachment(statement_id="stmt-1", sql_content="SELECT  1")
+    
+    def test_normalized_sql_collapses_literal_in_lists(self):
+        from services.databricks_client import GenieMessageAttachment
+        
+        att = GenieMessageAttachment(sql_content=(
+            "SELECT * FROM sales -- regions\n"
+            "WHERE region IN ('East', 'It''s') AND id in (1,2, 3) AND x IN (SELECT y FROM z)"
+        ))
+        
+        assert att.normalized_sql == (
+            "select * from sales where region in (?) and id in (?) and x in (select y from z)"
+        )
+
+
+class TestDatabricksClientIterConversations:
+    """Tests for DatabricksClient.iter_conversations method."""
+    
+    @staticmethod
+    def _page(conv_ids, next_page_token=None):
+        page = Mock()
+        page.conversations = []
+        for conv_id in conv_ids:
+            summary = Mock()
+            summary.conversation_id = conv_id
+            summary.title = f"title {conv_id}"
+            summary.created_timestamp = 1700000000000
+            page.conversations.append(summary)
+        page.next_page_token = next_page_token
+        return page
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_fetches_next_page_only_when_needed(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        list_conversations = mock_ws.return_value.genie.list_conversations
+        list_conversations.side_effect = [
+            self._page(["c1", "c2"], next_page_token="p2"),
+            self._page(["c3"]),
+        ]
+        client = DatabricksClient(warehouse_id="test")
+        
+        conversations = client.iter_conversations("space-1")
+        first = next(conversations)
+        
+        assert first.conversation_id == "c1"
+        assert list_conversations.call_count == 1
+        assert [c.conversation_id for c in conversations] == ["c2", "c3"]
+        assert list_conversations.call_args.kwargs["page_token"] == "p2"
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_stops_at_limit_on_page_boundary(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        list_conversations = mock_ws.return_value.genie.list_conversations
+        list_conversations.side_effect = [self._page(["c1", "c2"], next_page_token="p2")]
+        client = DatabricksClient(warehouse_id="test")
+        
+        conversations = list(client.iter_conversations("space-1", max_conversations=2))
+        
+        assert [c.conversation_id for c in conversations] == ["c1", "c2"]
+        assert list_conversations.call_count == 1
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_stops_when_page_token_repeats(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        list_conversations = mock_ws.return_value.genie.list_conversations
+        list_conversations.side_effect = [
+            self._page(["c1"], next_page_token="p2"),
+            self._page(["c2"], next_page_token="p2"),
+        ]
+        client = DatabricksClient(warehouse_id="test")
+        
+        conversations = list(client.iter_conversations("space-1"))
+        
+        assert [c.conversation_id for c in conversations] == ["c1", "c2"]
+        assert list_conversations.call_count == 2
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_list_conversations_falls_back_to_include_all(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        list_conversations = mock_ws.return_value.genie.list_conversations
+        list_conversations.side_effect = [self._page([]), self._page(["c1", "c2", "c3"])]
+        client = DatabricksClient(warehouse_id="test")
+        
+        conversations = client.list_conversations("space-1", max_conversations=2)
+        
+        assert [c.conversation_id for c in conversations] == ["c1", "c2"]
+        assert list_conversations.call_args.kwargs["include_all"] is True
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_list_conversations_cache_respects_limit(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        list_conversations = mock_ws.return_value.genie.list_conversations
+        list_conversations.side_effect = [self._page(["c1"]), self._page(["c1", "c2", "c3"])]
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert len(client.list_conversations("space-1", max_conversations=1)) == 1
+        assert len(client.list_conversations("space-1", max_conversations=3)) == 3
+        assert len(client.list_conversations("space-1", max_conversations=1)) == 1
+        assert list_conversations.call_count == 2
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_list_conversations_caches_empty_result_briefly(self, mock_ws):
+        from services.databricks_client import DatabricksClient, EMPTY_RESULT_TTL_SECONDS
+        
+        list_conversations = mock_ws.return_value.genie.list_conversations
+        list_conversations.side_effect = lambda **kwargs: self._page([])
+        client = DatabricksClient(warehouse_id="test")
+        
+        with patch("services.databricks_client.time.monotonic", return_value=1000.0):
+            assert client.list_conversations("space-1") == []
+            assert client.list_conversations("space-1") == []
+        # Default walk plus the include_all retry, once
+        assert list_conversations.call_count == 2
+        
+        with patch("services.databricks_client.time.monotonic", return_value=1000.0 + EMPTY_RESULT_TTL_SECONDS):
+            client.list_conversations("space-1")
+        assert list_conversations.call_count == 4
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_list_conversations_falls_back_to_audit_logs(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.genie.list_conversations.side_effect = Exception("forbidden")
+        client = DatabricksClient(warehouse_id="test")
+        client.execute_sql = Mock(return_value=pd.DataFrame({
+            "conversation_id": ["conv-1", None, "conv-3"],
+            "title": ["x" * 120, "ignored", None],
+        }))
+        
+        conversations = client.list_conversations("space-1", max_conversations=5)
+        
+        assert [c.conversation_id for c in conversations] == ["conv-1", "conv-3"]
+        assert conversations[0].title == "x" * 100 + "..."
+        assert conversations[1].title == "Conversation conv-3"
+        assert conversations[1].created_time == ""
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_conversation_messages_read_sql_from_query_attachment(self, mock_ws):
+        from databricks.sdk.service.dashboards import (
+            GenieAttachment,
+            GenieListConversationMessagesResponse,
+            GenieMessage,
+            GenieQueryAttachment,
+            TextAttachment,
+        )
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.genie.list_conversation_messages.return_value = GenieListConversationMessagesResponse(
+            messages=[GenieMessage(
+                id=None,
+                space_id="space-1",
+                conversation_id="conv-1",
+                content="How many orders?",
+                message_id="msg-1",
+                attachments=[
+                    GenieAttachment(query=GenieQueryAttachment(
+                        statement_id="stmt-1",
+                        query="SELECT count(*) FROM orders",
+                        description="Counts all orders",
+                    )),
+                    GenieAttachment(text=TextAttachment(content="There are 42 orders.")),
+                    GenieAttachment(attachment_id="att-3"),
+                ],
+            )]
+        )
+        client = DatabricksClient(warehouse_id="test")
+        
+        messages = client.get_conversation_messages("space-1", "conv-1")
+        
+        attachments = messages[0].attachments
+        assert [a.attachment_type for a in attachments] == ["query", "text", "other"]
+        assert attachments[0].statement_id == "stmt-1"
+        assert attachments[0].sql_content == "SELECT count(*) FROM orders"
+        assert attachments[1].sql_content == ""
+
+
+class TestDatabricksClientGetPromptsForQueries:
+    """Tests for DatabricksClient.get_prompts_for_queries method."""
+    
+    @staticmethod
+    def _client_with_conversations(mock_ws, messages_by_conv):
+        from services.databricks_client import DatabricksClient, GenieConversation
+        
+        client = DatabricksClient(warehouse_id="test")
+        client.execute_sql = Mock(return_value=pd.DataFrame())
+        client.list_conversations = Mock(return_value=[
+            GenieConversation(conversation_id=conv_id, title="", created_time="", last_updated_time="")
+            for conv_id in messages_by_conv
+        ])
+        client.get_conversation_messages = Mock(
+            side_effect=lambda space_id, conv_id: messages_by_conv[conv_id]
+        )
+        return client
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_matches_by_statement_id_and_sql_text(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {
+            f"conv-{i}": [GenieMessage(
+                message_id=f"msg-{i}",
+                content=f"question {i}",
+                status="COMPLETED",
+                attachments=[GenieMessageAttachment(
+                    attachment_type="query",
+                    statement_id=f"stmt-{i}",
+                    sql_content=f"SELECT {i}  FROM t",
+                )],
+            )]
+            for i in range(20)
+        }
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        queries_df = pd.DataFrame({
+            "statement_id": ["stmt-3", "other", "missing"],
+            "query_text": ["", "select 7 from t -- trailing", "select 99 from t"],
+        })
+        
+        prompts = client.get_prompts_for_queries("space-1", queries_df)
+        
+        assert prompts == {"stmt-3": "question 3", "other": "question 7"}
+        assert client.get_conversation_messages.call_count == 20
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_handles_duplicate_index_and_missing_text(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {"conv-1": [GenieMessage(
+            message_id="msg-1",
+            content="how many rows?",
+            status="COMPLETED",
+            attachments=[GenieMessageAttachment(
+                attachment_type="query", statement_id="stmt-1", sql_content="SELECT COUNT(*) FROM t",
+            )],
+        )]}
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        queries_df = pd.DataFrame(
+            {"statement_id": ["x", "y"], "query_text": [None, "select count(*) from t"]},
+            index=[5, 5],
+        )
+        progress = Mock()
+        
+        prompts = client.get_prompts_for_queries("space-1", queries_df, progress_callback=progress)
+        
+        assert prompts == {"y": "how many rows?"}
+        progress.assert_called_with(2, 2)
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_prompt_skips_sql_content_but_not_sql_like_words(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {
+            "conv-1": [
+                GenieMessage(message_id="msg-0", content="  with t AS (SELECT 1) SELECT * FROM t"),
+                GenieMessage(
+                    message_id="msg-1",
+                    content="Withdrawals by month?",
+                    attachments=[GenieMessageAttachment(statement_id="stmt-1", sql_content="SELECT 1")],
+                ),
+            ],
+        }
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        queries_df = pd.DataFrame({"statement_id": ["stmt-1"], "query_text": [""]})
+        
+        assert client.get_prompts_for_queries("space-1", queries_df) == {"stmt-1": "Withdrawals by month?"}
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_prompt_is_first_question_in_conversation(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {
+            "conv-1": [
+                GenieMessage(
+                    message_id="msg-1",
+                    content="sales by region?",
+                    attachments=[GenieMessageAttachment(statement_id="stmt-1", sql_content="SELECT 1")],
+                ),
+                GenieMessage(
+                    message_id="msg-2",
+                    content="only for 2024?",
+                    attachments=[GenieMessageAttachment(statement_id="stmt-2", sql_content="SELECT 2")],
+                ),
+                GenieMessage(message_id="msg-3", content="SELECT 3"),
+                GenieMessage(
+                    message_id="msg-4",
+                    attachments=[GenieMessageAttachment(statement_id="stmt-4", sql_content="SELECT 4")],
+                ),
+            ],
+        }
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        queries_df = pd.DataFrame({"statement_id": ["stmt-1", "stmt-2", "stmt-4"], "query_text": [""] * 3})
+        
+        # Every statement gets the conversation's opening question, as the
+        # system table lookup does; SQL content is never the prompt
+        assert client.get_prompts_for_queries("space-1", queries_df) == {
+            "stmt-1": "sales by region?",
+            "stmt-2": "sales by region?",
+            "stmt-4": "sales by region?",
+        }
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_space_index_shared_between_lookups(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {"conv-1": [GenieMessage(
+            message_id="msg-1",
+            content="top customers?",
+            status="COMPLETED",
+            attachments=[GenieMessageAttachment(
+                attachment_type="query", statement_id="stmt-1", sql_content="SELECT * FROM customers",
+            )],
+        )]}
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        queries_df = pd.DataFrame({"statement_id": ["stmt-1"], "query_text": [""]})
+        
+        assert client.get_prompts_for_queries("space-1", queries_df) == {"stmt-1": "top customers?"}
+        result = client.find_prompt_for_query("space-1", "other", "select * from customers")
+        
+        assert result == {
+            "conversation_id": "conv-1",
+            "message_id": "msg-1",
+            "prompt": "top customers?",
+            "matched_by": "sql_text",
+        }
+        client.list_conversations.assert_called_once()
+        assert client.get_conversation_messages.call_count == 1
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_system_tables_resolve_before_genie_api(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {"conv-1": [GenieMessage(
+            message_id="msg-1",
+            content="api question",
+            attachments=[GenieMessageAttachment(statement_id="stmt-2", sql_content="SELECT 2")],
+        )]}
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        client.execute_sql.return_value = pd.DataFrame(
+            {"statement_id": ["stmt-1", "stmt-3"], "prompt": ["warehouse question", None]}
+        )
+        queries_df = pd.DataFrame({"statement_id": ["stmt-1"], "query_text": [""]})
+        
+        assert client.get_prompts_for_queries("space-1", queries_df) == {"stmt-1": "warehouse question"}
+        client.list_conversations.assert_not_called()
+        
+        queries_df = pd.DataFrame({"statement_id": ["stmt-1", "stmt-2"], "query_text": ["", ""]})
+        prompts = client.get_prompts_for_queries("space-1", queries_df)
+        
+        assert prompts == {"stmt-1": "warehouse question", "stmt-2": "api question"}
+        client.list_conversations.assert_called_once()
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    @patch("services.databricks_client._normalize_sql_text")
+    def test_statement_id_match_beats_earlier_sql_match(self, mock_normalize, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        messages_by_conv = {
+            "conv-1": [GenieMessage(
+                message_id="msg-1",
+                content="first question",
+                attachments=[GenieMessageAttachment(statement_id="stmt-1", sql_content="SELECT 1")],
+            )],
+            "conv-2": [GenieMessage(
+                message_id="msg-2",
+                content="second question",
+                attachments=[GenieMessageAttachment(statement_id="stmt-2", sql_content="SELECT 1")],
+            )],
+        }
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        
+        result = client.find_prompt_for_query("space-1", "stmt-2", "SELECT 1")
+        
+        assert result["message_id"] == "msg-2"
+        assert result["matched_by"] == "statement_id"
+        mock_normalize.assert_not_called()
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_find_prompt_probes_sql_index_then_partial_match(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        long_sql = "SELECT region, SUM(amount) FROM sales WHERE year = 2024 GROUP BY region " + "-- padding\n" * 30
+        messages_by_conv = {
+            "conv-1": [GenieMessage(
+                message_id="msg-1",
+                content="sales by region?",
+                attachments=[GenieMessageAttachment(statement_id="stmt-1", sql_content=long_sql)],
+            )],
+            "conv-2": [GenieMessage(
+                message_id="msg-2",
+                content="row count?",
+                attachments=[GenieMessageAttachment(statement_id="stmt-2", sql_content="SELECT COUNT(*) FROM t")],
+            )],
+        }
+        client = self._client_with_conversations(mock_ws, messages_by_conv)
+        
+        exact = client.find_prompt_for_query("space-1", "a", "select   count(*) from t")
+        # query history may hold a truncated copy of the statement
+        partial = client.find_prompt_for_query("space-1", "b", "select region, sum(amount) from sales")
+        
+        assert (exact["message_id"], exact["matched_by"]) == ("msg-2", "sql_text")
+        assert (partial["message_id"], partial["prompt"]) == ("msg-1", "sales by region?")
+        assert client.find_prompt_for_query("space-1", "c", "select 42") is None
+
+
+class TestDatabricksClientGetConversationsWithQueryMetrics:
+    """Tests for DatabricksClient.get_conversations_with_query_metrics method."""
+    
+    @staticmethod
+    def _patch_queries():
+        # Each system table query returns its name so results can be routed
+        return patch.multiple(
+            "queries.sql",
+            QUERIES_BY_STATEMENT_IDS="metrics:{statement_ids}",
+            get_conversation_sources_query=Mock(return_value="sources"),
+            get_message_ai_overhead_query=Mock(return_value="overhead"),
+            get_queries_by_space_and_time=Mock(return_value="space_queries"),
+            get_batch_messages_from_audit_query=Mock(return_value="batch"),
+        )
+    
+    @staticmethod
+    def _client(mock_ws, messages_by_conv, results):
+        from services.databricks_client import DatabricksClient, GenieConversation
+        
+        client = DatabricksClient(warehouse_id="test")
+        client.list_conversations = Mock(return_value=[
+            GenieConversation(conversation_id=conv_id) for conv_id in messages_by_conv
+        ])
+        client.get_conversation_messages = Mock(
+            side_effect=lambda space_id, conv_id: messages_by_conv[conv_id]
+        )
+        client.get_genie_space = Mock(return_value=None)
+        client.execute_sql = Mock(
+            side_effect=lambda sql, use_cache=True: results.get(sql.split(":")[0], pd.DataFrame())
+        )
+        return client
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_reads_sources_and_overhead_from_audit(self, mock_ws):
+        from services.databricks_client import GenieMessage
+        
+        client = self._client(mock_ws, {"c1": [GenieMessage(message_id="m1", content="how many?")]}, {
+            "sources": pd.DataFrame({
+                "conversation_id": ["c1", None, "c1"],
+                "message_source": ["Space", "API", "API"],
+            }),
+            "overhead": pd.DataFrame({
+                "message_id": ["m1", None],
+                "conversation_id": ["c1", "c2"],
+                "message_source": ["API", "API"],
+                "ai_overhead_sec": ["12.5", "3"],
+                "message_time": ["2024-01-01T00:00:00Z", None],
+                "user_email": ["alice@example.com", "bob@example.com"],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        assert len(result) == 1
+        conv = result[0]
+        assert (conv.conversation_source, conv.user_email) == ("Space", "alice@example.com")
+        message = conv.messages[0]
+        assert message.ai_overhead_sec == 12.5
+        assert message.timestamp == "2024-01-01T00:00:00Z"
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_fetches_each_statement_once(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        def message(msg_id, *statement_ids):
+            return GenieMessage(
+                message_id=msg_id,
+                content="q",
+                attachments=[GenieMessageAttachment(statement_id=sid) for sid in statement_ids],
+            )
+        
+        client = self._client(mock_ws, {
+            "c1": [message("m1", "stmt-1", "stmt-1")],
+            "c2": [message("m2", "stmt-1")],
+        }, {
+            "metrics": pd.DataFrame({"statement_id": ["stmt-1"], "total_duration_ms": ["1500"]}),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        metrics_calls = [c.args[0] for c in client.execute_sql.call_args_list if c.args[0].startswith("metrics")]
+        assert metrics_calls == ["metrics:'stmt-1'"]
+        assert [m.queries[0].total_duration_ms for conv in result for m in conv.messages] == [1500, 1500]
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_skips_statement_lookup_for_space_queries(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        client = self._client(mock_ws, {"c1": [GenieMessage(
+            message_id="m1",
+            content="q",
+            attachments=[GenieMessageAttachment(statement_id="stmt-1")],
+        )]}, {
+            "space_queries": pd.DataFrame({
+                "statement_id": ["stmt-1"],
+                "genie_conversation_id": ["c1"],
+                "total_duration_ms": [2500],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        assert not any(c.args[0].startswith("metrics") for c in client.execute_sql.call_args_list)
+        query = result[0].messages[0].queries[0]
+        assert (query.statement_id, query.total_duration_ms, query.genie_conversation_id) == ("stmt-1", 2500, "c1")
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_user_email_comes_from_first_message_with_a_user(self, mock_ws):
+        from services.databricks_client import GenieMessage
+        
+        client = self._client(mock_ws, {"c1": [
+            GenieMessage(message_id="m1", content="first"),
+            GenieMessage(message_id="m2", content="second"),
+            GenieMessage(message_id="m3", content="third"),
+        ]}, {
+            "overhead": pd.DataFrame({
+                "message_id": ["m1", "m2", "m3"],
+                "user_email": [None, "bob@example.com", "carol@example.com"],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        assert result[0].user_email == "bob@example.com"
+    
+    @patch("services.databricks_client.STATEMENT_METRICS_BATCH_SIZE", 2)
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_fetches_statement_metrics_in_batches(self, mock_ws):
+        from services.databricks_client import GenieMessage, GenieMessageAttachment
+        
+        statement_ids = ["stmt-1", "stmt-2", "stmt-3"]
+        client = self._client(mock_ws, {"c1": [GenieMessage(
+            message_id="m1",
+            content="q",
+            attachments=[GenieMessageAttachment(statement_id=sid) for sid in statement_ids],
+        )]}, {})
+        
+        def execute_sql(sql, use_cache=True):
+            if not sql.startswith("metrics"):
+                return pd.DataFrame()
+            ids = [sid.strip(" '") for sid in sql.split(":", 1)[1].split(",")]
+            return pd.DataFrame({"statement_id": ids, "total_duration_ms": [100] * len(ids)})
+        
+        client.execute_sql = Mock(side_effect=execute_sql)
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        batches = [c.args[0] for c in client.execute_sql.call_args_list if c.args[0].startswith("metrics")]
+        assert len(batches) == 2
+        assert sorted(q.statement_id for q in result[0].messages[0].queries) == statement_ids
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_correlates_queries_by_genie_conversation(self, mock_ws):
+        from services.databricks_client import GenieMessage
+        
+        client = self._client(mock_ws, {
+            "c1": [GenieMessage(message_id="m1", content="daily sales?")],
+            "c2": [GenieMessage(message_id="m2", content="top stores?")],
+        }, {
+            "overhead": pd.DataFrame({
+                "message_id": ["m1", "m2"],
+                "message_time": ["2024-01-01T00:00:00Z", ""],
+            }),
+            "space_queries": pd.DataFrame({
+                "statement_id": ["q-other", "q-mine", "q-late", "q-c2"],
+                "genie_conversation_id": ["c2", "c1", "c1", "c2"],
+                "start_time": [
+                    "2024-01-01T00:00:05Z", "2024-01-01T00:00:30Z",
+                    "2024-01-01T00:10:00Z", "2024-01-01T00:00:05Z",
+                ],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        queries = {m.message_id: [q.statement_id for q in m.queries] for conv in result for m in conv.messages}
+        # m1 only takes its own conversation's query within the 2 minute window;
+        # m2 has no timestamp, so every query from its conversation is linked
+        assert queries == {"m1": ["q-mine"], "m2": ["q-other", "q-c2"]}
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_matches_user_and_time_window_and_measures_ai_overhead(self, mock_ws):
+        from services.databricks_client import GenieMessage
+        
+        client = self._client(mock_ws, {
+            "c1": [GenieMessage(message_id="m1", content="daily sales?", created_timestamp=1704067200000)],
+            "c2": [GenieMessage(message_id="m2", content="hello", created_timestamp=1704070800000)],
+        }, {
+            "overhead": pd.DataFrame({
+                "message_id": ["m1", "m2"],
+                "message_time": ["2024-01-01T00:00:00Z", "2024-01-01T01:00:00Z"],
+                "user_email": ["alice@example.com", "alice@example.com"],
+            }),
+            "space_queries": pd.DataFrame({
+                # Mixed timestamp formats; naive values are read as UTC
+                "statement_id": ["q-bob", "q-alice", "q-late", "q-after-m2"],
+                "executed_by": ["bob@example.com", "alice@example.com", "alice@example.com", "bob@example.com"],
+                "start_time": [
+                    "2024-01-01 00:00:05", "2024-01-01T01:00:20+01:00",
+                    "2024-01-01T00:03:00Z", "2024-01-01T01:04:00.500Z",
+                ],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        messages = {m.message_id: m for conv in result for m in conv.messages}
+        # m1 takes only the same user's query inside the 2 minute window
+        assert [q.statement_id for q in messages["m1"].queries] == ["q-alice"]
+        assert messages["m1"].ai_overhead_sec == 20.0
+        # m2 has no linked query; its AI overhead comes from the next space query within 5 minutes
+        assert messages["m2"].queries == []
+        assert messages["m2"].ai_overhead_sec == 240.5
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_time_window_bounds(self, mock_ws):
+        from services.databricks_client import GenieMessage
+        
+        client = self._client(mock_ws, {
+            "c1": [GenieMessage(message_id="m1", content="q", created_timestamp=1704067200000)],
+        }, {
+            "overhead": pd.DataFrame({"message_id": ["m1"], "message_time": ["2024-01-01T00:00:00Z"]}),
+            "space_queries": pd.DataFrame({
+                "statement_id": ["q-before", "q-at", "q-edge", "q-past", "q-unknown"],
+                "start_time": [
+                    "2023-12-31T23:59:59Z", "2024-01-01T00:00:00Z", "2024-01-01T00:02:00Z",
+                    "2024-01-01T00:02:00.001Z", "",
+                ],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        message = result[0].messages[0]
+        # Both window ends are inclusive; queries without a start time never match
+        assert [q.statement_id for q in message.queries] == ["q-at", "q-edge"]
+        assert message.ai_overhead_sec == 120.0
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_issues_audit_and_history_queries_concurrently(self, mock_ws):
+        import threading
+        from services.databricks_client import GenieMessage
+        
+        client = self._client(mock_ws, {"c1": [GenieMessage(message_id="m1", content="q")]}, {})
+        # Each query waits until all three are in flight; run serially they would time out
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def execute_sql(sql, use_cache=True):
+            barrier.wait()
+            if sql == "overhead":
+                return pd.DataFrame({"message_id": ["m1"], "ai_overhead_sec": [4.0]})
+            return pd.DataFrame()
+        
+        client.execute_sql = Mock(side_effect=execute_sql)
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        assert sorted(c.args[0] for c in client.execute_sql.call_args_list) == ["overhead", "sources", "space_queries"]
+        assert result[0].messages[0].ai_overhead_sec == 4.0
+    
+    def test_query_metrics_from_df_cleans_columns(self):
+        from services.databricks_client import QueryMetrics, _query_metrics_from_df
+        
+        df = pd.DataFrame({
+            "statement_id": ["stmt-1", None, "stmt-3"],
+            "start_time": pd.to_datetime(["2024-01-01T00:00:00Z", None, None]),
+            "total_duration_ms": ["1500", "7", None],
+            "rows_returned": [3.0, None, None],
+            "bottleneck": ["QUEUE_WAIT", None, None],
+        })
+        
+        metrics = list(_query_metrics_from_df(df))
+        
+        assert metrics == [
+            QueryMetrics(
+                statement_id="stmt-1", start_time="2024-01-01 00:00:00+00:00",
+                total_duration_ms=1500, rows_returned=3, bottleneck="QUEUE_WAIT",
+            ),
+            QueryMetrics(statement_id="stmt-3"),
+        ]
+    
+    def test_timestamps_to_ns_parses_in_one_pass(self):
+        from services.databricks_client import _timestamps_to_ns
+        
+        assert _timestamps_to_ns([
+            "2024-01-01T00:00:00Z", "2024-01-01 00:00:00.5", "2024-01-01T02:00:00+02:00", "", "not a time",
+        ]) == [1704067200000000000, 1704067200500000000, 1704067200000000000, None, None]
+        assert _timestamps_to_ns([]) == []
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_batch_loads_messages_when_genie_api_unavailable(self, mock_ws):
+        mock_ws.return_value.genie.get_space.side_effect = Exception("forbidden")
+        client = self._client(mock_ws, {"c1": [], "c2": []}, {
+            "batch": pd.DataFrame({
+                "conversation_id": ["c1", "c1", None, "c2"],
+                "message_id": ["m1", "m2", "m3", None],
+                "content": ["first", None, "orphan", "no id"],
+            }),
+        })
+        
+        with self._patch_queries():
+            result = client.get_conversations_with_query_metrics("space-1")
+        
+        # m2 has no content and c2 ends up without messages, so both are dropped
+        assert [conv.conversation_id for conv in result] == ["c1"]
+        assert [(m.message_id, m.content) for m in result[0].messages] == [("m1", "first")]
+        client.get_conversation_messages.assert_not_called()
+
+
+class TestDatabricksClientGetGenieMessageContent:
+    """Tests for DatabricksClient.get_genie_message_content method."""
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_one_request_serves_every_message(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.api_client.do.return_value = {"messages": [
+            {"id": "m1", "role": "user", "content": "first question"},
+            {"message_id": "m2", "role": "user", "content": "follow up"},
+        ]}
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert client.get_genie_message_content("space-1", "conv-1", "m2") == "follow up"
+        assert client.get_genie_message_content("space-1", "conv-1", "m1") == "first question"
+        assert client.get_genie_message_content("space-1", "conv-1") == "first question"
+        assert client.get_genie_message_content("space-1", "conv-1", "missing") == "first question"
+        mock_ws.return_value.api_client.do.assert_called_once()
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_returns_none_on_failure(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.api_client.do.side_effect = Exception("Not found")
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert client.get_genie_message_content("space-1", "conv-1") is None
+        assert client.get_genie_message_content("space-1", "N/A") is None
+
+
+class TestDatabricksClientGetQueryProfileUrl:
+    """Tests for DatabricksClient.get_query_profile_url method."""
+    
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_resolves_workspace_once(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.config.host = "my-workspace.cloud.databricks.com/"
+        mock_ws.return_value.get_workspace_id.return_value = 1234
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert client.get_query_profile_url("stmt-1") == (
+            "https://my-workspace.cloud.databricks.com/sql/history?o=1234&queryId=stmt-1"
+        )
+        assert client.get_query_profile_url("stmt-2").endswith("o=1234&queryId=stmt-2")
+        mock_ws.return_value.get_workspace_id.assert_called_once()
+    
+    @patch.dict(os.environ, {"DATABRICKS_WORKSPACE_ID": ""})
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_falls_back_to_azure_host(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.config.host = "https://adb-98765.4.azuredatabricks.net"
+        mock_ws.return_value.get_workspace_id.side_effect = Exception("no access")
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert client.get_query_profile_url("stmt-1") == (
+            "https://adb-98765.4.azuredatabricks.net/sql/history?o=98765&queryId=stmt-1"
+        )
+    
+    @patch.dict(os.environ, {"DATABRICKS_WORKSPACE_ID": ""})
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_falls_back_to_workspace_id_query_param(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.config.host = "https://dbc-1a2b.cloud.databricks.com/?o=4242"
+        mock_ws.return_value.get_workspace_id.side_effect = Exception("no access")
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert "o=4242&queryId=stmt-1" in client.get_query_profile_url("stmt-1")
+    
+    @patch.dict(os.environ, {"DATABRICKS_WORKSPACE_ID": ""})
+    @patch("services.databricks_client.WorkspaceClient")
+    def test_unresolved_workspace_is_retried(self, mock_ws):
+        from services.databricks_client import DatabricksClient
+        
+        mock_ws.return_value.config.host = "https://example.cloud.databricks.com"
+        mock_ws.return_value.get_workspace_id.side_effect = [Exception("timeout"), 77]
+        client = DatabricksClient(warehouse_id="test")
+        
+        assert client.get_query_profile_url("stmt-1") is None
+        assert client.get_query_profile_url("stmt-1").endswith("o=77&queryId=stmt-1")
 
 
 class TestGetClient:
@@ -18,6 +18,7 @@ from utils.formatters import (
     format_percentage,
     format_datetime,
     format_date,
+    format_start_time,
     get_bottleneck_label,
     get_bottleneck_color,
     get_status_color,
@@ -189,6 +190,31 @@ class TestFormatDate:
         assert result == "Jan 15, 2024"
 
 
+class TestFormatStartTime:
+    """Tests for format_start_time function."""
+    
+    def test_empty_returns_empty(self):
+        assert format_start_time("") == ""
+    
+    def test_epoch_seconds_and_milliseconds(self):
+        assert format_start_time("1705333530") == "Jan 15, 2024 03:45 PM"
+        assert format_start_time("1705333530000") == "Jan 15, 2024 03:45 PM"
+    
+    def test_iso_string(self):
+        assert format_start_time("2024-01-15T15:45:30Z") == "Jan 15, 2024 03:45 PM"
+    
+    def test_invalid_string_is_truncated(self):
+        assert format_start_time("not a date at all, really") == "not a date at al"
+    
+    def test_repeated_values_are_parsed_once(self):
+        format_start_time.cache_clear()
+        
+        for _ in range(3):
+            format_start_time("2024-01-15T15:45:30Z")
+        
+        assert format_start_time.cache_info().misses == 1
+
+
 class TestGetBottleneckLabel:
     """Tests for get_bottleneck_label function."""
     
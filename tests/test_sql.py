@@ -27,6 +27,7 @@ from queries.sql import (
     QUERY_DETAIL_QUERY,
     USER_STATS_QUERY,
     IO_HEAVY_QUERIES_QUERY,
+    get_prompts_by_statement_ids_query,
 )
 
 
@@ -286,3 +287,22 @@ class TestIOHeavyQueriesQuery:
     
     def test_has_recommendations(self):
         assert "io_recommendation" in IO_HEAVY_QUERIES_QUERY
+
+
+class TestPromptsByStatementIdsQuery:
+    """Tests for get_prompts_by_statement_ids_query."""
+    
+    def test_filters_space_and_statement_ids(self):
+        sql = get_prompts_by_statement_ids_query("space-1", ["stmt-1", "it's"], hours=24)
+        assert "query_source.genie_space_id = 'space-1'" in sql
+        assert "statement_id IN ('stmt-1', 'it''s')" in sql
+        assert "INTERVAL 24 HOUR" in sql
+    
+    def test_joins_messages_on_conversation(self):
+        sql = get_prompts_by_statement_ids_query("space-1", ["stmt-1"])
+        assert "m.conversation_id = q.conversation_id" in sql
+        assert "min_by(m.content, m.event_time)" in sql
+    
+    def test_skips_sql_message_content(self):
+        sql = get_prompts_by_statement_ids_query("space-1", ["stmt-1"])
+        assert r"AND NOT request_params.content RLIKE '(?i)^\\s*(SELECT|WITH|INSERT|UPDATE|DELETE|CREATE)\\b'" in sql
@@ -6,8 +6,11 @@ for display in the Genie Audit dashboard.
 """
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Union
 
+import pandas as pd
+
 
 def format_duration(ms: Union[int, float, None]) -> str:
     """
@@ -164,6 +167,37 @@ def format_date(dt: Union[str, datetime, None]) -> str:
     return dt.strftime("%b %d, %Y")
 
 
+@lru_cache(maxsize=4096)
+def format_start_time(value: str) -> str:
+    """
+    Format an epoch (seconds or milliseconds) or datetime string (memoized).
+    
+    Streamlit reruns redraw the same conversation start times, so each
+    distinct string is parsed once.
+    
+    Args:
+        value: Epoch number or datetime string
+        
+    Returns:
+        Formatted string like "Jan 15, 2024 03:45 PM", or the first 16
+        characters of the value if it cannot be parsed
+    """
+    if not value:
+        return ""
+    try:
+        if value.replace(".", "", 1).isdigit():
+            ts_num = float(value)
+            # If > 1e12, it's in milliseconds; convert to seconds
+            if ts_num > 1e12:
+                ts_num = ts_num / 1000
+            dt = pd.to_datetime(ts_num, unit="s")
+        else:
+            dt = pd.to_datetime(value)
+        return dt.strftime("%b %d, %Y %I:%M %p")
+    except Exception:
+        return value[:16]
+
+
 # Bottleneck type mappings
 BOTTLENECK_LABELS = {
     "NORMAL": "Normal",